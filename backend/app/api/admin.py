@@ -0,0 +1,88 @@
+import json
+
+from fastapi import APIRouter, Depends
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache_stats
+from app.core.config import get_db
+from app.core.jobs import enqueue, job_worker
+from app.core.privacy import PrivacyDetector, rules_version
+from app.core.privacy_audit import count_pending
+from app.models.database import Job, JobStatus, LearningResource, PrivacyFinding
+from app.schemas.schemas import JobResponse, PrivacyAuditSummary
+from app.storage.blobs import dedup_stats
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+@router.get("/storage/dedup")
+def get_dedup_stats(db: Session = Depends(get_db)):
+    """Deduplication ratio and bytes saved across content-addressed media."""
+    return dedup_stats(db)
+
+@router.get("/cache")
+def get_cache_stats():
+    """Hit, miss and eviction counters of this worker's metadata caches."""
+    return cache_stats()
+
+def _active_audit(db: Session):
+    return db.query(Job).filter(
+        Job.kind == "privacy_audit",
+        Job.status.in_([JobStatus.PENDING, JobStatus.RUNNING]),
+    ).order_by(Job.id.desc()).first()
+
+@router.post("/privacy-audit", response_model=JobResponse)
+def start_privacy_audit(full: bool = False, db: Session = Depends(get_db)):
+    """
+    Queue a privacy audit of every stored title, key points and transcript.
+    Only resources not yet scanned under the current rules are checked
+    unless `full` is set. Returns the already active audit job if any.
+    """
+    job = _active_audit(db)
+    if job is None:
+        job = enqueue(db, "privacy_audit", payload={"full": full})
+        db.commit()
+        db.refresh(job)
+        job_worker.notify()
+    return job
+
+@router.get("/privacy-audit", response_model=PrivacyAuditSummary)
+def get_privacy_audit(limit: int = 100, db: Session = Depends(get_db)):
+    """Findings under the current rule version, highest risk first."""
+    version = rules_version()
+    by_risk = dict(
+        db.query(PrivacyFinding.risk_level, func.count())
+        .filter(PrivacyFinding.rule_version == version)
+        .group_by(PrivacyFinding.risk_level)
+        .all()
+    )
+    rows = (
+        db.query(
+            PrivacyFinding.resource_id,
+            LearningResource.title,
+            PrivacyFinding.risk_level,
+            PrivacyFinding.rule_version,
+            PrivacyFinding.findings,
+            PrivacyFinding.scanned_at,
+        )
+        .join(LearningResource, LearningResource.id == PrivacyFinding.resource_id)
+        .filter(
+            PrivacyFinding.rule_version == version,
+            PrivacyFinding.risk_level != PrivacyDetector.RISK_LOW,
+        )
+        # 'high' sorts before 'medium'
+        .order_by(PrivacyFinding.risk_level, PrivacyFinding.resource_id)
+        .limit(min(limit, 1000))
+        .all()
+    )
+    flagged = [
+        {**row._mapping, "findings": json.loads(row.findings) if row.findings else {}}
+        for row in rows
+    ]
+    return {
+        "rule_version": version,
+        "pending": count_pending(db, version),
+        "by_risk": by_risk,
+        "flagged": flagged,
+        "active_job": _active_audit(db),
+    }
@@ -3,22 +3,26 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 
+from app.core.cache import category_cache, resource_cache
 from app.core.config import get_db
+from app.core.rollups import rename_category_counts
 from app.models.database import Category, LearningResource
 from app.schemas.schemas import CategoryCreate, CategoryResponse, CategoryUpdate
 
 router = APIRouter(prefix="/api/categories", tags=["categories"])
 
 @router.get("", response_model=List[CategoryResponse])
-async def get_categories(db: Session = Depends(get_db)):
-    categories = db.query(Category).all()
+def get_categories(db: Session = Depends(get_db)):
+    categories = category_cache.get_or_load(
+        "all", lambda: [CategoryResponse.model_validate(c) for c in db.query(Category).all()]
+    )
     # If no categories exist, seed them? 
     # Or frontend handles it? 
     # Let's return empty list if none.
     return categories
 
 @router.post("", response_model=CategoryResponse)
-async def create_category(
+def create_category(
     category: CategoryCreate,
     db: Session = Depends(get_db)
 ):
@@ -33,21 +37,23 @@ async def create_category(
     )
     db.add(new_category)
     db.commit()
+    category_cache.invalidate()
     db.refresh(new_category)
     return new_category
 
 @router.delete("/{category_id}")
-async def delete_category(category_id: int, db: Session = Depends(get_db)):
+def delete_category(category_id: int, db: Session = Depends(get_db)):
     category = db.query(Category).filter(Category.id == category_id).first()
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     
     db.delete(category)
     db.commit()
+    category_cache.invalidate()
     return {"message": "Category deleted"}
 
 @router.put("/{category_id}", response_model=CategoryResponse)
-async def update_category(
+def update_category(
     category_id: int,
     update: CategoryUpdate,
     db: Session = Depends(get_db)
@@ -67,11 +73,15 @@ async def update_category(
     db.query(LearningResource).filter(LearningResource.category == old_name).update(
         {LearningResource.category: update.name}
     )
+    rename_category_counts(db, old_name, update.name)
     db.commit()
+    # The rename cascaded into resources: every cached resource may be stale
+    category_cache.invalidate()
+    resource_cache.invalidate()
     return category
 
 @router.put("/ops/rename-by-name")
-async def rename_category(
+def rename_category(
     old_name: str,
     new_name: str,
     db: Session = Depends(get_db)
@@ -96,5 +106,8 @@ async def rename_category(
     db.query(LearningResource).filter(LearningResource.category == old_name).update(
         {LearningResource.category: new_name}
     )
+    rename_category_counts(db, old_name, new_name)
     db.commit()
+    category_cache.invalidate()
+    resource_cache.invalidate()
     return {"message": "重命名完成"}
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app.core.config import get_db
+from app.core.jobs import job_worker, retry_job
+from app.models.database import Job, JobStatus
+from app.schemas.schemas import JobResponse
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+@router.get("", response_model=List[JobResponse])
+def list_jobs(
+    resource_id: Optional[int] = None,
+    status: Optional[JobStatus] = None,
+    limit: int = 50,
+    db: Session = Depends(get_db)
+):
+    query = db.query(Job)
+    if resource_id is not None:
+        query = query.filter(Job.resource_id == resource_id)
+    if status is not None:
+        query = query.filter(Job.status == status)
+    return query.order_by(Job.id.desc()).limit(min(limit, 500)).all()
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    job = db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job
+
+@router.post("/{job_id}/retry", response_model=JobResponse)
+def retry(job_id: int, db: Session = Depends(get_db)):
+    job = db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    if job.status != JobStatus.FAILED:
+        raise HTTPException(status_code=409, detail="只有失败的任务可以重试")
+    retry_job(db, job)
+    db.commit()
+    db.refresh(job)
+    job_worker.notify()
+    return job
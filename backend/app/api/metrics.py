@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import metrics
+
+router = APIRouter(prefix="/api", tags=["metrics"])
+
+# Prometheus text exposition format, version 0.0.4
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Request and database metrics of all worker processes, for Prometheus to scrape."""
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
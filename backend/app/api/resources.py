@@ -1,19 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header
-from fastapi.responses import StreamingResponse, Response
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header, Query
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Optional, List
-from datetime import datetime, timedelta
-import secrets
+from typing import Optional, List, Union
+from datetime import date, datetime, timedelta
 import os
 import io
 
-from app.core.config import get_db
+from app.core.archive import ARCHIVE_MEDIA_TYPES, export_archive
+from app.core.config import get_db, MAX_UPLOAD_SIZE, RENDITION_SIZES, STORAGE_CHUNK_SIZE
 from app.core.privacy import PrivacyDetector
-from app.models.database import LearningResource, MediaType
+from app.core.cache import cached_resource, resource_cache
+from app.core.http_cache import (
+    CACHE_IMMUTABLE,
+    CACHE_REVALIDATE,
+    RangeNotSatisfiable,
+    accepts_encoding,
+    http_date,
+    if_range_matches,
+    not_modified,
+    parse_range,
+    strong_etag,
+    weak_etag,
+)
+from app.core.jobs import enqueue, job_worker
+from app.core.mp4 import ingest_media
+from app.core.transcode import ffmpeg_available
+from app.core.uploads import UploadTooLarge, too_large_detail
+from app.core.privacy_audit import forget_findings
+from app.core.renditions import (
+    fresh_renditions,
+    pillow_available,
+    queue_renditions,
+    release_renditions,
+)
+from app.core.rollups import count_created, count_deleted, count_recategorized, daily_counts
+from app.core.search import highlights_for, index_resource, search_resource_ids, unindex_resource
+from app.core.queries import (
+    InvalidCursor,
+    filter_resources,
+    get_resource_entity,
+    get_resource_metadata,
+    paginate_resources,
+    resource_metadata_query,
+)
+from app.models.database import LearningResource, MediaBlob, MediaType
+from app.storage import get_default_backend, open_resource_blob, open_stored
+from app.storage.blobs import release_resource_bytes, store_deduplicated
+from app.storage.responses import not_satisfiable, range_response
 from app.schemas.schemas import (
     ResourceCreate,
     ResourceUpdate,
     ResourceResponse,
+    ResourcePage,
+    SearchResult,
     ShareLinkCreate,
     ShareLinkResponse,
     PrivacyAlert,
@@ -25,7 +64,8 @@ router = APIRouter(prefix="/api/resources", tags=["resources"])
 # os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 @router.post("", response_model=ResourceResponse)
-async def create_resource(
+def create_resource(
+    response: Response,
     title: str = Form(...),
     category: str = Form(...),
     media_type: MediaType = Form(...),
@@ -50,14 +90,6 @@ async def create_resource(
             }
         )
 
-    # Read file content into memory
-    file_content = await file.read()
-    file_size = len(file_content)
-    
-    print(f"DEBUG: Saving file to DB with pseudo-path")
-    # Store pseudo-path or empty for compatibility
-    file_path = f"db://{secrets.token_hex(8)}_{file.filename}"
-
     # Optional server-side compression for video
     def _to_bool(val: Optional[str]) -> bool:
         if val is None:
@@ -65,57 +97,94 @@ async def create_resource(
         return str(val).strip().lower() in {"true", "1", "on", "yes"}
     compress_flag = _to_bool(compress)
 
-    if compress_flag and media_type == MediaType.VIDEO:
-        try:
-            import shutil, tempfile, subprocess
-            if shutil.which("ffmpeg") is None:
-                print("FFmpeg not found, skipping server-side compression")
-            else:
-                with tempfile.TemporaryDirectory() as tmpdir:
-                    in_path = os.path.join(tmpdir, "input.mp4")
-                    out_path = os.path.join(tmpdir, "output.mp4")
-                    with open(in_path, "wb") as f_in:
-                        f_in.write(file_content)
-                    # Transcode: 720p, H.264 + AAC, ~2Mbps
-                    cmd = [
-                        "ffmpeg", "-y", "-i", in_path,
-                        "-vf", "scale=-2:720",
-                        "-c:v", "libx264", "-preset", "veryfast", "-b:v", "2000k",
-                        "-c:a", "aac", "-b:a", "128k",
-                        out_path
-                    ]
-                    subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                    with open(out_path, "rb") as f_out:
-                        file_content = f_out.read()
-                        file_size = len(file_content)
-        except Exception as e:
-            print(f"Compression failed: {e}")
-    
+    # The multipart parser has spooled the upload (1 MiB in memory, the rest
+    # on disk); from here on it is only ever read chunk by chunk, so peak
+    # memory does not depend on the file size
+    source = file.file
+    source.seek(0)
+    width = height = None
+    if media_type in (MediaType.VIDEO, MediaType.AUDIO):
+        # MP4/MOV/M4A: move the index (moov) to the front so playback can
+        # start from the first bytes, and take duration and size from the
+        # file itself. The form's duration is only kept for other formats.
+        source, info = ingest_media(source)
+        if info is not None:
+            if info.duration is not None:
+                duration = round(info.duration)
+            width, height = info.width, info.height
+
     resource = LearningResource(
         title=title,
         category=category,
         media_type=media_type,
-        file_url=file_path,
-        size=file_size,
+        file_url="",
+        size=0,
         duration=duration,
+        width=width,
+        height=height,
         key_points=key_points,
         patient_anonymized=patient_anonymized,
         transcript=transcript or "",
-        content=file_content # Save to DB
     )
     db.add(resource)
-    db.commit()
+    db.flush()
+
+    storage = get_default_backend(db)
+    key = storage.new_key(resource.id, file.filename)
+    try:
+        # Identical payloads are stored once; the resource then points at
+        # the existing copy
+        blob = store_deduplicated(db, storage, key, source, max_size=MAX_UPLOAD_SIZE, media_type=media_type)
+        resource.file_url = blob.storage_url
+        resource.content_hash = blob.sha256
+        resource.content_encoding = blob.encoding
+        resource.size = blob.size
+        index_resource(db, resource)
+        count_created(db, resource)
+        db.commit()
+        resource_cache.invalidate(resource.id)
+    except Exception as e:
+        db.rollback()
+        # The DB rows roll back with the session; external drivers need an
+        # explicit cleanup
+        if storage.scheme != "db":
+            storage.delete(key)
+        if isinstance(e, UploadTooLarge):
+            raise HTTPException(status_code=413, detail=too_large_detail(e.limit))
+        raise
+
+    if compress_flag and media_type == MediaType.VIDEO:
+        # Transcoding runs in the background; the original is served until
+        # the compressed rendition is swapped in
+        if ffmpeg_available():
+            job = enqueue(db, "transcode", resource_id=resource.id)
+            db.commit()
+            job_worker.notify()
+            response.headers["X-Job-Id"] = str(job.id)
+        else:
+            print("FFmpeg not found, skipping server-side compression")
+    if media_type == MediaType.IMAGE and pillow_available():
+        # Renditions are made in the background; until then their URLs
+        # redirect to the original
+        enqueue(db, "renditions", resource_id=resource.id)
+        db.commit()
+        job_worker.notify()
     db.refresh(resource)
     
     return resource
 
 @router.get("/{resource_id}/content")
-async def get_resource_content(
+def get_resource_content(
     resource_id: int,
     range: Optional[str] = Header(None),
+    if_range: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    v: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    resource = db.query(LearningResource).filter(LearningResource.id == resource_id).first()
+    resource = get_resource_entity(db, resource_id)
     if not resource:
         raise HTTPException(status_code=404, detail="Resource not found")
     
@@ -130,109 +199,192 @@ async def get_resource_content(
     elif resource.media_type == MediaType.DOC:
         content_type = "application/pdf"
 
-    if not resource.content:
-        # Fallback for old files on disk?
-        # If file_url starts with /uploads, try to read from disk
-        if resource.file_url and not resource.file_url.startswith("db://"):
-             # It's a legacy file path
-             file_path = os.path.join("backend", resource.file_url.lstrip("/"))
-             if os.path.exists(file_path):
-                 def iterfile():
-                     with open(file_path, mode="rb") as file_like:
-                         yield from file_like
-                 return StreamingResponse(iterfile(), media_type=content_type)
-        
-        raise HTTPException(status_code=404, detail="File content not found in DB")
-    
-    # Serve from DB content with Range support
-    file_size = len(resource.content)
-    
-    if range:
+    # Compressed payloads go out as stored to clients that accept the coding.
+    # Range requests always address the decoded bytes.
+    encoding = resource.content_encoding
+    passthrough = bool(encoding) and not range and accepts_encoding(accept_encoding, encoding)
+
+    # Validators come from the row alone, so a revalidation never opens the blob.
+    # Legacy rows without a hash only get Last-Modified. Each coding is its
+    # own representation and needs its own strong ETag.
+    etag = None
+    if resource.content_hash:
+        etag = strong_etag(f"{resource.content_hash}.{encoding}" if passthrough else resource.content_hash)
+    last_modified = resource.updated_at or resource.created_at
+    headers = {"Accept-Ranges": "bytes"}
+    if encoding:
+        headers["Vary"] = "Accept-Encoding"
+    if etag:
+        headers["ETag"] = etag
+    if last_modified:
+        headers["Last-Modified"] = http_date(last_modified)
+    # ?v=<hash> URLs are content-addressed: a new upload gets a new URL
+    immutable = etag is not None and v == resource.content_hash
+    headers["Cache-Control"] = CACHE_IMMUTABLE if immutable else CACHE_REVALIDATE
+
+    if not_modified(if_none_match, if_modified_since, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    blob = open_resource_blob(db, resource, decoded=not passthrough)
+    if blob is None:
+        raise HTTPException(status_code=404, detail="File content not found")
+    if passthrough:
+        headers["Content-Encoding"] = encoding
+        return range_response(blob, None, headers, content_type)
+
+    # Ranges per RFC 7233: suffix and multi-range requests, coalesced, with
+    # multipart/byteranges streamed part by part. Chunked/object-store blobs
+    # only read the pieces covering the requested bytes; local files go out
+    # via sendfile where the server supports it.
+    ranges = None
+    if range and if_range_matches(if_range, etag, last_modified):
         try:
-            start_str, end_str = range.replace("bytes=", "").split("-")
-            start = int(start_str)
-            end = int(end_str) if end_str else file_size - 1
-            
-            if start >= file_size:
-                 return Response(status_code=416) # Range Not Satisfiable
-                 
-            chunk_size = end - start + 1
-            # Slice the bytes
-            data = resource.content[start:end+1]
-            
-            headers = {
-                "Content-Range": f"bytes {start}-{end}/{file_size}",
-                "Accept-Ranges": "bytes",
-                "Content-Length": str(chunk_size),
-            }
-            
-            return Response(
-                content=data,
-                status_code=206,
-                headers=headers,
-                media_type=content_type
-            )
-        except ValueError:
-            pass # Fallback to full content if range parsing fails
+            ranges = parse_range(range, blob.size)
+        except RangeNotSatisfiable:
+            return not_satisfiable(blob.size, headers)
 
-    return Response(
-        content=resource.content, 
-        media_type=content_type,
-        headers={"Accept-Ranges": "bytes"}
-    )
+    return range_response(blob, ranges, headers, content_type)
+
+@router.get("/{resource_id}/renditions/{name}")
+def get_resource_rendition(
+    resource_id: int,
+    name: str,
+    if_none_match: Optional[str] = Header(None),
+    v: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    A downscaled JPEG of an image resource (see RENDITION_SIZES). Until the
+    background job has made it, and always without Pillow or for images
+    Pillow cannot read, redirects to the original; a missing rendition
+    queues that job rather than being made in the request.
+    """
+    if name not in RENDITION_SIZES:
+        raise HTTPException(status_code=404, detail="Rendition not found")
+    resource = get_resource_entity(db, resource_id)
+    if not resource or resource.media_type != MediaType.IMAGE:
+        raise HTTPException(status_code=404, detail="Resource not found")
+
+    rendition = fresh_renditions(db, resource).get(name)
+    if rendition is None and resource.content_hash and pillow_available():
+        if queue_renditions(db, resource):
+            db.commit()
+            job_worker.notify()
+    if rendition is None:
+        original = f"/api/resources/{resource_id}/content"
+        if resource.content_hash:
+            original += f"?v={resource.content_hash}"
+        return RedirectResponse(original, status_code=307)
 
-@router.get("", response_model=List[ResourceResponse])
-async def get_resources(
+    etag = strong_etag(rendition.content_hash)
+    # Renditions are derived from the original: versioned by its hash too
+    immutable = v is not None and v == resource.content_hash
+    headers = {"ETag": etag, "Cache-Control": CACHE_IMMUTABLE if immutable else CACHE_REVALIDATE}
+    if not_modified(if_none_match, None, etag):
+        return Response(status_code=304, headers=headers)
+    blob_row = db.get(MediaBlob, rendition.content_hash)
+    blob = open_stored(db, blob_row.storage_url) if blob_row else None
+    if blob is None:
+        raise HTTPException(status_code=404, detail="File content not found")
+    return range_response(blob, None, headers, "image/jpeg")
+
+def _revalidate(data, if_none_match: Optional[str], response: Response) -> Optional[Response]:
+    """
+    Weak-ETag a metadata response from the rows it would serialize. Returns a
+    304 when the client already has them, else tags `response` and returns None.
+    """
+    etag = weak_etag(data)
+    headers = {"ETag": etag, "Cache-Control": CACHE_REVALIDATE}
+    if not_modified(if_none_match, None, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+@router.get("", response_model=Union[ResourcePage, List[ResourceResponse]])
+def get_resources(
+    response: Response,
     category: Optional[str] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     timeline_mode: bool = False,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    unpaginated: bool = False,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
-    query = db.query(LearningResource)
-    
-    if category:
-        query = query.filter(LearningResource.category == category)
-    
-    if start_date:
-        query = query.filter(LearningResource.created_at >= start_date)
-    
-    if end_date:
-        query = query.filter(LearningResource.created_at <= end_date)
-    
-    resources = query.order_by(LearningResource.created_at.desc()).all()
-    
-    return resources
+    """
+    Resources newest first, one page at a time: {"items": [...], "next_cursor": ...}.
+    `unpaginated=true` returns the whole list as a bare array (legacy clients).
+    """
+    query = filter_resources(resource_metadata_query(db), category, start_date, end_date)
+
+    if unpaginated:
+        rows = query.order_by(LearningResource.created_at.desc(), LearningResource.id.desc()).all()
+        return _revalidate(rows, if_none_match, response) or rows
+
+    try:
+        items, next_cursor = paginate_resources(query, limit, cursor)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+    return _revalidate((items, next_cursor), if_none_match, response) or {"items": items, "next_cursor": next_cursor}
+
+@router.get("/search", response_model=List[SearchResult])
+def search_resources(
+    q: str = Query(..., min_length=1, max_length=200),
+    category: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    """Full-text search over title, key points and transcript, best match first."""
+    hits = search_resource_ids(db, q, category=category, limit=limit, offset=offset)
+    if not hits:
+        return []
+    rows = {
+        row.id: row
+        for row in resource_metadata_query(db).filter(LearningResource.id.in_([rid for rid, _ in hits]))
+    }
+    results = []
+    for resource_id, score in hits:
+        row = rows.get(resource_id)
+        if row is None:
+            continue
+        results.append(SearchResult(**row._mapping, score=score, highlights=highlights_for(row, q)))
+    return results
 
 @router.get("/timeline")
-async def get_timeline(
-    year: Optional[int] = None,
-    month: Optional[int] = None,
+def get_timeline(
+    year: Optional[int] = Query(None, ge=1, le=9998),
+    month: Optional[int] = Query(None, ge=1, le=12),
+    category: Optional[str] = None,
+    media_type: Optional[MediaType] = None,
     db: Session = Depends(get_db)
 ):
-    from sqlalchemy import func, extract, cast, Date
-    
-    # Use cast to Date for cross-database compatibility (SQLite/PostgreSQL)
-    date_col = cast(LearningResource.created_at, Date)
-    
-    query = db.query(
-        date_col.label('date'),
-        func.count().label('count')
-    ).group_by(
-        date_col
-    ).order_by('date')
-    
-    if year:
-        query = query.filter(extract('year', LearningResource.created_at) == year)
-    if month:
-        query = query.filter(extract('month', LearningResource.created_at) == month)
-    
-    timeline = query.all()
+    """
+    Resources created per day, read from the resource_daily_counts rollup:
+    cost grows with the number of days shown, not the number of resources.
+    """
+    start = end = None
+    month_of_year = None
+    if year and month:
+        start = date(year, month, 1)
+        end = date(year + month // 12, month % 12 + 1, 1)
+    elif year:
+        start, end = date(year, 1, 1), date(year + 1, 1, 1)
+    elif month:
+        # The same month across all years
+        month_of_year = month
+
+    timeline = daily_counts(db, start, end, category=category, media_type=media_type, month_of_year=month_of_year)
     
     return [{"date": row.date, "count": row.count} for row in timeline]
 
-@router.get("/timeline/{date}")
-async def get_resources_by_date(
+@router.get("/timeline/{date}", response_model=List[ResourceResponse])
+def get_resources_by_date(
     date: str,
     db: Session = Depends(get_db)
 ):
@@ -241,30 +393,52 @@ async def get_resources_by_date(
     target_date = datetime.strptime(date, '%Y-%m-%d')
     next_date = target_date + timedelta(days=1)
     
-    resources = db.query(LearningResource).filter(
+    resources = resource_metadata_query(db).filter(
         LearningResource.created_at >= target_date,
         LearningResource.created_at < next_date
     ).order_by(LearningResource.created_at.desc()).all()
     
     return resources
 
+@router.get("/export")
+def export_resources(
+    format: str = Query("zip", pattern="^(zip|tar)$"),
+    category: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Download the resources matching the list filters as a zip or tar with a
+    manifest.jsonl of their metadata, streamed one stored chunk at a time.
+    Load it back with scripts/archive.py import.
+    """
+    filename = f"medstudy-export-{date.today():%Y%m%d}.{format}"
+    return StreamingResponse(
+        export_archive(db.get_bind(), format, category, start_date, end_date),
+        media_type=ARCHIVE_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 @router.get("/{resource_id}", response_model=ResourceResponse)
-async def get_resource(
+def get_resource(
     resource_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
-    resource = db.query(LearningResource).filter(LearningResource.id == resource_id).first()
+    resource = cached_resource(db, resource_id)
     if not resource:
         raise HTTPException(status_code=404, detail="资源不存在")
-    return resource
+    return _revalidate(resource, if_none_match, response) or resource
 
 @router.put("/{resource_id}", response_model=ResourceResponse)
-async def update_resource(
+def update_resource(
     resource_id: int,
     update_data: ResourceUpdate,
     db: Session = Depends(get_db)
 ):
-    resource = db.query(LearningResource).filter(LearningResource.id == resource_id).first()
+    resource = get_resource_entity(db, resource_id)
     if not resource:
         raise HTTPException(status_code=404, detail="资源不存在")
     
@@ -282,8 +456,10 @@ async def update_resource(
         
         resource.title = update_data.title
     
-    if update_data.category:
+    if update_data.category and update_data.category != resource.category:
+        old_category = resource.category
         resource.category = update_data.category
+        count_recategorized(db, resource, old_category)
     
     if update_data.key_points is not None:
         resource.key_points = update_data.key_points
@@ -294,27 +470,40 @@ async def update_resource(
     if update_data.transcript is not None:
         resource.transcript = update_data.transcript
     
+    index_resource(db, resource)
+    forget_findings(db, resource.id)
     db.commit()
+    resource_cache.invalidate(resource.id)
     db.refresh(resource)
     
     return resource
 
 @router.delete("/{resource_id}")
-async def delete_resource(
+def delete_resource(
     resource_id: int,
     db: Session = Depends(get_db)
 ):
-    resource = db.query(LearningResource).filter(LearningResource.id == resource_id).first()
+    resource = get_resource_entity(db, resource_id)
     if not resource:
         raise HTTPException(status_code=404, detail="资源不存在")
     
+    # Bytes shared with other resources stay until the last reference goes
+    cleanups = [release_resource_bytes(db, resource), *release_renditions(db, resource.id)]
+    unindex_resource(db, resource.id)
+    forget_findings(db, resource.id)
+    count_deleted(db, resource)
     db.delete(resource)
     db.commit()
+    resource_cache.invalidate(resource_id)
+    # Only remove external bytes once the row is gone for good
+    for cleanup in cleanups:
+        if cleanup:
+            cleanup()
     
     return {"message": "删除成功"}
 
 @router.post("/check-privacy")
-async def check_privacy(
+def check_privacy(
     title: str,
     content: Optional[str] = None
 ) -> PrivacyAlert:
@@ -1,21 +1,31 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import Optional
 from datetime import datetime, timedelta, timezone
 import secrets
 
 from app.core.config import get_db
-from app.models.database import LearningResource, ShareLink
-from app.schemas.schemas import ShareLinkCreate, ShareLinkResponse, ResourceResponse
+from app.core.cache import cached_resource
+from app.core.queries import get_resource_metadata
+from app.core.share_access import share_access_buffer
+from app.core.share_tokens import (
+    InvalidShareToken,
+    is_signed_token,
+    share_denylist,
+    sign_share_token,
+    signing_enabled,
+    verify_share_token,
+)
+from app.models.database import ShareLink
+from app.schemas.schemas import ShareLinkCreate, ShareLinkResponse
 
 router = APIRouter(prefix="/api/shares", tags=["shares"])
 
 @router.post("", response_model=ShareLinkResponse)
-async def create_share_link(
+def create_share_link(
     share_data: ShareLinkCreate,
     db: Session = Depends(get_db)
 ):
-    resource = db.query(LearningResource).filter(LearningResource.id == share_data.resource_id).first()
+    resource = get_resource_metadata(db, share_data.resource_id)
     if not resource:
         raise HTTPException(status_code=404, detail="资源不存在")
     
@@ -32,16 +42,23 @@ async def create_share_link(
     )
     
     db.add(share_link)
+    if signing_enabled():
+        # The signed token names the link row, so it needs the id first
+        db.flush()
+        share_link.share_token = sign_share_token(share_link.id, share_link.resource_id, expires_at)
     db.commit()
     db.refresh(share_link)
     
     return share_link
 
 @router.get("/{token}")
-async def get_shared_resource(
+def get_shared_resource(
     token: str,
     db: Session = Depends(get_db)
 ):
+    if signing_enabled() and is_signed_token(token):
+        return _get_signed_share(token, db)
+
     share_link = db.query(ShareLink).filter(ShareLink.share_token == token).first()
     
     if not share_link:
@@ -58,47 +75,70 @@ async def get_shared_resource(
     if now > expires_at:
         raise HTTPException(status_code=410, detail="分享链接已过期")
     
-    resource = db.query(LearningResource).filter(LearningResource.id == share_link.resource_id).first()
+    resource = cached_resource(db, share_link.resource_id)
     if not resource:
         raise HTTPException(status_code=404, detail="资源不存在")
     
-    try:
-        share_link.access_count += 1
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        print(f"Error updating access count: {e}")
-        # Continue even if counting fails, or log it. 
-        # But for now let's just log and continue to allow access.
-    
-    try:
-        resource_data = ResourceResponse.model_validate(resource)
-    except Exception as e:
-        print(f"Error validating resource data: {e}")
-        # Log the detailed error for debugging
-        raise HTTPException(status_code=500, detail=f"Internal Data Error: {str(e)}")
+    # Counted in memory and written in batches; see app.core.share_access
+    share_access_buffer.record(share_link.id, share_link.resource_id)
 
     return {
-        "resource": resource_data,
+        "resource": resource,
         "disclaimer": "此资料仅供学术探讨，严禁外传",
         "share_info": {
             "expires_at": share_link.expires_at,
-            "access_count": share_link.access_count
+            "access_count": (share_link.access_count or 0) + share_access_buffer.pending(share_link.id)
+        }
+    }
+
+def _get_signed_share(token: str, db: Session):
+    """
+    Resolve a signed token from the token itself: signature, expiry and
+    revocation are checked in memory, and the resource usually comes from
+    the metadata cache. The access count comes from share_access_buffer,
+    which reads a link's stored count once per process.
+    """
+    try:
+        share = verify_share_token(token)
+    except InvalidShareToken:
+        raise HTTPException(status_code=404, detail="分享链接不存在或已失效")
+
+    if datetime.now(timezone.utc) > share.expires_at:
+        raise HTTPException(status_code=410, detail="分享链接已过期")
+
+    if share_denylist.is_revoked(share.link_id):
+        raise HTTPException(status_code=404, detail="分享链接不存在或已失效")
+
+    resource = cached_resource(db, share.resource_id)
+    if not resource:
+        raise HTTPException(status_code=404, detail="资源不存在")
+
+    share_access_buffer.record(share.link_id, share.resource_id)
+
+    return {
+        "resource": resource,
+        "disclaimer": "此资料仅供学术探讨，严禁外传",
+        "share_info": {
+            "expires_at": share.expires_at,
+            "access_count": share_access_buffer.count(share.link_id)
         }
     }
 
 @router.delete("/{token}")
-async def revoke_share_link(
+def revoke_share_link(
     token: str,
     db: Session = Depends(get_db)
 ):
     share_link = db.query(ShareLink).filter(ShareLink.share_token == token).first()
     if share_link:
+        if is_signed_token(token):
+            # Deleting the row alone would not stop a token that is never looked up
+            share_denylist.revoke(db, share_link.id, share_link.expires_at)
         db.delete(share_link)
         db.commit()
         return {"message": "分享链接已撤销"}
     raise HTTPException(status_code=404, detail="分享链接不存在")
 
 @router.get("", response_model=list[ShareLinkResponse])
-async def list_share_links(db: Session = Depends(get_db)):
+def list_share_links(db: Session = Depends(get_db)):
     return db.query(ShareLink).all()
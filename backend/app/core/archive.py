@@ -0,0 +1,220 @@
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import STORAGE_CHUNK_SIZE
+from app.core.bulk_import import ImportItem
+from app.core.queries import filter_resources, resource_metadata_query
+from app.models.database import LearningResource, MediaType
+from app.storage import open_resource_blob
+from app.storage.base import safe_filename
+
+# Archives hold one member per resource under files/ and, last, a
+# manifest.jsonl with one metadata line per member. Both formats are
+# produced as a stream: tar headers carry the stored size up front, zip
+# members use data descriptors, so nothing is buffered beyond one chunk.
+
+MANIFEST_NAME = "manifest.jsonl"
+ARCHIVE_MEDIA_TYPES = {"zip": "application/zip", "tar": "application/x-tar"}
+EXPORT_PAGE_SIZE = 100
+
+# Metadata carried in the manifest; file_url is storage-specific and dropped
+MANIFEST_FIELDS = (
+    "id", "title", "category", "media_type", "size", "duration", "width", "height",
+    "key_points", "patient_anonymized", "transcript", "created_at", "content_hash",
+)
+
+class _Member(NamedTuple):
+    name: str
+    size: int
+    mtime: datetime
+    chunks: Iterable[bytes]
+
+def _utc(value: Optional[datetime]) -> datetime:
+    if value is None:
+        return datetime.now(timezone.utc)
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+def _member_name(row) -> str:
+    extension = os.path.splitext(safe_filename(row.file_url))[1]
+    return f"files/{row.id}{extension}"
+
+def _manifest_line(row, name: str) -> bytes:
+    entry = {field: getattr(row, field) for field in MANIFEST_FIELDS}
+    entry["media_type"] = getattr(entry["media_type"], "value", entry["media_type"])
+    entry["created_at"] = entry["created_at"].isoformat() if entry["created_at"] else None
+    entry["file"] = name
+    return (json.dumps(entry, ensure_ascii=False) + "\n").encode()
+
+def _members(bind: Engine, category, start_date, end_date) -> Iterator[_Member]:
+    """Every matching resource's bytes, then the manifest, one blob open at a time."""
+    last_id = 0
+    with tempfile.SpooledTemporaryFile(max_size=STORAGE_CHUNK_SIZE) as manifest, Session(bind=bind) as db:
+        while True:
+            # A short read transaction per page, not one for the whole download
+            rows = (
+                filter_resources(resource_metadata_query(db), category, start_date, end_date)
+                .filter(LearningResource.id > last_id)
+                .order_by(LearningResource.id)
+                .limit(EXPORT_PAGE_SIZE)
+                .all()
+            )
+            db.close()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            for row in rows:
+                blob = open_resource_blob(db, row)
+                db.close()
+                if blob is None:
+                    print(f"Export: resource {row.id} has no stored bytes, skipped")
+                    continue
+                name = _member_name(row)
+                chunks = blob.iter_range(0, blob.size - 1) if blob.size else iter(())
+                yield _Member(name, blob.size, _utc(row.created_at), chunks)
+                manifest.write(_manifest_line(row, name))
+
+        size = manifest.tell()
+        manifest.seek(0)
+        chunks = iter(lambda: manifest.read(STORAGE_CHUNK_SIZE), b"")
+        yield _Member(MANIFEST_NAME, size, datetime.now(timezone.utc), chunks)
+
+def _tar_stream(members: Iterable[_Member]) -> Iterator[bytes]:
+    written = 0
+    for member in members:
+        info = tarfile.TarInfo(member.name)
+        info.size = member.size
+        info.mtime = int(member.mtime.timestamp())
+        info.mode = 0o644
+        header = info.tobuf(format=tarfile.PAX_FORMAT, encoding="utf-8")
+        yield header
+        remaining = member.size
+        for chunk in member.chunks:
+            remaining -= len(chunk)
+            yield chunk
+        if remaining != 0:
+            # The header already promised member.size bytes
+            raise IOError(f"{member.name} changed size while being exported")
+        padding = -member.size % tarfile.BLOCKSIZE
+        yield b"\0" * padding
+        written += len(header) + member.size + padding
+    # Two empty blocks end the archive; pad to a whole record like tarfile does
+    end = 2 * tarfile.BLOCKSIZE
+    end += -(written + end) % tarfile.RECORDSIZE
+    yield b"\0" * end
+
+class _Pipe:
+    """Write-only sink zipfile streams into; what it wrote is drained as chunks."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> Iterator[bytes]:
+        chunks, self.chunks = self.chunks, []
+        return iter(chunks)
+
+def _zip_stream(members: Iterable[_Member]) -> Iterator[bytes]:
+    pipe = _Pipe()
+    # No tell()/seek(): zipfile writes data descriptors instead of going back
+    # to patch local headers. Media is already compressed, so store it.
+    with zipfile.ZipFile(pipe, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for member in members:
+            info = zipfile.ZipInfo(member.name, member.mtime.timetuple()[:6])
+            info.file_size = member.size
+            with archive.open(info, "w", force_zip64=member.size >= zipfile.ZIP64_LIMIT) as f:
+                for chunk in member.chunks:
+                    f.write(chunk)
+                    yield from pipe.drain()
+            yield from pipe.drain()
+    yield from pipe.drain()
+
+def export_archive(
+    bind: Engine,
+    archive_format: str = "zip",
+    category: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> Iterator[bytes]:
+    """
+    Stream a zip or tar of the resources matching the list filters, plus
+    their manifest. Reads and yields one storage chunk at a time, so it can
+    feed a StreamingResponse; it opens its own session, since the request's
+    is closed before the body is sent.
+    """
+    members = _members(bind, category, start_date, end_date)
+    if archive_format == "tar":
+        return _tar_stream(members)
+    if archive_format == "zip":
+        return _zip_stream(members)
+    raise ValueError(f"unknown archive format {archive_format!r}")
+
+@contextmanager
+def open_archive(path: str) -> Iterator[Tuple[Iterator[ImportItem], bool]]:
+    """
+    Import items for an archive written by export_archive, read back from
+    its manifest, and whether members may be read from several threads at
+    once (zip yes, tar no). The archive stays open until the block exits.
+    """
+    if zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        read_member, parallel = archive.open, True
+        names = set(archive.namelist())
+    else:
+        archive = tarfile.open(path)
+        read_member, parallel = archive.extractfile, False
+        names = set(archive.getnames())
+
+    with archive, tempfile.SpooledTemporaryFile(max_size=STORAGE_CHUNK_SIZE) as manifest:
+        if MANIFEST_NAME not in names:
+            raise ValueError(f"{path}: no {MANIFEST_NAME}, not an exported archive")
+        # Copied out first: the manifest is read while reader threads are
+        # pulling members from the same archive file
+        with read_member(MANIFEST_NAME) as f:
+            shutil.copyfileobj(f, manifest, STORAGE_CHUNK_SIZE)
+        manifest.seek(0)
+
+        def items():
+            for line, text in enumerate(manifest, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    entry = json.loads(text)
+                    name = entry["file"]
+                    created_at = entry.get("created_at")
+                    item = ImportItem(
+                        key=name,
+                        path=name,
+                        title=entry["title"],
+                        category=entry["category"],
+                        media_type=MediaType(entry["media_type"]),
+                        key_points=entry.get("key_points"),
+                        transcript=entry.get("transcript"),
+                        patient_anonymized=bool(entry.get("patient_anonymized")),
+                        duration=entry.get("duration"),
+                        created_at=datetime.fromisoformat(created_at) if created_at else None,
+                        opener=lambda name=name: read_member(name),
+                        size=entry.get("size"),
+                    )
+                except (ValueError, KeyError, TypeError) as e:
+                    raise ValueError(f"{path}:{MANIFEST_NAME}:{line}: {e}")
+                if name not in names:
+                    raise ValueError(f"{path}: {name} is listed in the manifest but missing")
+                yield item
+
+        yield items(), parallel
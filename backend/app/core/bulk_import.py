@@ -0,0 +1,353 @@
+import csv
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import BinaryIO, Callable, Iterable, Iterator, List, NamedTuple, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    BULK_IMPORT_BATCH_BYTES,
+    BULK_IMPORT_BATCH_SIZE,
+    BULK_IMPORT_WORKERS,
+    MAX_UPLOAD_SIZE,
+    SessionLocal,
+)
+from app.core.jobs import enqueue
+from app.core.mp4 import MediaInfo, ingest_media
+from app.core.privacy import PrivacyDetector
+from app.core.renditions import pillow_available
+from app.core.rollups import count_created
+from app.core.search import index_resource
+from app.models.database import LearningResource, MediaType
+from app.storage import get_default_backend
+from app.storage.blobs import store_deduplicated
+
+MEDIA_TYPES_BY_EXTENSION = {
+    **dict.fromkeys((".mp4", ".mov", ".m4v", ".webm", ".mkv", ".avi"), MediaType.VIDEO),
+    **dict.fromkeys((".mp3", ".m4a", ".aac", ".wav", ".ogg", ".flac"), MediaType.AUDIO),
+    **dict.fromkeys((".jpg", ".jpeg", ".png", ".gif", ".webp", ".bmp"), MediaType.IMAGE),
+    **dict.fromkeys((".pdf", ".doc", ".docx", ".ppt", ".pptx", ".xls", ".xlsx", ".txt"), MediaType.DOC),
+}
+
+class ImportItem(NamedTuple):
+    key: str  # identifies the item in the checkpoint file
+    path: str
+    title: str
+    category: str
+    media_type: MediaType
+    key_points: Optional[str] = None
+    transcript: Optional[str] = None
+    patient_anonymized: bool = False
+    duration: Optional[int] = None
+    # Kept from an exported archive; new imports are stamped now
+    created_at: Optional[datetime] = None
+    # For items that are not plain files (archive members): how to read
+    # them, and their size if known
+    opener: Optional[Callable[[], BinaryIO]] = None
+    size: Optional[int] = None
+
+class _Prepared(NamedTuple):
+    item: ImportItem
+    source: Optional[BinaryIO] = None
+    reader: Optional[BinaryIO] = None
+    info: Optional[MediaInfo] = None
+    error: Optional[str] = None
+
+def media_type_for(path: str) -> Optional[MediaType]:
+    return MEDIA_TYPES_BY_EXTENSION.get(os.path.splitext(path)[1].lower())
+
+def _title_for(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+def scan_directory(root: str, category: Optional[str] = None) -> Iterator[ImportItem]:
+    """
+    Every file under `root` with a known media extension, in a stable order.
+    The title is the file name; the category is `category` or else the
+    top-level folder the file sits in.
+    """
+    root = os.path.abspath(root)
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        relative_dir = os.path.relpath(dirpath, root)
+        folder = os.path.basename(root) if relative_dir == "." else relative_dir.split(os.sep)[0]
+        for filename in sorted(filenames):
+            media_type = media_type_for(filename)
+            if media_type is None or filename.startswith("."):
+                continue
+            path = os.path.join(dirpath, filename)
+            yield ImportItem(
+                key=os.path.relpath(path, root).replace(os.sep, "/"),
+                path=path,
+                title=_title_for(filename),
+                category=category or folder,
+                media_type=media_type,
+            )
+
+def _manifest_rows(path: str) -> Iterator[tuple]:
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            # Line 1 is the header
+            for line, row in enumerate(csv.DictReader(f), start=2):
+                yield line, row
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line, text in enumerate(f, start=1):
+                if text.strip():
+                    try:
+                        yield line, json.loads(text)
+                    except ValueError as e:
+                        raise ValueError(f"{path}:{line}: invalid JSON ({e})")
+
+def read_manifest(path: str, category: Optional[str] = None) -> Iterator[ImportItem]:
+    """
+    Items listed in a CSV (with a header row) or JSONL manifest. Each row
+    needs `path`, relative to the manifest or absolute; `title`, `category`,
+    `media_type`, `key_points`, `transcript`, `patient_anonymized` and
+    `duration` are optional and default as in scan_directory.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    for line, row in _manifest_rows(path):
+        row = {k.strip(): v for k, v in row.items() if k and v not in (None, "")}
+        if "path" not in row:
+            raise ValueError(f"{path}:{line}: missing 'path'")
+        file_path = os.path.join(base, row["path"])
+        try:
+            media_type = MediaType(str(row["media_type"]).upper()) if "media_type" in row \
+                else media_type_for(file_path)
+            duration = int(row["duration"]) if "duration" in row else None
+        except ValueError as e:
+            raise ValueError(f"{path}:{line}: {e}")
+        if media_type is None:
+            raise ValueError(f"{path}:{line}: unknown media type for {row['path']}")
+        anonymized = row.get("patient_anonymized", False)
+        if isinstance(anonymized, str):
+            anonymized = anonymized.strip().lower() in {"true", "1", "yes", "on"}
+        yield ImportItem(
+            key=row["path"],
+            path=file_path,
+            title=row.get("title") or _title_for(file_path),
+            category=row.get("category") or category or os.path.basename(base),
+            media_type=media_type,
+            key_points=row.get("key_points"),
+            transcript=row.get("transcript"),
+            patient_anonymized=bool(anonymized),
+            duration=duration,
+        )
+
+class Checkpoint:
+    """
+    Append-only JSONL record of imported items ({"key": ..., "resource_id": ...}).
+    Lines are written only after their batch commits, so every key in the
+    file is in the database. A crash between the commit and the write can
+    leave at most that one batch to be imported again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Set[str]:
+        if not os.path.exists(self.path):
+            return set()
+        done = set()
+        with open(self.path, encoding="utf-8") as f:
+            for text in f:
+                try:
+                    done.add(json.loads(text)["key"])
+                except (ValueError, KeyError):
+                    # A line torn by a crash mid-write
+                    continue
+        return done
+
+    def record(self, entries: List[tuple]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for key, resource_id in entries:
+                f.write(json.dumps({"key": key, "resource_id": resource_id}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+def _open(item: ImportItem) -> _Prepared:
+    source = item.opener() if item.opener else open(item.path, "rb")
+    reader, info = source, None
+    if item.media_type in (MediaType.VIDEO, MediaType.AUDIO):
+        try:
+            reader, info = ingest_media(source)
+        except Exception:
+            source.close()
+            raise
+    return _Prepared(item, source, reader, info)
+
+def _prepare(item: ImportItem) -> _Prepared:
+    """
+    Reader thread: privacy and size checks. Plain files are also opened and
+    probed here, and the kernel is asked to read them ahead, so the writer
+    rarely waits on the source disk or share; their bytes are read once,
+    straight into storage. Archive members share one file handle and are
+    opened by the writer instead.
+    """
+    risk, alerts = PrivacyDetector.check_title(item.title)
+    if risk == PrivacyDetector.RISK_HIGH:
+        return _Prepared(item, error="检测到可能的患者隐私信息: " + "; ".join(alerts))
+    try:
+        size = item.size if item.opener else os.path.getsize(item.path)
+        if MAX_UPLOAD_SIZE and size is not None and size > MAX_UPLOAD_SIZE:
+            return _Prepared(item, error=f"文件超过大小上限 {MAX_UPLOAD_SIZE} 字节")
+        if item.opener:
+            return _Prepared(item)
+        prepared = _open(item)
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(prepared.source.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+        return prepared
+    except Exception as e:
+        # Unreadable files fail on their own
+        return _Prepared(item, error=str(e))
+
+def _store(db: Session, storage, prepared: _Prepared, written: List[str]) -> LearningResource:
+    item, info = prepared.item, prepared.info
+    duration = item.duration
+    if info is not None and info.duration is not None:
+        duration = round(info.duration)
+    resource = LearningResource(
+        title=item.title,
+        category=item.category,
+        media_type=item.media_type,
+        file_url="",
+        size=0,
+        duration=duration,
+        width=info.width if info else None,
+        height=info.height if info else None,
+        key_points=item.key_points,
+        patient_anonymized=item.patient_anonymized,
+        transcript=item.transcript or "",
+        created_at=item.created_at,
+    )
+    db.add(resource)
+    db.flush()
+    key = storage.new_key(resource.id, os.path.basename(item.path))
+    written.append(key)
+    blob = store_deduplicated(db, storage, key, prepared.reader, max_size=MAX_UPLOAD_SIZE, media_type=item.media_type)
+    resource.file_url = blob.storage_url
+    resource.content_hash = blob.sha256
+    resource.content_encoding = blob.encoding
+    resource.size = blob.size
+    index_resource(db, resource)
+    count_created(db, resource)
+    if item.media_type == MediaType.IMAGE and pillow_available():
+        enqueue(db, "renditions", resource_id=resource.id)
+    return resource
+
+def run_bulk_import(
+    items: Iterable[ImportItem],
+    checkpoint: Optional[Checkpoint] = None,
+    session_factory=SessionLocal,
+    workers: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    batch_bytes: Optional[int] = None,
+    report: Callable[[str], None] = print,
+) -> dict:
+    """
+    Import files as resources.
+
+    Reader threads check and open files ahead (bounded to two files per
+    thread) while this thread streams each file, hashing it on the way,
+    into the configured storage backend, the only writer the database
+    sees. Each item runs in a savepoint, so a bad file is reported
+    without losing its batch; a batch commits every `batch_size` files
+    or `batch_bytes` bytes and is then recorded in the checkpoint, which
+    a rerun uses to skip everything already imported.
+    """
+    workers = workers or BULK_IMPORT_WORKERS
+    batch_size = batch_size or BULK_IMPORT_BATCH_SIZE
+    batch_bytes = batch_bytes or BULK_IMPORT_BATCH_BYTES
+    done = checkpoint.load() if checkpoint else set()
+    stats = {"imported": 0, "skipped": 0, "failed": 0, "bytes": 0}
+    failures = []
+    started = time.monotonic()
+
+    def todo():
+        for item in items:
+            if item.key in done:
+                stats["skipped"] += 1
+                continue
+            done.add(item.key)
+            yield item
+
+    with session_factory() as db, ThreadPoolExecutor(max_workers=workers) as pool:
+        storage = get_default_backend(db)
+        batch: List[tuple] = []
+        written: List[str] = []
+        pending_bytes = 0
+
+        def commit():
+            nonlocal batch, written, pending_bytes
+            if not batch:
+                return
+            try:
+                db.commit()
+            except Exception:
+                db.rollback()
+                if storage.scheme != "db":
+                    for key in written:
+                        storage.delete(key)
+                raise
+            if checkpoint:
+                checkpoint.record(batch)
+            stats["imported"] += len(batch)
+            stats["bytes"] += pending_bytes
+            batch, written, pending_bytes = [], [], 0
+            elapsed = max(time.monotonic() - started, 1e-9)
+            report(
+                f"Imported {stats['imported']} files, {stats['bytes'] / 1e6:.1f} MB in {elapsed:.1f}s "
+                f"({stats['imported'] / elapsed:.1f} files/s, {stats['bytes'] / 1e6 / elapsed:.1f} MB/s)"
+            )
+
+        def store(prepared: _Prepared):
+            nonlocal pending_bytes
+            item = prepared.item
+            if prepared.error:
+                stats["failed"] += 1
+                failures.append((item.key, prepared.error))
+                report(f"Skipped {item.key}: {prepared.error}")
+                return
+            item_keys: List[str] = []
+            try:
+                if prepared.source is None:
+                    prepared = _open(item)
+                with db.begin_nested():
+                    resource = _store(db, storage, prepared, item_keys)
+                batch.append((item.key, resource.id))
+                written.extend(item_keys)
+                pending_bytes += resource.size
+            except Exception as e:
+                if storage.scheme != "db":
+                    for key in item_keys:
+                        storage.delete(key)
+                stats["failed"] += 1
+                failures.append((item.key, str(e)))
+                report(f"Failed {item.key}: {e}")
+            finally:
+                if prepared.source is not None:
+                    prepared.source.close()
+            if len(batch) >= batch_size or pending_bytes >= batch_bytes:
+                commit()
+
+        in_flight = deque()
+        for item in todo():
+            in_flight.append(pool.submit(_prepare, item))
+            if len(in_flight) >= workers * 2:
+                store(in_flight.popleft().result())
+        while in_flight:
+            store(in_flight.popleft().result())
+        commit()
+
+    elapsed = time.monotonic() - started
+    stats["seconds"] = round(elapsed, 3)
+    stats["failures"] = failures
+    report(
+        f"Bulk import finished: {stats['imported']} imported, {stats['skipped']} already done, "
+        f"{stats['failed']} failed in {elapsed:.1f}s"
+    )
+    return stats
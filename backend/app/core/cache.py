@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import METADATA_CACHE_SIZE, METADATA_CACHE_TTL
+from app.core.queries import get_resource_metadata
+from app.schemas.schemas import ResourceResponse
+
+class MetadataCache:
+    """
+    Bounded LRU of validated response objects, each entry living `ttl` seconds.
+
+    Writers call invalidate() after committing. A load that started before
+    an invalidation is not stored, so a reader racing a writer cannot put
+    the old row back. Invalidation only reaches this process; with several
+    worker processes the TTL bounds how long another worker serves stale data.
+    """
+
+    def __init__(self, name: str, max_size: Optional[int] = None, ttl: Optional[float] = None):
+        self.name = name
+        self.max_size = METADATA_CACHE_SIZE if max_size is None else max_size
+        self.ttl = METADATA_CACHE_TTL if ttl is None else ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl > 0
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Cached value for `key`, else loader()'s result (None is never cached)."""
+        if not self.enabled:
+            return loader()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            generation = self._generation
+
+        value = loader()
+        if value is None:
+            return None
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (now + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one entry, or everything when `key` is None."""
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+# ResourceResponse by resource id
+resource_cache = MetadataCache("resources")
+# The full category list under a single key
+category_cache = MetadataCache("categories")
+
+def cached_resource(db: Session, resource_id: int) -> Optional[ResourceResponse]:
+    def load():
+        row = get_resource_metadata(db, resource_id)
+        return ResourceResponse.model_validate(row) if row else None
+    return resource_cache.get_or_load(resource_id, load)
+
+def cache_stats() -> dict:
+    return {cache.name: cache.stats() for cache in (resource_cache, category_cache)}
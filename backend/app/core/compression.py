@@ -0,0 +1,130 @@
+import base64
+import importlib.util
+import zlib
+from typing import Iterable, Iterator, Optional, Union
+
+from app.core.config import (
+    STORAGE_CHUNK_SIZE,
+    STORAGE_COMPRESS_TYPES,
+    STORAGE_COMPRESSION,
+    STORAGE_COMPRESSION_LEVEL,
+    TEXT_COMPRESSION_MIN_BYTES,
+)
+
+# Codecs are named after their HTTP content-coding tokens, so a stored
+# payload can be sent as-is with Content-Encoding.
+GZIP = "gzip"
+ZSTD = "zstd"
+
+# Leading bytes of formats that are compressed already: zip containers
+# (docx, pptx, xlsx, epub), gzip, zstd, xz, bzip2, 7z, rar, JPEG, PNG, GIF,
+# RIFF (webp, avi), MP3, Ogg, FLAC. MP4/MOV are recognised by their ftyp box.
+COMPRESSED_SIGNATURES = (
+    b"PK\x03\x04", b"\x1f\x8b", b"\x28\xb5\x2f\xfd", b"\xfd7zXZ\x00", b"BZh", b"7z\xbc\xaf\x27\x1c",
+    b"Rar!", b"\xff\xd8\xff", b"\x89PNG", b"GIF8", b"RIFF", b"ID3", b"OggS", b"fLaC",
+)
+# A payload is only compressed when a sample of its head shrinks this much
+MIN_SAVING = 0.1
+
+# Compressed text columns outside SQLite are stored as this marker plus
+# base64, since TEXT cannot hold raw bytes there
+TEXT_MARKER = "\x1bz:"
+
+def zstd_available() -> bool:
+    return importlib.util.find_spec("zstandard") is not None
+
+def storage_codec() -> Optional[str]:
+    """The codec new payloads are written with, None when compression is off."""
+    if STORAGE_COMPRESSION in ("off", "none", "false", "0", ""):
+        return None
+    if STORAGE_COMPRESSION in ("auto", ZSTD) and zstd_available():
+        return ZSTD
+    # gzip is in the standard library, so it is always there to fall back to
+    return GZIP
+
+def _compressor(codec: str):
+    if codec == ZSTD:
+        import zstandard
+        return zstandard.ZstdCompressor(level=STORAGE_COMPRESSION_LEVEL or 3).compressobj()
+    # wbits 31: gzip framing, which is what Content-Encoding: gzip means
+    return zlib.compressobj(STORAGE_COMPRESSION_LEVEL or 6, zlib.DEFLATED, 31)
+
+def _decompressor(codec: str):
+    if codec == ZSTD:
+        import zstandard
+        return zstandard.ZstdDecompressor().decompressobj()
+    if codec == GZIP:
+        return zlib.decompressobj(31)
+    raise ValueError(f"unknown content coding {codec!r}")
+
+def compress_chunks(chunks: Iterable[bytes], codec: str) -> Iterator[bytes]:
+    compressor = _compressor(codec)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def decompress_chunks(chunks: Iterable[bytes], codec: str, max_chunk: int = STORAGE_CHUNK_SIZE) -> Iterator[bytes]:
+    decompressor = _decompressor(codec)
+    for chunk in chunks:
+        if codec == GZIP:
+            # Text inflates a lot; hand it out in bounded pieces
+            data = decompressor.decompress(chunk, max_chunk)
+            while data:
+                yield data
+                data = decompressor.decompress(decompressor.unconsumed_tail, max_chunk)
+            continue
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    tail = getattr(decompressor, "flush", lambda: b"")()
+    if tail:
+        yield tail
+
+def worth_compressing(media_type, head: bytes) -> bool:
+    """Whether a payload of `media_type` starting with `head` should be compressed."""
+    if getattr(media_type, "value", media_type) not in STORAGE_COMPRESS_TYPES or not head:
+        return False
+    if head.startswith(COMPRESSED_SIGNATURES) or head[4:8] == b"ftyp":
+        return False
+    # Cheapest level: only the ratio matters here
+    return len(zlib.compress(head, 1)) <= len(head) * (1 - MIN_SAVING)
+
+def _codec_of(data: bytes) -> Optional[str]:
+    if data.startswith(b"\x1f\x8b"):
+        return GZIP
+    if data.startswith(b"\x28\xb5\x2f\xfd"):
+        return ZSTD
+    return None
+
+def compress_text(value: Optional[str], binary: bool) -> Union[str, bytes, None]:
+    """
+    Compress a long text column value. Returns bytes when the database can
+    store them in a TEXT column (`binary`, SQLite), else marker + base64;
+    short or incompressible text is returned unchanged.
+    """
+    codec = storage_codec()
+    if value is None or codec is None:
+        return value
+    encoded = value.encode("utf-8")
+    if len(encoded) < TEXT_COMPRESSION_MIN_BYTES:
+        return value
+    data = b"".join(compress_chunks([encoded], codec))
+    if not binary:
+        packed = TEXT_MARKER + base64.b64encode(data).decode("ascii")
+        return packed if len(packed) <= len(encoded) * (1 - MIN_SAVING) else value
+    return data if len(data) <= len(encoded) * (1 - MIN_SAVING) else value
+
+def decompress_text(value: Union[str, bytes, None]) -> Optional[str]:
+    """Inverse of compress_text; plain text (rows written before compression) passes through."""
+    if isinstance(value, str):
+        if not value.startswith(TEXT_MARKER):
+            return value
+        value = base64.b64decode(value[len(TEXT_MARKER):])
+    if value is None:
+        return None
+    codec = _codec_of(value)
+    if codec is None:
+        return bytes(value).decode("utf-8")
+    return b"".join(decompress_chunks([value], codec)).decode("utf-8")
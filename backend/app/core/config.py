@@ -12,16 +12,34 @@ DATABASE_URL = os.getenv(
 if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-if DATABASE_URL.startswith("sqlite"):
+# Route handlers are plain `def` functions, so FastAPI runs them (and their
+# blocking SQLAlchemy calls) in a worker threadpool instead of on the event
+# loop. This caps how many requests can be inside the database at once; the
+# connection pool is sized to match so a thread never waits for a connection.
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
+
+if DATABASE_URL in ("sqlite://", "sqlite:///:memory:"):
+    # An in-memory database only exists inside its one connection
     engine = create_engine(
         DATABASE_URL,
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
     )
+
+elif DATABASE_URL.startswith("sqlite"):
+    # One connection per thread: sharing a single connection between
+    # threadpool workers interleaves their transactions
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False, "timeout": 30},
+        pool_size=THREADPOOL_SIZE,
+        max_overflow=0,
+    )
     
     @event.listens_for(engine, "connect")
     def set_sqlite_pragma(dbapi_connection, connection_record):
         cursor = dbapi_connection.cursor()
+        # WAL lets readers run alongside the single writer
         cursor.execute("PRAGMA journal_mode=WAL")
         cursor.close()
 
@@ -30,10 +48,116 @@ else:
         DATABASE_URL,
         pool_pre_ping=True,
         pool_size=10,
-        max_overflow=20,
+        max_overflow=max(THREADPOOL_SIZE - 10, 0),
         pool_recycle=1800
     )
 
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Legacy uploads (file_url starting with /uploads) live here
+UPLOADS_DIR = os.path.join(BASE_DIR, "uploads")
+
+# Where new uploads are stored: "db" (resource_chunks), "fs" or "s3"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "db")
+STORAGE_DIR = os.getenv("STORAGE_DIR", os.path.join(BASE_DIR, "storage"))
+# S3-compatible object storage; point S3_ENDPOINT_URL at MinIO or another
+# local stand-in to avoid talking to AWS
+S3_BUCKET = os.getenv("S3_BUCKET", "medstudy")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+S3_PREFIX = os.getenv("S3_PREFIX", "")
+
+# Size of each row in resource_chunks. Range reads touch only the chunks they
+# cover, so this also bounds the memory used per streaming request.
+STORAGE_CHUNK_SIZE = int(os.getenv("STORAGE_CHUNK_SIZE", str(1024 * 1024)))
+
+# Compression of stored bytes: "auto" (zstd when the zstandard package is
+# installed, gzip otherwise), "zstd", "gzip" or "off", and the codec level
+# (0 = the codec's default). Only uploads of the listed media types are
+# compressed, and only when a sample of them shrinks; already-compressed
+# formats are stored as they are. Transcripts and key points longer than
+# TEXT_COMPRESSION_MIN_BYTES are compressed in the row with the same codec.
+# Data written with zstd needs the package installed to be read back.
+STORAGE_COMPRESSION = os.getenv("STORAGE_COMPRESSION", "auto").strip().lower()
+STORAGE_COMPRESSION_LEVEL = int(os.getenv("STORAGE_COMPRESSION_LEVEL", "0"))
+STORAGE_COMPRESS_TYPES = {
+    name.strip().upper() for name in os.getenv("STORAGE_COMPRESS_TYPES", "DOC").split(",") if name.strip()
+}
+TEXT_COMPRESSION_MIN_BYTES = int(os.getenv("TEXT_COMPRESSION_MIN_BYTES", "2048"))
+
+# Largest accepted upload in bytes (0 disables the limit). Enforced while the
+# request body streams in, before it is spooled to disk.
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(5 * 1024 * 1024 * 1024)))
+
+# Background jobs: how many run at once per process, how often idle workers
+# poll for new work, and after how long a silent RUNNING job is requeued
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "5"))
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "600"))
+
+# Privacy audit: worker processes (0 = one per CPU, 1 = scan in-process) and
+# resources fetched per page
+PRIVACY_AUDIT_WORKERS = int(os.getenv("PRIVACY_AUDIT_WORKERS", "0"))
+PRIVACY_AUDIT_PAGE_SIZE = int(os.getenv("PRIVACY_AUDIT_PAGE_SIZE", "500"))
+
+# Bulk import: reader threads, and how many files / bytes go into one
+# committed batch (the unit an interrupted import resumes from)
+BULK_IMPORT_WORKERS = int(os.getenv("BULK_IMPORT_WORKERS", "4"))
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "50"))
+BULK_IMPORT_BATCH_BYTES = int(os.getenv("BULK_IMPORT_BATCH_BYTES", str(256 * 1024 * 1024)))
+
+# In-process metadata cache: entries kept per cache, and seconds an entry
+# lives. Writes invalidate this process's cache immediately; the TTL bounds
+# how stale another worker process can be (0 disables caching)
+METADATA_CACHE_SIZE = int(os.getenv("METADATA_CACHE_SIZE", "2048"))
+METADATA_CACHE_TTL = float(os.getenv("METADATA_CACHE_TTL", "10"))
+
+# Image renditions as name:longest-edge pairs, JPEG quality, and worker
+# processes for resizing (0 = resize in the calling thread). They are made
+# by background jobs; until one has run the rendition URLs redirect to the
+# original, as they do without Pillow.
+RENDITION_SIZES = {
+    name: int(edge)
+    for name, _, edge in (
+        item.strip().partition(":")
+        for item in os.getenv("RENDITION_SIZES", "thumb:320,medium:1280").split(",")
+        if item.strip()
+    )
+}
+RENDITION_QUALITY = int(os.getenv("RENDITION_QUALITY", "82"))
+RENDITION_WORKERS = int(os.getenv("RENDITION_WORKERS", str(min(2, os.cpu_count() or 1))))
+
+# Signed share links: when a key is set, new links get HMAC-signed tokens
+# that are validated without a database lookup. Revocations are re-read
+# every SHARE_DENYLIST_REFRESH seconds so other workers pick them up.
+SHARE_SIGNING_KEY = os.getenv("SHARE_SIGNING_KEY")
+SHARE_DENYLIST_REFRESH = float(os.getenv("SHARE_DENYLIST_REFRESH", "5"))
+
+# Share-link views are counted in memory and written in batches: every
+# SHARE_ACCESS_FLUSH_INTERVAL seconds, or sooner once this many are pending.
+# While flushes keep failing at most SHARE_ACCESS_MAX_BUFFERED views are
+# kept; the oldest beyond that are dropped and logged.
+SHARE_ACCESS_FLUSH_INTERVAL = float(os.getenv("SHARE_ACCESS_FLUSH_INTERVAL", "2"))
+SHARE_ACCESS_MAX_PENDING = int(os.getenv("SHARE_ACCESS_MAX_PENDING", "1000"))
+SHARE_ACCESS_MAX_BUFFERED = int(os.getenv("SHARE_ACCESS_MAX_BUFFERED", "100000"))
+
+# Prometheus metrics at /api/metrics. With several worker processes (gunicorn)
+# set METRICS_DIR to a directory shared by the workers and emptied before the
+# server starts: each worker writes its totals there every
+# METRICS_FLUSH_INTERVAL seconds and a scrape adds them up. Unset, each
+# process reports only itself.
+METRICS_DIR = os.getenv("METRICS_DIR")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+
+# Opt-in SQL tracing: statements are attributed to the request that issued
+# them, and JSON lines are printed for statements slower than
+# SQL_SLOW_QUERY_MS (with their EXPLAIN plan) and for requests that run the
+# same statement SQL_REPEAT_THRESHOLD times or more (probable N+1). Bound
+# parameters are logged too unless SQL_TRACE_PARAMS is off; they can hold
+# patient data.
+SQL_TRACE = os.getenv("SQL_TRACE", "").strip().lower() in ("1", "true", "on", "yes")
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "5"))
+SQL_TRACE_PARAMS = os.getenv("SQL_TRACE_PARAMS", "true").strip().lower() in ("1", "true", "on", "yes")
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
@@ -0,0 +1,161 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, List, Optional, Tuple
+
+# Conditional request helpers (RFC 7232 / RFC 7233 If-Range).
+#
+# Media bytes get a strong ETag from their stored sha256, so a validator is
+# known without opening the blob. Metadata responses get a weak ETag hashed
+# from the rows they would return, so a 304 skips validation and JSON
+# encoding, the expensive part of a list response.
+
+# Media is patient material: caches may keep it, but only the user's own
+CACHE_REVALIDATE = "private, no-cache"
+# A URL carrying ?v=<content hash> names bytes that can never change
+CACHE_IMMUTABLE = "private, max-age=31536000, immutable"
+
+def strong_etag(content_hash: str) -> str:
+    return f'"{content_hash}"'
+
+def weak_etag(value: Any) -> str:
+    """Weak validator over anything with a stable repr (rows, tuples, dicts)."""
+    return 'W/"' + hashlib.sha1(repr(value).encode()).hexdigest() + '"'
+
+def _utc(value: datetime) -> datetime:
+    # Naive timestamps come from SQLite's CURRENT_TIMESTAMP, which is UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+def http_date(value: datetime) -> str:
+    return format_datetime(_utc(value), usegmt=True)
+
+def parse_http_date(value: str) -> Optional[datetime]:
+    try:
+        return _utc(parsedate_to_datetime(value))
+    except (TypeError, ValueError, IndexError):
+        return None
+
+def _opaque(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+def etag_matches(header: str, etag: str, weak: bool = True) -> bool:
+    """
+    Whether an If-None-Match / If-Match style list matches `etag`.
+    Weak comparison ignores W/ prefixes; strong comparison needs both tags strong.
+    """
+    for tag in (t.strip() for t in header.split(",")):
+        if tag == "*":
+            return True
+        if weak and _opaque(tag) == _opaque(etag):
+            return True
+        if not weak and tag == etag and not etag.startswith("W/"):
+            return True
+    return False
+
+def not_modified(
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str],
+    etag: Optional[str],
+    last_modified: Optional[datetime] = None,
+) -> bool:
+    """True when a GET can be answered with 304. If-None-Match wins over If-Modified-Since."""
+    if if_none_match is not None:
+        return etag is not None and etag_matches(if_none_match, etag)
+    if if_modified_since and last_modified is not None:
+        since = parse_http_date(if_modified_since)
+        return since is not None and _utc(last_modified) <= since
+    return False
+
+def if_range_matches(if_range: Optional[str], etag: Optional[str], last_modified: Optional[datetime]) -> bool:
+    """
+    Whether a Range request should be honored given its If-Range header.
+    An entity tag must match strongly, a date exactly; otherwise the client's
+    partial copy is stale and the full body is sent.
+    """
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return etag is not None and etag_matches(if_range, etag, weak=False)
+    since = parse_http_date(if_range)
+    return since is not None and last_modified is not None and _utc(last_modified) == since
+
+def accepts_encoding(accept_encoding: Optional[str], coding: str) -> bool:
+    """Whether an Accept-Encoding header allows `coding` (named, or via *, with q > 0)."""
+    if not accept_encoding:
+        return False
+    allowed = None
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name == coding:
+            return q > 0
+        if name == "*":
+            allowed = q > 0
+    return bool(allowed)
+
+# Ranges (RFC 7233)
+
+# More ranges than this in one request is not a real client; serve the
+# whole representation instead of a multipart response of slivers
+MAX_RANGES = 64
+
+class RangeNotSatisfiable(Exception):
+    """No requested range overlaps the representation: answer 416."""
+
+def parse_range(header: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Parse a Range header into sorted, coalesced inclusive (start, end) pairs.
+
+    Returns None when the header must be ignored (another unit, bad syntax,
+    too many ranges), in which case the full body is sent. Raises
+    RangeNotSatisfiable when it is valid but no range overlaps `size` bytes.
+    """
+    unit, sep, specs = header.partition("=")
+    if not sep or unit.strip().lower() != "bytes":
+        return None
+    ranges = []
+    specs = [spec.strip() for spec in specs.split(",") if spec.strip()]
+    if not specs:
+        return None
+    for spec in specs:
+        first, sep, last = (part.strip() for part in spec.partition("-"))
+        if not sep or not (first.isdecimal() or first == "") or not (last.isdecimal() or last == ""):
+            return None
+        if first == "":
+            if last == "":
+                return None
+            # Suffix range: the final N bytes
+            length = int(last)
+            if length > 0 and size > 0:
+                ranges.append((max(size - length, 0), size - 1))
+            continue
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        if start < size:
+            ranges.append((start, min(int(last), size - 1) if last else size - 1))
+    if len(ranges) > MAX_RANGES:
+        return None
+    if not ranges:
+        raise RangeNotSatisfiable()
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    return merged
@@ -0,0 +1,247 @@
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import JOB_CONCURRENCY, JOB_POLL_INTERVAL, JOB_STALE_SECONDS, SessionLocal
+from app.models.database import Job, JobStatus
+
+def enqueue(db: Session, kind: str, resource_id: Optional[int] = None, payload: Optional[dict] = None) -> Job:
+    """Add a job to the queue. The caller commits, then calls job_worker.notify()."""
+    job = Job(
+        kind=kind,
+        resource_id=resource_id,
+        status=JobStatus.PENDING,
+        progress=0.0,
+        attempts=0,
+        payload=json.dumps(payload or {}),
+    )
+    db.add(job)
+    db.flush()
+    return job
+
+class JobContext:
+    """What a job handler gets: its job's identity plus progress reporting."""
+
+    # Progress is persisted at most this often to keep writes cheap
+    PROGRESS_INTERVAL = 1.0
+
+    def __init__(self, job: Job, session_factory):
+        self.job_id = job.id
+        self.kind = job.kind
+        self.resource_id = job.resource_id
+        self.payload = json.loads(job.payload or "{}")
+        self.session_factory = session_factory
+        self._last_report = 0.0
+
+    def _due(self, force: bool) -> bool:
+        now = time.monotonic()
+        if not force and now - self._last_report < self.PROGRESS_INTERVAL:
+            return False
+        self._last_report = now
+        return True
+
+    async def set_progress(self, fraction: float, force: bool = False) -> None:
+        if self._due(force):
+            await run_in_threadpool(self._write_progress, min(max(fraction, 0.0), 1.0))
+
+    def report_progress(self, fraction: float, force: bool = False) -> None:
+        """set_progress for handlers doing blocking work in a worker thread."""
+        if self._due(force):
+            self._write_progress(min(max(fraction, 0.0), 1.0))
+
+    def _write_progress(self, fraction: float) -> None:
+        with self.session_factory() as db:
+            db.execute(update(Job).where(Job.id == self.job_id).values(progress=fraction))
+            db.commit()
+
+Handler = Callable[[JobContext], Awaitable[None]]
+
+def default_handlers() -> Dict[str, Handler]:
+    from app.core.privacy_audit import privacy_audit_job
+    from app.core.renditions import renditions_job
+    from app.core.transcode import transcode_video
+    return {"transcode": transcode_video, "privacy_audit": privacy_audit_job, "renditions": renditions_job}
+
+class JobWorker:
+    """
+    Runs queued jobs on the event loop without blocking it: handlers await
+    subprocesses and push DB work to the threadpool. At most `concurrency`
+    jobs run at once per process. Jobs are claimed with a conditional UPDATE,
+    so several gunicorn workers can share one queue.
+    """
+
+    def __init__(self, session_factory=SessionLocal, concurrency: int = JOB_CONCURRENCY,
+                 handlers: Optional[Dict[str, Handler]] = None, heartbeat_interval: Optional[float] = None):
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        # Running jobs touch updated_at this often, progress or not, so
+        # _requeue_stale elsewhere only picks up jobs whose process died
+        self.heartbeat_interval = JOB_STALE_SECONDS / 3 if heartbeat_interval is None else heartbeat_interval
+        self._handlers = handlers
+        self._active: Dict[int, asyncio.Task] = {}
+        self._loop_task: Optional[asyncio.Task] = None
+        self._event_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def handlers(self) -> Dict[str, Handler]:
+        if self._handlers is None:
+            self._handlers = default_handlers()
+        return self._handlers
+
+    def start(self) -> None:
+        self._event_loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._loop_task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        if self._loop_task:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+        # Interrupted jobs go back to the queue for the next process
+        active = list(self._active.items())
+        for _, task in active:
+            task.cancel()
+        await asyncio.gather(*(task for _, task in active), return_exceptions=True)
+        if active:
+            await run_in_threadpool(self._requeue, [job_id for job_id, _ in active])
+
+    def notify(self) -> None:
+        """Wake the worker after enqueueing. Safe to call from any thread."""
+        if self._event_loop is not None and self._wakeup is not None:
+            self._event_loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run_forever(self) -> None:
+        while True:
+            try:
+                await self.dispatch()
+            except Exception as e:
+                print(f"Job dispatch failed: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def dispatch(self) -> None:
+        """Start pending jobs until the concurrency limit is reached."""
+        await run_in_threadpool(self._requeue_stale)
+        while len(self._active) < self.concurrency:
+            job = await run_in_threadpool(self._claim_next)
+            if job is None:
+                return
+            task = asyncio.create_task(self._execute(job))
+            self._active[job.id] = task
+            task.add_done_callback(lambda _t, job_id=job.id: self._finished(job_id))
+
+    def _finished(self, job_id: int) -> None:
+        self._active.pop(job_id, None)
+        # A slot freed up; look for more work
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run_until_idle(self) -> None:
+        """Run every pending job to completion (used by scripts and tests)."""
+        while True:
+            job = await run_in_threadpool(self._claim_next)
+            if job is None:
+                return
+            await self._execute(job)
+
+    async def _execute(self, job: Job) -> None:
+        ctx = JobContext(job, self.session_factory)
+        handler = self.handlers.get(job.kind)
+        heartbeat = asyncio.create_task(self._heartbeat(job.id))
+        try:
+            if handler is None:
+                raise RuntimeError(f"No handler for job kind '{job.kind}'")
+            await handler(ctx)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Job {job.id} ({job.kind}) failed: {e}")
+            await run_in_threadpool(self._finish, job.id, JobStatus.FAILED, str(e)[:2000])
+        else:
+            await run_in_threadpool(self._finish, job.id, JobStatus.SUCCEEDED, None)
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+
+    async def _heartbeat(self, job_id: int) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await run_in_threadpool(self._touch, job_id)
+            except Exception as e:
+                print(f"Job {job_id} heartbeat failed: {e}")
+
+    def _touch(self, job_id: int) -> None:
+        with self.session_factory() as db:
+            db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == JobStatus.RUNNING)
+                .values(updated_at=datetime.now(timezone.utc))
+            )
+            db.commit()
+
+    def _claim_next(self) -> Optional[Job]:
+        with self.session_factory() as db:
+            candidates = db.execute(
+                select(Job.id).where(Job.status == JobStatus.PENDING).order_by(Job.id).limit(5)
+            ).scalars().all()
+            for job_id in candidates:
+                claimed = db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.status == JobStatus.PENDING)
+                    .values(status=JobStatus.RUNNING, attempts=Job.attempts + 1, progress=0.0, error=None)
+                ).rowcount
+                db.commit()
+                if claimed:
+                    job = db.get(Job, job_id)
+                    db.expunge(job)
+                    return job
+            return None
+
+    def _finish(self, job_id: int, status: JobStatus, error: Optional[str]) -> None:
+        values = {"status": status, "error": error, "finished_at": datetime.now(timezone.utc)}
+        if status == JobStatus.SUCCEEDED:
+            values["progress"] = 1.0
+        with self.session_factory() as db:
+            db.execute(update(Job).where(Job.id == job_id).values(**values))
+            db.commit()
+
+    def _requeue(self, job_ids) -> None:
+        with self.session_factory() as db:
+            db.execute(
+                update(Job)
+                .where(Job.id.in_(job_ids), Job.status == JobStatus.RUNNING)
+                .values(status=JobStatus.PENDING)
+            )
+            db.commit()
+
+    def _requeue_stale(self) -> None:
+        # RUNNING jobs whose heartbeat stopped belong to a dead process
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=JOB_STALE_SECONDS)
+        with self.session_factory() as db:
+            stmt = update(Job).where(Job.status == JobStatus.RUNNING, Job.updated_at < cutoff)
+            if self._active:
+                stmt = stmt.where(Job.id.notin_(list(self._active)))
+            db.execute(stmt.values(status=JobStatus.PENDING))
+            db.commit()
+
+def retry_job(db: Session, job: Job) -> Job:
+    """Put a failed job back in the queue. The caller commits and notifies."""
+    job.status = JobStatus.PENDING
+    job.progress = 0.0
+    job.error = None
+    job.finished_at = None
+    return job
+
+job_worker = JobWorker()
@@ -0,0 +1,425 @@
+import asyncio
+import json
+from contextlib import contextmanager
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import METRICS_DIR, METRICS_FLUSH_INTERVAL
+
+try:
+    import fcntl
+except ImportError:
+    # No flock (Windows): compaction and scrapes are not serialised
+    fcntl = None
+
+# Prometheus metrics kept in process memory. Under several worker processes
+# each one writes its totals to METRICS_DIR/<pid>.json and a scrape, served
+# by whichever worker gets it, adds up every file: counters and histograms
+# of all workers that ever ran, gauges of the live ones only. Files of
+# exited workers are folded into METRICS_DIR/dead.json when a worker starts,
+# so a scrape reads one file per live worker plus that one. The text format
+# is written by hand; prometheus_client is not a dependency.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = tuple(256 * 4 ** i for i in range(12))  # 256 B .. 1 GiB
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+class Metric(NamedTuple):
+    kind: str  # counter, gauge or histogram
+    help: str
+    buckets: Tuple[float, ...] = ()
+
+METRICS = {
+    "http_requests_total": Metric("counter", "HTTP requests by route, method and status"),
+    "http_request_duration_seconds": Metric(
+        "histogram", "Time from request to the last byte of the response", LATENCY_BUCKETS
+    ),
+    "http_response_size_bytes": Metric("histogram", "Response body size", SIZE_BUCKETS),
+    "http_requests_in_flight": Metric("gauge", "Requests being handled"),
+    "db_queries_total": Metric("counter", "SQL statements executed, by statement type"),
+    "db_query_errors_total": Metric("counter", "SQL statements that raised"),
+    "db_query_duration_seconds": Metric("histogram", "SQL statement execution time", QUERY_BUCKETS),
+    "db_pool_checkouts_total": Metric("counter", "Connections handed out by the pool"),
+    "db_pool_overflow_checkouts_total": Metric("counter", "Checkouts beyond pool_size, from max_overflow"),
+    "db_pool_size": Metric("gauge", "Configured pool_size"),
+    "db_pool_checked_out": Metric("gauge", "Connections currently in use"),
+    "db_pool_overflow": Metric("gauge", "Overflow connections currently open"),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# Counters and histograms of exited workers, merged
+DEAD_FILE = "dead.json"
+LOCK_FILE = ".lock"
+
+class MetricsRegistry:
+    """
+    Counters, gauges and histograms of one process. Safe to update from any
+    thread. Collectors run before each snapshot to refresh gauges that are
+    read rather than counted (pool state).
+    """
+
+    def __init__(self, directory: Optional[str] = METRICS_DIR, interval: float = METRICS_FLUSH_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], List[float]] = {}
+        self._collectors: List[Callable[["MetricsRegistry"], None]] = []
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._values[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        buckets = METRICS[name].buckets
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            # Per-bucket counts, then sum and count
+            counts = self._histograms.get(key)
+            if counts is None:
+                counts = self._histograms[key] = [0] * (len(buckets) + 2)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            counts[-2] += value
+            counts[-1] += 1
+
+    def add_collector(self, collector: Callable[["MetricsRegistry"], None]) -> None:
+        self._collectors.append(collector)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> dict:
+        for collector in self._collectors:
+            collector(self)
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "values": [[name, list(labels), value] for (name, labels), value in self._values.items()],
+                "histograms": [[name, list(labels), list(counts)] for (name, labels), counts in self._histograms.items()],
+            }
+
+    # -- several processes -------------------------------------------------
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def flush(self) -> None:
+        """Write this process's snapshot to the shared directory, if there is one."""
+        if not self.directory:
+            return
+        path = self._path(os.getpid())
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def _read(self, name: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(self.directory, name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _snapshots(self) -> Iterable[Tuple[dict, bool]]:
+        """(snapshot, live) for this process and every file in the directory."""
+        own = self.snapshot()
+        yield own, True
+        if not self.directory:
+            return
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        dead = self._read(DEAD_FILE) if DEAD_FILE in names else None
+        # Files a compaction merged but did not get to delete
+        merged = set(dead.get("merged", [])) if dead else set()
+        if dead:
+            yield dead, False
+        for name in names:
+            stem, ext = os.path.splitext(name)
+            if ext != ".json" or name == DEAD_FILE or name in merged or stem == str(own["pid"]):
+                continue
+            snapshot = self._read(name)
+            if snapshot is not None:
+                yield snapshot, stem.isdigit() and _alive(int(stem))
+
+    def render(self) -> str:
+        """All processes' metrics in the Prometheus text exposition format."""
+        values: Dict[Tuple[str, Labels], float] = {}
+        histograms: Dict[Tuple[str, Labels], List[float]] = {}
+        with self._directory_lock(exclusive=False):
+            for snapshot, live in self._snapshots():
+                _add_snapshot(values, histograms, snapshot, gauges=live)
+
+        lines = []
+        for name, metric in METRICS.items():
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            if metric.kind == "histogram":
+                for (metric_name, labels), counts in sorted(histograms.items()):
+                    if metric_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets, counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(labels, le=_number(bound))} {_number(cumulative)}")
+                    lines.append(f"{name}_bucket{_labels(labels, le='+Inf')} {_number(counts[-1])}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_number(counts[-2])}")
+                    lines.append(f"{name}_count{_labels(labels)} {_number(counts[-1])}")
+            else:
+                for (metric_name, labels), value in sorted(values.items()):
+                    if metric_name == name:
+                        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    @contextmanager
+    def _directory_lock(self, exclusive: bool):
+        if not self.directory or fcntl is None:
+            yield
+            return
+        try:
+            f = open(os.path.join(self.directory, LOCK_FILE), "a")
+        except FileNotFoundError:
+            # No directory yet, so nothing to read or merge
+            yield
+            return
+        with f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    def compact(self) -> None:
+        """
+        Fold the files of exited workers into dead.json (gauges dropped) and
+        delete them. dead.json names the files it absorbed; should deleting
+        them be cut short, scrapes skip them and the next compaction
+        removes them.
+        """
+        if not self.directory:
+            return
+        with self._directory_lock(exclusive=True):
+            dead = self._read(DEAD_FILE) or {}
+            for name in dead.get("merged", []):
+                _remove(os.path.join(self.directory, name))
+            values: Dict[Tuple[str, Labels], float] = {}
+            histograms: Dict[Tuple[str, Labels], List[float]] = {}
+            _add_snapshot(values, histograms, {"values": dead.get("values", []),
+                                               "histograms": dead.get("histograms", [])}, gauges=False)
+            merged = []
+            for name in sorted(os.listdir(self.directory)):
+                stem, ext = os.path.splitext(name)
+                if ext != ".json":
+                    continue
+                if stem.isdigit() and int(stem) != os.getpid() and not _alive(int(stem)):
+                    # Renamed first: a new process may reuse the pid, never this name
+                    dead_name = f"dead-{stem}-{time.time_ns()}.json"
+                    os.replace(os.path.join(self.directory, name), os.path.join(self.directory, dead_name))
+                    name = dead_name
+                elif not stem.startswith("dead-"):
+                    continue
+                snapshot = self._read(name)
+                if snapshot is not None:
+                    _add_snapshot(values, histograms, snapshot, gauges=False)
+                merged.append(name)
+            if not merged:
+                return
+            path = os.path.join(self.directory, DEAD_FILE)
+            with open(f"{path}.tmp", "w") as f:
+                json.dump({
+                    "pid": None,
+                    "values": [[name, list(labels), value] for (name, labels), value in values.items()],
+                    "histograms": [[name, list(labels), counts] for (name, labels), counts in histograms.items()],
+                    "merged": merged,
+                }, f)
+            os.replace(f"{path}.tmp", path)
+            for name in merged:
+                _remove(os.path.join(self.directory, name))
+
+    def start(self) -> None:
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        # A file under our pid is from an earlier process that had it: keep
+        # its counts under another name so they still add up
+        path = self._path(os.getpid())
+        if os.path.exists(path):
+            os.replace(path, os.path.join(self.directory, f"dead-{os.getpid()}-{time.time_ns()}.json"))
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"Metrics compaction failed: {e}")
+        self._loop_task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        if self._loop_task:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+            try:
+                await run_in_threadpool(self.flush)
+            except Exception as e:
+                print(f"Metrics flush at shutdown failed: {e}")
+
+    async def _run_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await run_in_threadpool(self.flush)
+            except Exception as e:
+                print(f"Metrics flush failed: {e}")
+
+def _add_snapshot(values: Dict[Tuple[str, Labels], float], histograms: Dict[Tuple[str, Labels], List[float]],
+                  snapshot: dict, gauges: bool) -> None:
+    """Add one snapshot's counters and histograms (and its gauges, if `gauges`) to the totals."""
+    for name, labels, value in snapshot["values"]:
+        if name not in METRICS or (METRICS[name].kind == "gauge" and not gauges):
+            continue
+        key = (name, tuple(tuple(pair) for pair in labels))
+        values[key] = values.get(key, 0) + value
+    for name, labels, counts in snapshot["histograms"]:
+        if name not in METRICS or len(counts) != len(METRICS[name].buckets) + 2:
+            continue
+        key = (name, tuple(tuple(pair) for pair in labels))
+        total = histograms.setdefault(key, [0] * len(counts))
+        for i, count in enumerate(counts):
+            total[i] += count
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(labels: Labels, **extra) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in pairs) + "}"
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+metrics = MetricsRegistry()
+
+class MetricsMiddleware:
+    """
+    Count every HTTP request by route template, method and status, and time
+    it until the last byte of the response is sent, so streamed downloads
+    are timed in full. Requests that matched no route share one label.
+    """
+
+    def __init__(self, app: ASGIApp, registry: Optional[MetricsRegistry] = None):
+        self.app = app
+        self.registry = registry or metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = self.registry
+        status = 500
+        size = 0
+
+        async def counting_send(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        registry.inc("http_requests_in_flight")
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, counting_send)
+        finally:
+            elapsed = time.perf_counter() - start
+            registry.inc("http_requests_in_flight", -1)
+            # The router records the matched route in the scope; using its
+            # template keeps ids out of the label values
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"]
+            registry.inc("http_requests_total", route=route, method=method, status=str(status))
+            registry.observe("http_request_duration_seconds", elapsed, route=route, method=method)
+            registry.observe("http_response_size_bytes", size, route=route, method=method)
+
+def _statement_type(statement: str) -> str:
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return verb if verb in ("SELECT", "INSERT", "UPDATE", "DELETE") else "OTHER"
+
+def instrument_engine(engine: Engine, registry: Optional[MetricsRegistry] = None) -> None:
+    """Count and time `engine`'s statements and follow its connection pool."""
+    registry = registry or metrics
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_query_start"].pop()
+        kind = _statement_type(statement)
+        registry.inc("db_queries_total", type=kind)
+        registry.observe("db_query_duration_seconds", elapsed, type=kind)
+
+    @event.listens_for(engine, "handle_error")
+    def on_error(context):
+        starts = context.connection.info.get("metrics_query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+        registry.inc("db_query_errors_total")
+
+    pool = engine.pool
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        registry.inc("db_pool_checkouts_total")
+        size = getattr(pool, "size", None)
+        checked_out = getattr(pool, "checkedout", None)
+        if size is not None and checked_out is not None and checked_out() > size():
+            registry.inc("db_pool_overflow_checkouts_total")
+
+    def collect(target: MetricsRegistry) -> None:
+        # QueuePool only; StaticPool and NullPool have no such state
+        for name, method in (("db_pool_size", "size"), ("db_pool_checked_out", "checkedout"),
+                             ("db_pool_overflow", "overflow")):
+            if hasattr(pool, method):
+                target.set(name, max(getattr(pool, method)(), 0))
+
+    registry.add_collector(collect)
@@ -1,6 +1,10 @@
+import hashlib
 from sqlalchemy.orm import Session
-from sqlalchemy import text, inspect
-from app.models.database import Base
+from sqlalchemy import text, inspect, select, func, insert, update
+from app.models.database import Base, LearningResource, MediaBlob, ResourceChunk
+from app.core.config import STORAGE_CHUNK_SIZE
+from app.core.rollups import rebuild_daily_counts
+from app.core.search import rebuild_search_index
 
 def check_and_migrate_tables(engine):
     inspector = inspect(engine)
@@ -15,6 +19,116 @@ def check_and_migrate_tables(engine):
             with engine.connect() as conn:
                 conn.execute(text("ALTER TABLE categories ADD COLUMN type VARCHAR(20) DEFAULT 'tag'"))
                 conn.commit()
+
+    if "learning_resources" in inspector.get_table_names():
+        columns = [c["name"] for c in inspector.get_columns("learning_resources")]
+
+        if "content_hash" not in columns:
+            print("Migrating: Adding 'content_hash' column to learning_resources table")
+            with engine.connect() as conn:
+                conn.execute(text("ALTER TABLE learning_resources ADD COLUMN content_hash VARCHAR(64)"))
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_learning_resources_content_hash "
+                    "ON learning_resources (content_hash)"
+                ))
+                conn.commit()
+
+        for column, column_type in (("width", "INTEGER"), ("height", "INTEGER"), ("content_encoding", "VARCHAR(16)")):
+            if column not in columns:
+                print(f"Migrating: Adding '{column}' column to learning_resources table")
+                with engine.connect() as conn:
+                    conn.execute(text(f"ALTER TABLE learning_resources ADD COLUMN {column} {column_type}"))
+                    conn.commit()
+
+        # Composite indexes for keyset pagination; create_all() only adds
+        # indexes when it creates the table itself
+        with engine.connect() as conn:
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_learning_resources_created_id "
+                "ON learning_resources (created_at, id)"
+            ))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_learning_resources_category_created_id "
+                "ON learning_resources (category, created_at, id)"
+            ))
+            conn.commit()
+
+        # Databases created before full-text search get indexed once
+        rebuild_search_index(engine, only_if_empty=True)
+        # ...and get their timeline rollup filled once
+        rebuild_daily_counts(engine, only_if_empty=True)
     
+    if "media_blobs" in inspector.get_table_names():
+        columns = [c["name"] for c in inspector.get_columns("media_blobs")]
+        if "encoding" not in columns:
+            print("Migrating: Adding 'encoding' column to media_blobs table")
+            with engine.connect() as conn:
+                conn.execute(text("ALTER TABLE media_blobs ADD COLUMN encoding VARCHAR(16)"))
+                conn.commit()
+
     # You can add more migration checks here if needed
     print("Database schema check completed.")
+
+def migrate_content_to_chunks(engine, chunk_size: int = STORAGE_CHUNK_SIZE) -> int:
+    """
+    Move legacy single-blob rows (`content`) into resource_chunks.
+    Each resource is copied through substr() windows and committed on its own,
+    so memory stays at one chunk and an interrupted run can simply be resumed.
+    The copy is hashed on the way and filed in media_blobs like a fresh
+    upload, so migrated resources get an ETag and share identical payloads.
+    Returns the number of resources migrated.
+    """
+    with engine.connect() as conn:
+        pending = conn.execute(
+            select(LearningResource.id).where(
+                LearningResource.content.isnot(None)
+            ).order_by(LearningResource.id)
+        ).scalars().all()
+
+    migrated = 0
+    for resource_id in pending:
+        with engine.begin() as conn:
+            # Clear partial output of an interrupted earlier run
+            conn.execute(ResourceChunk.__table__.delete().where(ResourceChunk.resource_id == resource_id))
+            digest = hashlib.sha256()
+            total = 0
+            seq = 0
+            while True:
+                data = conn.execute(
+                    select(func.substr(LearningResource.content, total + 1, chunk_size)).where(
+                        LearningResource.id == resource_id
+                    )
+                ).scalar()
+                if not data:
+                    break
+                conn.execute(insert(ResourceChunk).values(resource_id=resource_id, seq=seq, data=data))
+                digest.update(data)
+                total += len(data)
+                seq += 1
+            sha256 = digest.hexdigest()
+
+            # As in store_deduplicated: an existing copy gains a reference and
+            # the chunks just written are dropped
+            shared = conn.execute(
+                update(MediaBlob)
+                .where(MediaBlob.sha256 == sha256, MediaBlob.ref_count > 0)
+                .values(ref_count=MediaBlob.ref_count + 1)
+            ).rowcount
+            if shared:
+                conn.execute(ResourceChunk.__table__.delete().where(ResourceChunk.resource_id == resource_id))
+                storage_url, encoding = conn.execute(
+                    select(MediaBlob.storage_url, MediaBlob.encoding).where(MediaBlob.sha256 == sha256)
+                ).one()
+            else:
+                storage_url, encoding = f"db://{resource_id}", None
+                conn.execute(insert(MediaBlob).values(
+                    sha256=sha256, size=total, storage_url=storage_url, ref_count=1, encoding=None,
+                ))
+            conn.execute(
+                update(LearningResource)
+                .where(LearningResource.id == resource_id)
+                .values(content=None, size=total, file_url=storage_url, content_hash=sha256, content_encoding=encoding)
+            )
+        migrated += 1
+        print(f"Migrated resource {resource_id} into {seq} chunks ({total} bytes{', shared' if shared else ''})")
+    return migrated
@@ -0,0 +1,271 @@
+import math
+import random
+import secrets
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import STORAGE_CHUNK_SIZE
+from app.core.rollups import rebuild_daily_counts
+from app.core.search import rebuild_search_index
+from app.core.share_tokens import sign_share_token, signing_enabled
+from app.models.database import (
+    LearningResource,
+    MediaBlob,
+    MediaType,
+    PrivacyFinding,
+    ResourceCategory,
+    ResourceChunk,
+    ResourceDailyCount,
+    ResourceRendition,
+    ShareAccessEvent,
+    ShareLink,
+)
+from app.storage import get_default_backend
+from app.storage.base import IteratorReader
+from app.storage.blobs import release_blob, store_deduplicated
+
+# Synthetic corpus for load tests and benchmarks. Everything is drawn from
+# a seeded Random, so the same arguments give the same corpus. Payloads are
+# a small pool per media type shared through media_blobs, as identical
+# uploads would be, so a large corpus does not need as many large files.
+
+class SizeProfile(NamedTuple):
+    median: int  # bytes
+    sigma: float  # of the log-normal
+    cap: int
+
+SIZE_PROFILES = {
+    MediaType.VIDEO: SizeProfile(48 * 1024 * 1024, 0.8, 2 * 1024 * 1024 * 1024),
+    MediaType.AUDIO: SizeProfile(6 * 1024 * 1024, 0.6, 200 * 1024 * 1024),
+    MediaType.IMAGE: SizeProfile(1536 * 1024, 0.5, 20 * 1024 * 1024),
+    MediaType.DOC: SizeProfile(800 * 1024, 0.9, 50 * 1024 * 1024),
+}
+# Share of resources per media type
+MEDIA_MIX = {MediaType.VIDEO: 0.3, MediaType.AUDIO: 0.2, MediaType.IMAGE: 0.3, MediaType.DOC: 0.2}
+# Typical running time of recordings, seconds
+DURATIONS = {MediaType.VIDEO: (60, 1800), MediaType.AUDIO: (30, 900)}
+# Transcript length in characters; images and documents have none
+TRANSCRIPT_LENGTHS = {MediaType.VIDEO: (200, 6000), MediaType.AUDIO: (100, 3000)}
+
+_SIGNATURES = {
+    MediaType.VIDEO: b"\x00\x00\x00\x18ftypisom\x00\x00\x02\x00isomiso2",
+    MediaType.AUDIO: b"ID3\x04\x00\x00\x00\x00\x00\x00",
+    MediaType.IMAGE: b"\xff\xd8\xff\xe0\x00\x10JFIF\x00",
+    MediaType.DOC: b"%PDF-1.4\n",
+}
+_EXTENSIONS = {MediaType.VIDEO: "mp4", MediaType.AUDIO: "mp3", MediaType.IMAGE: "jpg", MediaType.DOC: "pdf"}
+
+_SUBJECTS = (
+    "下颌第一磨牙", "上颌中切牙", "智齿", "乳牙", "前牙美学区", "后牙区", "种植体", "牙周袋",
+    "根尖区", "颞下颌关节", "口腔黏膜", "全口义齿", "隐形矫治", "儿童龋齿", "牙龈退缩",
+)
+_PROCEDURES = (
+    "根管治疗", "牙体预备", "拔除术", "种植修复", "龈下刮治", "树脂充填", "冠延长术", "正畸托槽粘接",
+    "印模制取", "咬合调整", "局部麻醉", "窝沟封闭", "涂氟", "活检取材", "缝合",
+)
+_KINDS = {
+    MediaType.VIDEO: ("操作演示", "示教录像", "教学视频", "手术实录"),
+    MediaType.AUDIO: ("沟通录音", "术前谈话", "术后医嘱录音", "病例讨论录音"),
+    MediaType.IMAGE: ("临床照片", "术前术后对比", "X线片", "病理照片"),
+    MediaType.DOC: ("病例分析", "文献综述", "讲义", "操作规范"),
+}
+_SENTENCES = (
+    "首先确认患者的既往病史和过敏史。", "术区常规消毒铺巾，注意无菌操作。", "局部浸润麻醉后等待三到五分钟。",
+    "使用橡皮障隔离术区，保持视野清晰。", "测量工作长度并拍片确认。", "逐号扩大根管，每换一次器械都要冲洗。",
+    "注意保护邻牙和牙龈组织。", "向患者解释可能出现的术后反应。", "嘱患者两小时内不要进食。",
+    "如出现持续出血或剧烈疼痛请及时复诊。", "这一步是实习同学最容易出错的地方。", "肩台要连续平滑，宽度均匀。",
+    "咬合检查时让患者做前伸和侧方运动。", "记录探诊深度和出血指数。", "根据影像学表现制定治疗计划。",
+    "与患者充分沟通治疗费用和疗程。", "术后一周拆线并复查愈合情况。", "对比术前术后照片评估效果。",
+)
+_KEY_POINTS = (
+    "注意无菌操作。", "强调了神经损伤的风险，患者表示理解。", "肩台制备需加强练习。", "C形根管处理技巧。",
+    "即刻种植的适应症。", "垂直褥式缝合要点。", "使用行为诱导技巧。", "咬合干扰是主要原因。",
+    "多学科联合治疗方案。", "建议活检明确诊断。",
+)
+
+class _Pooled(NamedTuple):
+    sha256: str
+    size: int
+    storage_url: str
+    encoding: Optional[str]
+
+class MockCorpus(NamedTuple):
+    resources: int
+    blobs: int
+    payload_bytes: int
+    share_tokens: List[str]
+
+def sample_size(rng: random.Random, media_type: MediaType, scale: float = 1.0) -> int:
+    """A payload size for `media_type`, log-normal around its median and clamped to its cap."""
+    profile = SIZE_PROFILES[media_type]
+    size = rng.lognormvariate(math.log(profile.median), profile.sigma)
+    return max(1024, int(min(size, profile.cap) * scale))
+
+def mock_title(rng: random.Random, media_type: MediaType) -> str:
+    return f"{rng.choice(_SUBJECTS)}{rng.choice(_PROCEDURES)}{rng.choice(_KINDS[media_type])}"
+
+def mock_text(rng: random.Random, length: int) -> str:
+    """Transcript-like text of about `length` characters, with speaker turns."""
+    parts = []
+    total = 0
+    while total < length:
+        sentence = rng.choice(_SENTENCES)
+        if rng.random() < 0.2:
+            sentence = rng.choice(("医生：", "患者：", "带教老师：")) + sentence
+        parts.append(sentence)
+        total += len(sentence)
+    return "".join(parts)
+
+def _payload(rng: random.Random, media_type: MediaType, size: int) -> Iterator[bytes]:
+    # Recordings and photos are incompressible; documents are text-like so
+    # storage compression has something to do
+    head = _SIGNATURES[media_type]
+    remaining = size - len(head)
+    yield head
+    while remaining > 0:
+        n = min(remaining, STORAGE_CHUNK_SIZE)
+        if media_type == MediaType.DOC:
+            chunk = mock_text(rng, n // 3 + 1).encode("utf-8")[:n]
+            chunk += b" " * (n - len(chunk))
+        else:
+            chunk = rng.randbytes(n)
+        yield chunk
+        remaining -= n
+
+def _created_at(rng: random.Random, now: datetime, days: int) -> datetime:
+    # Weekday working hours, like real uploads from the clinic
+    while True:
+        moment = now - timedelta(days=rng.randrange(max(days, 1)), seconds=rng.randrange(86400))
+        if (moment.weekday() < 5 and 8 <= moment.hour < 19) or rng.random() < 0.15:
+            return moment
+
+def clear_resources(db: Session) -> None:
+    """Delete every resource and what hangs off it. Files of fs/s3 backends are left behind."""
+    for model in (ShareAccessEvent, ShareLink, ResourceRendition, ResourceDailyCount, PrivacyFinding,
+                  LearningResource, MediaBlob, ResourceChunk):
+        db.execute(delete(model))
+
+def generate_corpus(
+    engine: Engine,
+    resources: int,
+    shares: int = 0,
+    pool_size: int = 3,
+    size_scale: float = 1.0,
+    days: int = 365,
+    seed: int = 0,
+    batch_size: int = 1000,
+    with_blobs: bool = True,
+) -> MockCorpus:
+    """
+    Insert `resources` synthetic resources and `shares` share links with
+    bulk INSERTs, then rebuild the search index and daily counts once.
+    Each media type gets `pool_size` stored payloads with sizes drawn from
+    SIZE_PROFILES times `size_scale`; resources point at them with the
+    right ref_count. Without blobs, resources get placeholder file_urls.
+    """
+    rng = random.Random(seed)
+    now = datetime.now()
+    payload_bytes = 0
+    pools: Dict[MediaType, List[_Pooled]] = {}
+
+    with Session(engine) as db:
+        if with_blobs:
+            storage = get_default_backend(db)
+            for media_type in MEDIA_MIX:
+                pools[media_type] = []
+                for i in range(pool_size):
+                    size = sample_size(rng, media_type, size_scale)
+                    key = storage.new_key(0, f"mock-{media_type.value.lower()}-{i}.{_EXTENSIONS[media_type]}")
+                    blob = store_deduplicated(
+                        db, storage, key, IteratorReader(_payload(rng, media_type, size)), media_type=media_type,
+                    )
+                    pools[media_type].append(_Pooled(blob.sha256, blob.size, blob.storage_url, blob.encoding))
+                    payload_bytes += blob.size
+            db.commit()
+
+        media_types = list(MEDIA_MIX)
+        weights = list(MEDIA_MIX.values())
+        uses = Counter()
+        ids = []
+        for start in range(0, resources, batch_size):
+            rows = []
+            for _ in range(min(batch_size, resources - start)):
+                media_type = rng.choices(media_types, weights)[0]
+                row = {
+                    "title": mock_title(rng, media_type),
+                    "category": rng.choice(list(ResourceCategory)).value,
+                    "media_type": media_type,
+                    "file_url": f"/uploads/mock.{_EXTENSIONS[media_type]}",
+                    "size": 0,
+                    "duration": rng.randint(*DURATIONS[media_type]) if media_type in DURATIONS else None,
+                    "key_points": "".join(rng.sample(_KEY_POINTS, rng.randint(1, 3))),
+                    "patient_anonymized": rng.random() < 0.95,
+                    "transcript": (
+                        mock_text(rng, rng.randint(*TRANSCRIPT_LENGTHS[media_type]))
+                        if media_type in TRANSCRIPT_LENGTHS else None
+                    ),
+                    "content_hash": None,
+                    "content_encoding": None,
+                    "created_at": _created_at(rng, now, days),
+                }
+                if with_blobs:
+                    blob = rng.choice(pools[media_type])
+                    uses[blob.sha256] += 1
+                    row.update(file_url=blob.storage_url, size=blob.size,
+                               content_hash=blob.sha256, content_encoding=blob.encoding)
+                rows.append(row)
+            ids += db.execute(
+                insert(LearningResource).returning(LearningResource.id, sort_by_parameter_order=True), rows
+            ).scalars().all()
+            db.commit()
+
+        # store_deduplicated left one reference per pooled payload
+        cleanups = []
+        for blobs in pools.values():
+            for blob in blobs:
+                if uses[blob.sha256]:
+                    db.execute(
+                        update(MediaBlob).where(MediaBlob.sha256 == blob.sha256)
+                        .values(ref_count=MediaBlob.ref_count + uses[blob.sha256] - 1)
+                    )
+                else:
+                    payload_bytes -= blob.size
+                    cleanups.append(release_blob(db, blob.sha256))
+        db.commit()
+        for cleanup in cleanups:
+            if cleanup:
+                cleanup()
+
+        tokens = []
+        if shares and ids:
+            expires_now = datetime.now(timezone.utc)
+            rows = []
+            for _ in range(shares):
+                hours = rng.choice((1, 24, 72, 168))
+                rows.append({
+                    "resource_id": rng.choice(ids),
+                    "share_token": secrets.token_urlsafe(16),
+                    "expiry_hours": hours,
+                    "expires_at": expires_now + timedelta(hours=hours),
+                    "access_count": 0,
+                })
+            links = db.execute(
+                insert(ShareLink).returning(ShareLink.id, sort_by_parameter_order=True), rows
+            ).scalars().all()
+            if signing_enabled():
+                # Signed tokens name the link row, so they need its id first
+                for link_id, row in zip(links, rows):
+                    row.update(id=link_id, share_token=sign_share_token(link_id, row["resource_id"], row["expires_at"]))
+                db.execute(update(ShareLink), [{"id": row["id"], "share_token": row["share_token"]} for row in rows])
+            tokens = [row["share_token"] for row in rows]
+            db.commit()
+
+    rebuild_search_index(engine)
+    rebuild_daily_counts(engine)
+    return MockCorpus(len(ids), sum(1 for blobs in pools.values() for blob in blobs if uses[blob.sha256]),
+                      payload_bytes, tokens)
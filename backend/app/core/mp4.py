@@ -0,0 +1,219 @@
+import struct
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional, Tuple
+
+from app.core.config import STORAGE_CHUNK_SIZE
+from app.storage.base import IteratorReader
+
+# Minimal ISO BMFF (MP4/MOV/M4A) reader for upload ingest.
+#
+# Only box headers are read from the file; the one box loaded into memory
+# is `moov` (the index, typically a few hundred KB). That is enough to
+# read duration and dimensions and to relocate `moov` ahead of `mdat`
+# ("fast start") by rewriting the chunk offset tables, with no re-encoding
+# and no ffmpeg.
+
+# Boxes on the path from moov to the chunk offset tables and track headers
+CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+MAX_MOOV_SIZE = 64 * 1024 * 1024
+
+class Mp4Error(ValueError):
+    pass
+
+class Box(NamedTuple):
+    type: bytes
+    offset: int
+    header_size: int
+    size: int  # including the header
+
+    @property
+    def end(self) -> int:
+        return self.offset + self.size
+
+class MediaInfo(NamedTuple):
+    duration: Optional[float]  # seconds
+    width: Optional[int]
+    height: Optional[int]
+
+class Mp4Layout(NamedTuple):
+    size: int
+    boxes: List[Box]  # top level
+    moov: Box
+    moov_data: bytes
+    info: MediaInfo
+
+    @property
+    def fast_start(self) -> bool:
+        mdat = next((box for box in self.boxes if box.type == b"mdat"), None)
+        return mdat is None or self.moov.offset < mdat.offset
+
+def _parse_header(header: bytes, offset: int, end: int) -> Box:
+    size, box_type = struct.unpack(">I4s", header[:8])
+    header_size = 8
+    if size == 1:
+        if len(header) < 16:
+            raise Mp4Error("truncated box header")
+        size = struct.unpack(">Q", header[8:16])[0]
+        header_size = 16
+    elif size == 0:
+        # Runs to the end of the enclosing space
+        size = end - offset
+    if size < header_size or offset + size > end:
+        raise Mp4Error(f"box {box_type!r} at {offset} overruns its parent")
+    return Box(box_type, offset, header_size, size)
+
+def iter_file_boxes(f: BinaryIO, start: int, end: int) -> Iterator[Box]:
+    offset = start
+    while offset < end:
+        if end - offset < 8:
+            raise Mp4Error("trailing bytes after the last box")
+        f.seek(offset)
+        box = _parse_header(f.read(16), offset, end)
+        yield box
+        offset = box.end
+
+def iter_boxes(data: bytes, start: int, end: int) -> Iterator[Box]:
+    offset = start
+    while offset < end:
+        if end - offset < 8:
+            raise Mp4Error("trailing bytes after the last box")
+        box = _parse_header(data[offset:offset + 16], offset, end)
+        yield box
+        offset = box.end
+
+def _walk(data: bytes, start: int, end: int) -> Iterator[Tuple[Box, Tuple[bytes, ...]]]:
+    """Every box under start..end with the types of its ancestors."""
+    stack = [(start, end, ())]
+    while stack:
+        start, end, path = stack.pop()
+        for box in iter_boxes(data, start, end):
+            yield box, path
+            if box.type in CONTAINERS:
+                stack.append((box.offset + box.header_size, box.end, path + (box.type,)))
+
+def _track_size(data: bytes, trak: Box) -> Optional[Tuple[int, int]]:
+    """Display width and height of a video track, None for any other track."""
+    handler = size = None
+    for box, path in _walk(data, trak.offset + trak.header_size, trak.end):
+        body = box.offset + box.header_size
+        if box.type == b"hdlr" and path == (b"mdia",):
+            handler = data[body + 8:body + 12]
+        elif box.type == b"tkhd" and not path:
+            version = data[body]
+            # version/flags, times, track id, reserved, duration (64-bit times in version 1)
+            fields = body + (36 if version == 1 else 24)
+            # reserved(8) layer alternate_group volume reserved(2 each) matrix(36) width height
+            matrix = struct.unpack_from(">9i", data, fields + 16)
+            width, height = (value >> 16 for value in struct.unpack_from(">II", data, fields + 52))
+            # A 90/270 degree display matrix (portrait phone video) swaps the axes
+            if matrix[0] == 0 and abs(matrix[1]) == 0x10000:
+                width, height = height, width
+            size = (width, height)
+    if handler != b"vide" or not size or not all(size):
+        return None
+    return size
+
+def _media_info(moov: bytes, header_size: int) -> MediaInfo:
+    duration = None
+    size = (None, None)
+    for box in iter_boxes(moov, header_size, len(moov)):
+        body = box.offset + box.header_size
+        if box.type == b"mvhd":
+            if moov[body] == 1:
+                timescale, length = struct.unpack_from(">IQ", moov, body + 20)
+            else:
+                timescale, length = struct.unpack_from(">II", moov, body + 12)
+            if timescale:
+                duration = length / timescale
+        elif box.type == b"trak" and size == (None, None):
+            size = _track_size(moov, box) or size
+    return MediaInfo(duration, *size)
+
+def inspect_mp4(f: BinaryIO) -> Optional[Mp4Layout]:
+    """Read the box layout of an MP4/MOV file. None if it is not one (or has no usable moov)."""
+    f.seek(0, 2)
+    size = f.tell()
+    f.seek(0)
+    head = f.read(8)
+    if len(head) < 8 or head[4:8] != b"ftyp":
+        return None
+    boxes = list(iter_file_boxes(f, 0, size))
+    moov = next((box for box in boxes if box.type == b"moov"), None)
+    if moov is None or moov.size > MAX_MOOV_SIZE:
+        return None
+    f.seek(moov.offset)
+    moov_data = f.read(moov.size)
+    return Mp4Layout(size, boxes, moov, moov_data, _media_info(moov_data, moov.header_size))
+
+def _shift_chunk_offsets(moov: bytes, header_size: int, insert_at: int, moved_from: int, delta: int) -> bytes:
+    """moov with every chunk offset in insert_at..moved_from moved by delta bytes."""
+    patched = bytearray(moov)
+    for box, _ in _walk(moov, header_size, len(moov)):
+        if box.type not in (b"stco", b"co64"):
+            continue
+        body = box.offset + box.header_size
+        count = struct.unpack_from(">I", moov, body + 4)[0]
+        width, fmt = (4, ">I") if box.type == b"stco" else (8, ">Q")
+        if body + 8 + count * width > box.end:
+            raise Mp4Error(f"{box.type!r} entry count overruns the box")
+        for i in range(count):
+            position = body + 8 + i * width
+            offset = struct.unpack_from(fmt, moov, position)[0]
+            if insert_at <= offset < moved_from:
+                offset += delta
+                if width == 4 and offset > 0xFFFFFFFF:
+                    # Would need stco -> co64 conversion; leave the file as is
+                    raise Mp4Error("chunk offset overflows stco")
+                struct.pack_into(fmt, patched, position, offset)
+    return bytes(patched)
+
+def faststart_chunks(f: BinaryIO, layout: Mp4Layout, chunk_size: int = STORAGE_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    The file with moov moved in front of the first mdat, streamed from `f`.
+    Same size as the input; only the moov box is held in memory.
+    """
+    insert_at = next(box.offset for box in layout.boxes if box.type == b"mdat")
+    moov = _shift_chunk_offsets(layout.moov_data, layout.moov.header_size, insert_at, layout.moov.offset, layout.moov.size)
+
+    def copy(start: int, end: int) -> Iterator[bytes]:
+        position = start
+        while position < end:
+            f.seek(position)
+            data = f.read(min(chunk_size, end - position))
+            if not data:
+                raise Mp4Error("file shrank while copying")
+            position += len(data)
+            yield data
+
+    def generate():
+        for box in layout.boxes:
+            if box is layout.moov:
+                continue
+            if box.offset == insert_at:
+                yield moov
+            yield from copy(box.offset, box.end)
+
+    return generate()
+
+def ingest_media(source: BinaryIO) -> Tuple[BinaryIO, Optional[MediaInfo]]:
+    """
+    Prepare an uploaded MP4/MOV/M4A for storage: a reader for the bytes to
+    store (fast-start when moov was at the end) and what the index says
+    about duration and dimensions. Anything else, or a file this parser
+    cannot make sense of, is passed through untouched with no info.
+    """
+    try:
+        layout = inspect_mp4(source)
+        if layout is None:
+            source.seek(0)
+            return source, None
+        if layout.fast_start:
+            source.seek(0)
+            return source, layout.info
+        # Patch the offsets before any byte is streamed, so a problem there
+        # still falls back to storing the original
+        chunks = faststart_chunks(source, layout)
+        return IteratorReader(chunks), layout.info
+    except (Mp4Error, struct.error, IndexError) as e:
+        print(f"MP4 ingest skipped: {e}")
+        source.seek(0)
+        return source, None
@@ -1,10 +1,14 @@
+import hashlib
 import re
-from typing import Tuple, List
+from typing import Dict, Tuple, List, Optional
+
+# 常见姓氏
+SURNAMES = '李王张刘陈杨赵黄周吴徐孙马胡郭何高林罗郑梁谢宋唐曹邓许冯韩曾彭萧蔡潘田董袁于余叶蒋杜苏魏程吕丁任沈徐姚卢傅钟姜崔谭陆汪范金石廖贾夏韦傅方孟邱贺白彭'
 
 PATIENT_NAME_PATTERNS = [
     r'患者[\u4e00-\u9fa5]{1,4}',  # 患者+中文名
     r'病人[\u4e00-\u9fa5]{1,4}',  # 病人+中文名
-    r'[李王张刘陈杨赵黄周吴徐孙马胡郭何高林罗郑梁谢宋唐曹邓许冯韩曾彭萧蔡潘田董袁于余叶蒋杜苏魏程吕丁任沈徐姚卢傅钟姜崔谭陆汪范金石廖贾夏韦傅方孟邱贺白彭][\u4e00-\u9fa5]{1,2}', # 常见姓氏+名字
+    r'[' + SURNAMES + r'][\u4e00-\u9fa5]{1,2}', # 常见姓氏+名字
     r'\b[A-Z][a-z]+\s+[A-Z][a-z]+\b', # 英文名
 ]
 
@@ -19,6 +23,41 @@ WHITELIST_TERMS = [
     '处方', '如何', '马牙', '林可霉素', '方丝弓', '方丝', '黄金', '黄疸'
 ]
 
+def _alternation(terms: List[str]) -> str:
+    # 长词优先，同一位置取最长的词
+    return "|".join(re.escape(t) for t in sorted(set(terms), key=len, reverse=True))
+
+PHONE_REGEX = re.compile(r'1[3-9]\d{9}')
+ID_NUMBER_REGEX = re.compile(r'\d{17}[\dX]')
+NAME_REGEXES = [re.compile(p) for p in PATIENT_NAME_PATTERNS]
+
+# 关键字与白名单合并成一个交替式，一次扫描完成。白名单用零宽前瞻且排在最前，
+# 以便记录每个白名单词的位置，同时不妨碍同一位置上的关键字命中。
+TERM_SCANNER = re.compile(
+    "(?=(?P<whitelist>" + _alternation(WHITELIST_TERMS) + "))"
+    "|(?P<patient>患者|病人)"
+    "|(?P<keyword>" + _alternation(PRIVACY_KEYWORDS) + ")"
+)
+
+# 内容扫描器：按严重程度排列。邮箱用零宽前瞻，不会吞掉其中的证件号/手机号
+CONTENT_SCANNER = re.compile(
+    r'\b(?:(?P<id_number>\d{17}[\dX]\b)'
+    r'|(?P<phone>1[3-9]\d{9}\b)'
+    r'|(?=(?P<email>[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b)))'
+)
+
+def _unsafe_name(title: str, regex: re.Pattern, start: int, end: int, whitelist: List[Tuple[int, int]]):
+    """
+    判断 title[start:end] 处的疑似姓名是否真的是姓名。
+    起始字落在白名单词内（如"牙周"的"周"）则安全；否则截到下一个白名单词之前，
+    截断后仍符合姓名模式才算命中（"张三牙周炎" -> "张三"）。返回命中的文本或 None。
+    """
+    if any(a <= start < b for a, b in whitelist):
+        return None
+    cut = min((a for a, _ in whitelist if start < a < end), default=end)
+    match = regex.match(title, start, cut)
+    return match.group(0) if match else None
+
 class PrivacyDetector:
     RISK_HIGH = "high"
     RISK_MEDIUM = "medium"
@@ -30,44 +69,45 @@ class PrivacyDetector:
         检查标题是否包含患者敏感信息
         返回: (风险等级, 警告信息列表)
         """
+        found = set()
+        whitelist = []
+        for m in TERM_SCANNER.finditer(title):
+            if m.lastgroup == "whitelist":
+                whitelist.append(m.span("whitelist"))
+            else:
+                found.add(m.lastgroup)
+
         alerts = []
         
         # 1. 关键字检测
-        if '患者' in title or '病人' in title:
+        if "patient" in found:
             alerts.append("标题包含'患者'或'病人'字样，建议使用编号替代真实姓名")
-            # 不直接返回，继续检查其他特征，但标记为高风险
-            if not alerts: # 如果还没添加过
-                 alerts.append("标题包含'患者'或'病人'字样")
 
-        if any(keyword in title for keyword in PRIVACY_KEYWORDS):
+        if "keyword" in found:
             alerts.append("标题可能包含个人身份信息关键字")
 
-        # 2. 正则模式检测
-        for pattern in PATIENT_NAME_PATTERNS:
-            match = re.search(pattern, title)
-            if match:
-                # 检查是否在白名单中
-                matched_text = match.group(0)
-                is_safe = False
-                for term in WHITELIST_TERMS:
-                    if term in title: # 简单的包含检查，可以改进为位置重叠检查
-                        # 如果匹配到的“名字”实际上是白名单词的一部分，或者包含了白名单词
-                        if matched_text in term or term in matched_text: 
-                            is_safe = True
-                            break
-                
-                if not is_safe:
-                    print(f"DEBUG: Matched '{matched_text}' in '{title}', not in whitelist")
-                    alerts.append(f"标题可能包含真实姓名: {matched_text}")
-                    break # 只要匹配到一个名字模式即可
+        # 2. 正则模式检测（白名单按位置重叠判断）
+        for regex in NAME_REGEXES:
+            matched_text = None
+            pos = 0
+            while matched_text is None:
+                match = regex.search(title, pos)
+                if match is None:
+                    break
+                matched_text = _unsafe_name(title, regex, match.start(), match.end(), whitelist)
+                # 被白名单覆盖的候选可能遮住紧随其后的真名，从下一个字重新找
+                pos = match.start() + 1
+            if matched_text:
+                alerts.append(f"标题可能包含真实姓名: {matched_text}")
+                break # 只要匹配到一个名字模式即可
 
         # 3. 数字敏感信息检测
         # 手机号 (11位数字，且通常以1开头)
-        if re.search(r'1[3-9]\d{9}', title):
+        if PHONE_REGEX.search(title):
             alerts.append("标题可能包含手机号码")
         
         # 身份证 (18位数字，或17位数字+X)
-        if re.search(r'\d{17}[\dX]', title):
+        if ID_NUMBER_REGEX.search(title):
             alerts.append("标题可能包含身份证号码")
 
         if alerts:
@@ -80,28 +120,23 @@ class PrivacyDetector:
         """
         检查内容是否包含患者敏感信息
         """
-        alerts = []
-        
         if not content:
-            return PrivacyDetector.RISK_LOW, alerts
+            return PrivacyDetector.RISK_LOW, []
 
-        ssn_pattern = r'\b\d{17}[\dX]\b'
-        phone_pattern = r'\b1[3-9]\d{9}\b'
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+        found = set()
+        for m in CONTENT_SCANNER.finditer(content):
+            if m.lastgroup == "id_number":
+                # 最高风险，无需继续扫描
+                return PrivacyDetector.RISK_HIGH, ["内容可能包含身份证号码"]
+            found.add(m.lastgroup)
 
-        if re.search(ssn_pattern, content):
-            alerts.append("内容可能包含身份证号码")
-            return PrivacyDetector.RISK_HIGH, alerts
-
-        if re.search(phone_pattern, content):
-            alerts.append("内容可能包含手机号码")
-            return PrivacyDetector.RISK_MEDIUM, alerts
+        if "phone" in found:
+            return PrivacyDetector.RISK_MEDIUM, ["内容可能包含手机号码"]
 
-        if re.search(email_pattern, content):
-            alerts.append("内容可能包含邮箱地址")
-            return PrivacyDetector.RISK_MEDIUM, alerts
+        if "email" in found:
+            return PrivacyDetector.RISK_MEDIUM, ["内容可能包含邮箱地址"]
 
-        return PrivacyDetector.RISK_LOW, alerts
+        return PrivacyDetector.RISK_LOW, []
 
     @staticmethod
     def suggest_anonymized_title(original_title: str) -> str:
@@ -139,3 +174,46 @@ class PrivacyDetector:
              return f"病例_{hash_value}_{original_title[:10]}..."
 
         return new_title
+
+_RISK_ORDER = {PrivacyDetector.RISK_LOW: 0, PrivacyDetector.RISK_MEDIUM: 1, PrivacyDetector.RISK_HIGH: 2}
+
+# 匹配逻辑（而非规则数据）有改动时手动递增，使之前的审计结果失效
+RULES_REVISION = 1
+
+def rules_version() -> str:
+    """
+    规则版本：编译后规则输入（各正则、关键字、白名单）加上 RULES_REVISION 的哈希。
+    只改注释或排版不会让之前的审计结果失效。
+    """
+    inputs = [
+        str(RULES_REVISION),
+        TERM_SCANNER.pattern,
+        CONTENT_SCANNER.pattern,
+        PHONE_REGEX.pattern,
+        ID_NUMBER_REGEX.pattern,
+        *(regex.pattern for regex in NAME_REGEXES),
+    ]
+    return hashlib.sha256("\n".join(inputs).encode()).hexdigest()[:16]
+
+def scan_resource(title: str, key_points: Optional[str], transcript: Optional[str]) -> Tuple[str, Dict[str, dict]]:
+    """
+    审计单个资源：标题用标题规则，要点与转写稿用内容规则。
+    返回 (最高风险等级, {字段: {"risk": ..., "alerts": [...]}})，只包含有告警的字段。
+    """
+    checks = [
+        ("title", PrivacyDetector.check_title(title or "")),
+        ("key_points", PrivacyDetector.check_content(key_points or "")),
+        ("transcript", PrivacyDetector.check_content(transcript or "")),
+    ]
+    risk = PrivacyDetector.RISK_LOW
+    findings = {}
+    for field, (field_risk, alerts) in checks:
+        if alerts:
+            findings[field] = {"risk": field_risk, "alerts": alerts}
+        if _RISK_ORDER[field_risk] > _RISK_ORDER[risk]:
+            risk = field_risk
+    return risk, findings
+
+def scan_resources(rows: List[tuple]) -> List[tuple]:
+    """批量审计的进程池入口：[(id, title, key_points, transcript)] -> [(id, risk, findings)]"""
+    return [(row[0], *scan_resource(row[1], row[2], row[3])) for row in rows]
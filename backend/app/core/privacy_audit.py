@@ -0,0 +1,137 @@
+import json
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
+
+from sqlalchemy import delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import PRIVACY_AUDIT_PAGE_SIZE, PRIVACY_AUDIT_WORKERS, SessionLocal
+from app.core.jobs import JobContext
+from app.core.privacy import PrivacyDetector, rules_version, scan_resources
+from app.models.database import LearningResource, PrivacyFinding
+
+def _pending_filter(version: str):
+    # Never scanned (or edited since, see forget_findings) or scanned under
+    # other rules
+    return or_(
+        PrivacyFinding.resource_id.is_(None),
+        PrivacyFinding.rule_version != version,
+    )
+
+def forget_findings(db: Session, resource_id: int) -> None:
+    """Drop a resource's audit result so the next audit rescans it. Call on edit and delete."""
+    db.execute(delete(PrivacyFinding).where(PrivacyFinding.resource_id == resource_id))
+
+def _pending_query(version: str, full: bool):
+    stmt = select(
+        LearningResource.id,
+        LearningResource.title,
+        LearningResource.key_points,
+        LearningResource.transcript,
+    ).outerjoin(PrivacyFinding, PrivacyFinding.resource_id == LearningResource.id)
+    if not full:
+        stmt = stmt.where(_pending_filter(version))
+    return stmt
+
+def count_pending(db: Session, version: Optional[str] = None) -> int:
+    version = version or rules_version()
+    stmt = select(func.count()).select_from(LearningResource).outerjoin(
+        PrivacyFinding, PrivacyFinding.resource_id == LearningResource.id
+    ).where(_pending_filter(version))
+    return db.execute(stmt).scalar()
+
+def _store(db: Session, version: str, results) -> int:
+    ids = [resource_id for resource_id, _, _ in results]
+    db.execute(delete(PrivacyFinding).where(PrivacyFinding.resource_id.in_(ids)))
+    db.execute(insert(PrivacyFinding), [
+        {
+            "resource_id": resource_id,
+            "rule_version": version,
+            "risk_level": risk,
+            "findings": json.dumps(findings, ensure_ascii=False) if findings else None,
+        }
+        for resource_id, risk, findings in results
+    ])
+    db.commit()
+    return sum(1 for _, risk, _ in results if risk != PrivacyDetector.RISK_LOW)
+
+def run_privacy_audit(
+    session_factory=SessionLocal,
+    workers: Optional[int] = None,
+    page_size: Optional[int] = None,
+    full: bool = False,
+    progress: Optional[Callable[[float], None]] = None,
+) -> dict:
+    """
+    Rescan stored titles, key points and transcripts with the current rules.
+
+    Resources are read in id-ordered pages, so at most a few pages of
+    transcripts are in memory however large the archive is. Pages are
+    scanned on a process pool (`workers` <= 1 scans in-process) and each
+    page's findings are committed as it completes, so an interrupted audit
+    resumes where it stopped. Resources already scanned under the current
+    rule version are skipped unless `full` is set.
+    """
+    version = rules_version()
+    workers = PRIVACY_AUDIT_WORKERS if workers is None else workers
+    workers = workers or os.cpu_count() or 1
+    page_size = page_size or PRIVACY_AUDIT_PAGE_SIZE
+    scanned = flagged = 0
+
+    with session_factory() as db:
+        total = db.execute(select(func.count()).select_from(LearningResource)).scalar() if full \
+            else count_pending(db, version)
+
+        def collect(results):
+            nonlocal scanned, flagged
+            flagged += _store(db, version, results)
+            scanned += len(results)
+            if progress and total:
+                progress(scanned / total)
+
+        def pages():
+            last_id = 0
+            while True:
+                rows = db.execute(
+                    _pending_query(version, full)
+                    .where(LearningResource.id > last_id)
+                    .order_by(LearningResource.id)
+                    .limit(page_size)
+                ).all()
+                if not rows:
+                    return
+                last_id = rows[-1][0]
+                yield [tuple(row) for row in rows]
+
+        if workers <= 1:
+            for rows in pages():
+                collect(scan_resources(rows))
+        else:
+            # spawn: forking a threaded server process is unsafe
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                # Bounded read-ahead keeps memory flat: a page is only fetched
+                # once an earlier one has been stored
+                in_flight = deque()
+                for rows in pages():
+                    in_flight.append(pool.submit(scan_resources, rows))
+                    if len(in_flight) >= workers * 2:
+                        collect(in_flight.popleft().result())
+                while in_flight:
+                    collect(in_flight.popleft().result())
+
+    print(f"Privacy audit ({version}): scanned {scanned} resources, {flagged} flagged")
+    return {"rule_version": version, "scanned": scanned, "flagged": flagged}
+
+async def privacy_audit_job(ctx: JobContext) -> None:
+    """Job handler: run the audit off the event loop, reporting progress."""
+    await run_in_threadpool(
+        run_privacy_audit,
+        session_factory=ctx.session_factory,
+        full=bool(ctx.payload.get("full")),
+        progress=ctx.report_progress,
+    )
@@ -0,0 +1,120 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import DateTime, String, and_, bindparam, or_, type_coerce
+from sqlalchemy.orm import Session, Query
+
+from app.models.database import LearningResource
+
+# Columns exposed by ResourceResponse. Metadata endpoints select exactly these
+# so the `content` blob never leaves the database when listing resources.
+RESOURCE_METADATA_COLUMNS = (
+    LearningResource.id,
+    LearningResource.title,
+    LearningResource.category,
+    LearningResource.media_type,
+    LearningResource.file_url,
+    LearningResource.size,
+    LearningResource.duration,
+    LearningResource.width,
+    LearningResource.height,
+    LearningResource.key_points,
+    LearningResource.patient_anonymized,
+    LearningResource.transcript,
+    LearningResource.created_at,
+    LearningResource.updated_at,
+    LearningResource.content_hash,
+    LearningResource.content_encoding,
+)
+
+def resource_metadata_query(db: Session) -> Query:
+    """
+    Projection query over resource metadata.
+    Returns lightweight rows (no ORM identity tracking) that ResourceResponse
+    can validate directly via from_attributes.
+    """
+    return db.query(*RESOURCE_METADATA_COLUMNS)
+
+def filter_resources(
+    query: Query,
+    category: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+) -> Query:
+    """The list filters: one category and an inclusive created_at range."""
+    if category:
+        query = query.filter(LearningResource.category == category)
+    if start_date:
+        query = query.filter(LearningResource.created_at >= start_date)
+    if end_date:
+        query = query.filter(LearningResource.created_at <= end_date)
+    return query
+
+def get_resource_metadata(db: Session, resource_id: int):
+    return resource_metadata_query(db).filter(LearningResource.id == resource_id).first()
+
+def get_resource_entity(db: Session, resource_id: int):
+    """
+    Load the ORM entity for writes. `content` stays deferred, so updating or
+    deleting a resource does not read its bytes.
+    """
+    return db.query(LearningResource).filter(LearningResource.id == resource_id).first()
+
+class InvalidCursor(ValueError):
+    pass
+
+# created_at as the database stores it. On SQLite that is the raw text, which
+# may or may not carry microseconds depending on who wrote the row; cursors
+# must compare against that text, not a re-formatted datetime, or rows that
+# share a timestamp get skipped or repeated across pages.
+CURSOR_SORT_KEY = type_coerce(LearningResource.created_at, String).label("cursor_created_at")
+
+def encode_cursor(created_at, resource_id: int) -> str:
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    raw = json.dumps([created_at, resource_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, resource_id = json.loads(raw)
+        if not isinstance(created_at, str) or not isinstance(resource_id, int):
+            raise ValueError
+        # Postgres binds it as a timestamp; a malformed one is the client's error
+        datetime.fromisoformat(created_at)
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    return created_at, resource_id
+
+def paginate_resources(query: Query, limit: int, cursor: Optional[str] = None):
+    """
+    Keyset pagination over (created_at, id) descending.
+    Every page is an index range scan starting right after the cursor, so
+    page 1000 costs the same as page 1. Returns (rows, next_cursor).
+    """
+    if cursor:
+        created_at, resource_id = decode_cursor(cursor)
+        if query.session.get_bind().dialect.name == "sqlite":
+            created_param = bindparam("cursor_created_at", created_at, type_=String)
+        else:
+            created_param = bindparam("cursor_created_at", datetime.fromisoformat(created_at), type_=DateTime(timezone=True))
+        query = query.filter(or_(
+            LearningResource.created_at < created_param,
+            and_(LearningResource.created_at == created_param, LearningResource.id < resource_id),
+        ))
+
+    rows = (
+        query.add_columns(CURSOR_SORT_KEY)
+        .order_by(LearningResource.created_at.desc(), LearningResource.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.cursor_created_at, last.id)
+    return rows, next_cursor
@@ -0,0 +1,159 @@
+import importlib.util
+import io
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import RENDITION_QUALITY, RENDITION_SIZES, RENDITION_WORKERS
+from app.core.jobs import JobContext, enqueue
+from app.models.database import Job, JobStatus, LearningResource, MediaBlob, MediaType, ResourceRendition
+from app.storage import get_default_backend, open_resource_blob
+from app.storage.blobs import release_blob, store_deduplicated
+
+class RenditionError(Exception):
+    """The original could not be decoded or resized."""
+
+def pillow_available() -> bool:
+    return importlib.util.find_spec("PIL") is not None
+
+def render_renditions(data: bytes, sizes: Dict[str, int], quality: int = RENDITION_QUALITY) -> Dict[str, Tuple[bytes, int, int]]:
+    """
+    Decode an image once and produce a JPEG no larger than each longest edge
+    in `sizes`: {name: (jpeg bytes, width, height)}. Runs in worker processes.
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            results = {}
+            # Largest first, each step resampling the previous one is faster
+            # than going back to the full original every time
+            source = image
+            for name, edge in sorted(sizes.items(), key=lambda item: -item[1]):
+                rendition = source.copy()
+                rendition.thumbnail((edge, edge), Image.LANCZOS)
+                out = io.BytesIO()
+                rendition.save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+                results[name] = (out.getvalue(), rendition.width, rendition.height)
+                source = rendition
+            return results
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise RenditionError(str(e)) from e
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def _render(data: bytes, sizes: Dict[str, int]) -> Dict[str, Tuple[bytes, int, int]]:
+    global _pool
+    if RENDITION_WORKERS <= 0:
+        return render_renditions(data, sizes)
+    if _pool is None:
+        # spawn: forking a threaded server process is unsafe
+        _pool = ProcessPoolExecutor(max_workers=RENDITION_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool.submit(render_renditions, data, sizes).result()
+
+def fresh_renditions(db: Session, resource: LearningResource) -> Dict[str, ResourceRendition]:
+    """Stored renditions made from the resource's current content."""
+    rows = db.query(ResourceRendition).filter(ResourceRendition.resource_id == resource.id)
+    return {row.name: row for row in rows if row.source_hash == resource.content_hash}
+
+def queue_renditions(db: Session, resource: LearningResource) -> bool:
+    """
+    Enqueue a renditions job for the resource's current content unless one
+    is already waiting or running, or one for this content already failed
+    (an image Pillow cannot read would otherwise be retried on every
+    request). The caller commits and notifies the worker when this returns True.
+    """
+    payload = {"source_hash": resource.content_hash}
+    jobs = db.query(Job.status, Job.payload).filter(Job.kind == "renditions", Job.resource_id == resource.id)
+    for status, job_payload in jobs:
+        if status in (JobStatus.PENDING, JobStatus.RUNNING):
+            return False
+        if status == JobStatus.FAILED and json.loads(job_payload or "{}") == payload:
+            return False
+    enqueue(db, "renditions", resource_id=resource.id, payload=payload)
+    return True
+
+def ensure_renditions(db: Session, resource: LearningResource) -> Dict[str, ResourceRendition]:
+    """
+    Make any missing or stale renditions of an image resource and commit them.
+    Raises RenditionError if the original cannot be decoded. Decodes the
+    whole original, so it runs in jobs, not in requests.
+    """
+    existing = {
+        row.name: row
+        for row in db.query(ResourceRendition).filter(ResourceRendition.resource_id == resource.id)
+    }
+    fresh = {name: row for name, row in existing.items() if row.source_hash == resource.content_hash}
+    missing = {name: edge for name, edge in RENDITION_SIZES.items() if name not in fresh}
+    if not missing:
+        return fresh
+
+    blob = open_resource_blob(db, resource)
+    if blob is None:
+        raise RenditionError("original not found")
+    rendered = _render(b"".join(blob.iter_range(0, blob.size - 1)), missing)
+
+    storage = get_default_backend(db)
+    keys = []
+    cleanups: List[Optional[Callable[[], None]]] = []
+    try:
+        for name, (jpeg, width, height) in rendered.items():
+            key = storage.new_key(resource.id, f"{name}.jpg")
+            keys.append(key)
+            stored: MediaBlob = store_deduplicated(db, storage, key, io.BytesIO(jpeg))
+            values = dict(source_hash=resource.content_hash, content_hash=stored.sha256,
+                          width=width, height=height, size=stored.size)
+            row = existing.get(name)
+            if row is not None:
+                # Stale: drop the reference to what it was made from before
+                cleanups.append(release_blob(db, row.content_hash))
+                for field, value in values.items():
+                    setattr(row, field, value)
+            else:
+                row = ResourceRendition(resource_id=resource.id, name=name, **values)
+                try:
+                    with db.begin_nested():
+                        db.add(row)
+                except IntegrityError:
+                    # A concurrent request made it first; keep theirs
+                    cleanups.append(release_blob(db, stored.sha256))
+                    row = db.get(ResourceRendition, (resource.id, name))
+            fresh[name] = row
+        db.commit()
+    except Exception:
+        db.rollback()
+        if storage.scheme != "db":
+            for key in keys:
+                storage.delete(key)
+        raise
+    for cleanup in cleanups:
+        if cleanup:
+            cleanup()
+    return fresh
+
+def release_renditions(db: Session, resource_id: int) -> List[Optional[Callable[[], None]]]:
+    """Delete a resource's renditions. Same callback contract as release_blob."""
+    rows = db.query(ResourceRendition).filter(ResourceRendition.resource_id == resource_id).all()
+    cleanups = [release_blob(db, row.content_hash) for row in rows]
+    for row in rows:
+        db.delete(row)
+    return cleanups
+
+def _renditions_for(session_factory, resource_id: int) -> None:
+    with session_factory() as db:
+        resource = db.get(LearningResource, resource_id)
+        if resource is None or resource.media_type != MediaType.IMAGE:
+            return
+        ensure_renditions(db, resource)
+
+async def renditions_job(ctx: JobContext) -> None:
+    """Job handler: pre-generate an uploaded image's renditions."""
+    await run_in_threadpool(_renditions_for, ctx.session_factory, ctx.resource_id)
@@ -0,0 +1,121 @@
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import Date, cast, delete, extract, func, insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.database import LearningResource, ResourceDailyCount
+
+def _media_type(value) -> str:
+    return getattr(value, "value", value)
+
+def _day(created_at) -> date:
+    if isinstance(created_at, datetime):
+        return created_at.date()
+    if isinstance(created_at, date):
+        return created_at
+    return date.fromisoformat(str(created_at)[:10])
+
+def bump_daily_count(db: Session, day: date, category: str, media_type, delta: int) -> None:
+    """Add `delta` to one rollup cell. Runs in the caller's transaction."""
+    key = (
+        ResourceDailyCount.day == day,
+        ResourceDailyCount.category == category,
+        ResourceDailyCount.media_type == _media_type(media_type),
+    )
+    # Increment in SQL so concurrent writers never lose an update
+    updated = db.execute(
+        update(ResourceDailyCount).where(*key)
+        .values(count=ResourceDailyCount.count + delta)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if updated:
+        if delta < 0:
+            db.execute(delete(ResourceDailyCount).where(*key, ResourceDailyCount.count <= 0))
+        return
+    if delta <= 0:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(ResourceDailyCount).values(
+                day=day, category=category, media_type=_media_type(media_type), count=delta
+            ))
+    except IntegrityError:
+        # A concurrent writer created the cell first
+        bump_daily_count(db, day, category, media_type, delta)
+
+def count_created(db: Session, resource: LearningResource) -> None:
+    """Record a new resource. Call after flush, so created_at is set."""
+    bump_daily_count(db, _day(resource.created_at), resource.category, resource.media_type, 1)
+
+def count_deleted(db: Session, resource: LearningResource) -> None:
+    bump_daily_count(db, _day(resource.created_at), resource.category, resource.media_type, -1)
+
+def count_recategorized(db: Session, resource: LearningResource, old_category: str) -> None:
+    """Move a resource's count after its category changed."""
+    day = _day(resource.created_at)
+    bump_daily_count(db, day, old_category, resource.media_type, -1)
+    bump_daily_count(db, day, resource.category, resource.media_type, 1)
+
+def rename_category_counts(db: Session, old_name: str, new_name: str) -> None:
+    """Fold every cell of `old_name` into `new_name`, O(days) rows."""
+    if old_name == new_name:
+        return
+    cells = db.execute(
+        select(ResourceDailyCount.day, ResourceDailyCount.media_type, ResourceDailyCount.count)
+        .where(ResourceDailyCount.category == old_name)
+    ).all()
+    db.execute(delete(ResourceDailyCount).where(ResourceDailyCount.category == old_name))
+    for day, media_type, count in cells:
+        bump_daily_count(db, day, new_name, media_type, count)
+
+def _day_expression(engine: Engine):
+    if engine.dialect.name == "sqlite":
+        # CAST(... AS DATE) yields a number on SQLite; date() gives YYYY-MM-DD
+        return func.date(LearningResource.created_at)
+    return cast(LearningResource.created_at, Date)
+
+def rebuild_daily_counts(engine: Engine, only_if_empty: bool = False) -> int:
+    """
+    Recompute the rollup from learning_resources in one INSERT ... SELECT.
+    Returns the number of cells written.
+    """
+    with Session(engine) as db:
+        if only_if_empty:
+            if db.execute(select(ResourceDailyCount.day).limit(1)).first() is not None:
+                return 0
+            if db.execute(select(LearningResource.id).limit(1)).first() is None:
+                return 0
+        day = _day_expression(engine)
+        db.execute(delete(ResourceDailyCount))
+        db.execute(insert(ResourceDailyCount).from_select(
+            ["day", "category", "media_type", "count"],
+            select(day, LearningResource.category, LearningResource.media_type, func.count())
+            .group_by(day, LearningResource.category, LearningResource.media_type),
+        ))
+        cells = db.execute(select(func.count()).select_from(ResourceDailyCount)).scalar()
+        db.commit()
+    print(f"Daily counts rebuilt: {cells} cells")
+    return cells
+
+def daily_counts(db: Session, start: Optional[date] = None, end: Optional[date] = None,
+                 category: Optional[str] = None, media_type: Optional[str] = None,
+                 month_of_year: Optional[int] = None):
+    """Per-day totals for start <= day < end, read from the rollup only."""
+    query = db.query(
+        ResourceDailyCount.day.label("date"),
+        func.sum(ResourceDailyCount.count).label("count"),
+    )
+    if start:
+        query = query.filter(ResourceDailyCount.day >= start)
+    if end:
+        query = query.filter(ResourceDailyCount.day < end)
+    if category:
+        query = query.filter(ResourceDailyCount.category == category)
+    if media_type:
+        query = query.filter(ResourceDailyCount.media_type == _media_type(media_type))
+    if month_of_year:
+        query = query.filter(extract("month", ResourceDailyCount.day) == month_of_year)
+    return query.group_by(ResourceDailyCount.day).order_by(ResourceDailyCount.day).all()
@@ -0,0 +1,206 @@
+import html
+import re
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.models.database import Base, LearningResource
+
+# Full-text index over title, key_points and transcript.
+#
+# Neither SQLite's unicode61 tokenizer nor PostgreSQL's 'simple' config split
+# Chinese into words, so tokenization happens here: CJK runs become
+# overlapping bigrams ("牙体预备" -> 牙体 体预 预备) and other words are
+# lowercased as-is. Both backends index the resulting space-separated
+# tokens, so ranking and matching behave the same on either database.
+
+SEARCH_TABLE = "resource_search"
+
+# Relative weight of each field when ranking (title counts most)
+FIELD_WEIGHTS = {"title": 10.0, "key_points": 5.0, "transcript": 1.0}
+SEARCH_FIELDS = tuple(FIELD_WEIGHTS)
+
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+TOKEN_RE = re.compile(rf"([{_CJK}]+)|([^\W_{_CJK}]+)")
+
+def _terms(value: str) -> List[Tuple[str, bool]]:
+    """Split text into (term, is_cjk) pieces."""
+    return [(m.group(0).lower(), m.group(1) is not None) for m in TOKEN_RE.finditer(value or "")]
+
+def _bigrams(run: str) -> List[str]:
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+def tokenize(value: Optional[str]) -> str:
+    """Text as indexed: CJK bigrams and lowercased words, space separated."""
+    tokens = []
+    for term, is_cjk in _terms(value):
+        tokens.extend(_bigrams(term) if is_cjk else [term])
+    return " ".join(tokens)
+
+def _query_tokens(query: str) -> List[Tuple[str, bool]]:
+    """(token, prefix) pairs every match must contain."""
+    tokens = []
+    for term, is_cjk in _terms(query):
+        if is_cjk and len(term) == 1:
+            # Only bigrams are indexed; a lone character matches as a prefix
+            tokens.append((term, True))
+        elif is_cjk:
+            tokens.extend((gram, False) for gram in _bigrams(term))
+        else:
+            tokens.append((term, False))
+    # Keep order, drop repeats
+    return list(dict.fromkeys(tokens))
+
+def _is_postgres(bind) -> bool:
+    return bind.dialect.name == "postgresql"
+
+def create_search_index(target, connection: Connection, **kw) -> None:
+    """Create the search table if missing. Runs after every create_all()."""
+    if connection.dialect.name == "sqlite":
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+            "USING fts5(title, key_points, transcript)"
+        ))
+    elif _is_postgres(connection):
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} "
+            "(resource_id INTEGER PRIMARY KEY, document TSVECTOR NOT NULL)"
+        ))
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document "
+            f"ON {SEARCH_TABLE} USING GIN (document)"
+        ))
+
+event.listen(Base.metadata, "after_create", create_search_index)
+
+def index_resource(db: Session, resource: LearningResource) -> None:
+    """(Re)index one resource. Runs inside the caller's transaction."""
+    fields = {name: tokenize(getattr(resource, name)) for name in SEARCH_FIELDS}
+    if _is_postgres(db.get_bind()):
+        db.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (resource_id, document) VALUES (:id, "
+            "setweight(to_tsvector('simple', :title), 'A') || "
+            "setweight(to_tsvector('simple', :key_points), 'B') || "
+            "setweight(to_tsvector('simple', :transcript), 'D')) "
+            "ON CONFLICT (resource_id) DO UPDATE SET document = EXCLUDED.document"
+        ), {"id": resource.id, **fields})
+    else:
+        db.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :id"), {"id": resource.id})
+        db.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, title, key_points, transcript) "
+            "VALUES (:id, :title, :key_points, :transcript)"
+        ), {"id": resource.id, **fields})
+
+def unindex_resource(db: Session, resource_id: int) -> None:
+    column = "resource_id" if _is_postgres(db.get_bind()) else "rowid"
+    db.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE {column} = :id"), {"id": resource_id})
+
+def rebuild_search_index(engine: Engine, only_if_empty: bool = False) -> int:
+    """Index every resource from scratch. Returns the number indexed."""
+    with Session(engine) as db:
+        if only_if_empty:
+            indexed = db.execute(text(f"SELECT 1 FROM {SEARCH_TABLE} LIMIT 1")).first()
+            if indexed is not None:
+                return 0
+        db.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+        count = 0
+        rows = db.execute(
+            select(LearningResource.id, *(getattr(LearningResource, name) for name in SEARCH_FIELDS))
+        )
+        for row in rows:
+            index_resource(db, row)
+            count += 1
+        db.commit()
+    if count:
+        print(f"Search index rebuilt: {count} resources")
+    return count
+
+def search_resource_ids(db: Session, query: str, category: Optional[str] = None,
+                        limit: int = 20, offset: int = 0) -> List[Tuple[int, float]]:
+    """
+    Matching resource ids with their scores, best first. Every query term
+    must match in some field; title matches outrank key points, which
+    outrank transcript matches.
+    """
+    tokens = _query_tokens(query)
+    if not tokens:
+        return []
+    params = {"limit": limit, "offset": offset}
+    category_join = ""
+    if category:
+        category_join = "JOIN learning_resources lr ON lr.id = {id} AND lr.category = :category"
+        params["category"] = category
+
+    if _is_postgres(db.get_bind()):
+        params["q"] = " & ".join(f"{token}:*" if prefix else token for token, prefix in tokens)
+        sql = (
+            f"SELECT s.resource_id, ts_rank(s.document, q) AS score "
+            f"FROM {SEARCH_TABLE} s {category_join.format(id='s.resource_id')} "
+            ", to_tsquery('simple', :q) q WHERE s.document @@ q "
+            "ORDER BY score DESC, s.resource_id DESC LIMIT :limit OFFSET :offset"
+        )
+        return [(row[0], float(row[1])) for row in db.execute(text(sql), params)]
+
+    def quote(token: str) -> str:
+        return '"' + token.replace('"', '""') + '"'
+
+    params["q"] = " AND ".join(quote(token) + ("*" if prefix else "") for token, prefix in tokens)
+    weights = ", ".join(str(w) for w in FIELD_WEIGHTS.values())
+    sql = (
+        f"SELECT {SEARCH_TABLE}.rowid, bm25({SEARCH_TABLE}, {weights}) AS score "
+        f"FROM {SEARCH_TABLE} {category_join.format(id=SEARCH_TABLE + '.rowid')} "
+        f"WHERE {SEARCH_TABLE} MATCH :q "
+        f"ORDER BY score, {SEARCH_TABLE}.rowid DESC LIMIT :limit OFFSET :offset"
+    )
+    # bm25() is lower-is-better; flip it so both backends rank high-is-better
+    return [(row[0], -float(row[1])) for row in db.execute(text(sql), params)]
+
+def _highlight_pattern(query: str) -> Optional[re.Pattern]:
+    terms = set()
+    for term, is_cjk in _terms(query):
+        terms.add(term)
+        if is_cjk:
+            terms.update(_bigrams(term))
+    if not terms:
+        return None
+    alternatives = sorted(terms, key=len, reverse=True)
+    return re.compile("|".join(re.escape(t) for t in alternatives), re.IGNORECASE)
+
+def highlight(value: Optional[str], pattern: re.Pattern, width: int = 40) -> Optional[str]:
+    """
+    HTML-escaped excerpt of `value` around its first match, with matches
+    wrapped in <mark>. None when nothing matches.
+    """
+    if not value:
+        return None
+    first = pattern.search(value)
+    if first is None:
+        return None
+    start = max(first.start() - width, 0)
+    end = min(first.end() + width * 2, len(value))
+    excerpt = value[start:end]
+
+    parts = []
+    pos = 0
+    for m in pattern.finditer(excerpt):
+        parts.append(html.escape(excerpt[pos:m.start()]))
+        parts.append(f"<mark>{html.escape(m.group(0))}</mark>")
+        pos = m.end()
+    parts.append(html.escape(excerpt[pos:]))
+    return ("…" if start > 0 else "") + "".join(parts) + ("…" if end < len(value) else "")
+
+def highlights_for(row, query: str) -> Dict[str, str]:
+    """Highlighted snippets for each field of `row` that matches the query."""
+    pattern = _highlight_pattern(query)
+    if pattern is None:
+        return {}
+    snippets = {}
+    for name in SEARCH_FIELDS:
+        snippet = highlight(getattr(row, name), pattern)
+        if snippet:
+            snippets[name] = snippet
+    return snippets
@@ -0,0 +1,169 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import bindparam, func, insert, select, update
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import (
+    METADATA_CACHE_SIZE,
+    SHARE_ACCESS_FLUSH_INTERVAL,
+    SHARE_ACCESS_MAX_BUFFERED,
+    SHARE_ACCESS_MAX_PENDING,
+    SessionLocal,
+)
+from app.models.database import ShareAccessEvent, ShareLink
+
+_links = ShareLink.__table__
+
+# One executemany statement per flush; the increment happens in SQL, so
+# concurrent flushes from several worker processes never lose a count
+_INCREMENT = (
+    update(_links)
+    .where(_links.c.id == bindparam("link_id"))
+    .values(access_count=func.coalesce(_links.c.access_count, 0) + bindparam("n"))
+)
+
+class ShareAccessBuffer:
+    """
+    Write-behind counter for share-link views.
+
+    Views are recorded in memory and flushed every `interval` seconds (or
+    once `max_pending` accumulate) as one transaction: a batched
+    `access_count = access_count + n` per link plus the event rows. A failed
+    flush puts its batch back for the next attempt, keeping at most
+    `max_buffered` views: while the database stays down the oldest are
+    dropped, so memory does not grow without bound. Views recorded since the
+    last flush are lost if the process is killed without a clean shutdown.
+
+    It also remembers the stored count of up to `max_links` recently viewed
+    links, refreshed by each flush, so count() needs no query per view.
+    """
+
+    def __init__(self, session_factory=SessionLocal, interval: float = SHARE_ACCESS_FLUSH_INTERVAL,
+                 max_pending: int = SHARE_ACCESS_MAX_PENDING, max_links: int = METADATA_CACHE_SIZE,
+                 max_buffered: int = SHARE_ACCESS_MAX_BUFFERED):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.max_pending = max_pending
+        self.max_buffered = max_buffered
+        self.max_links = max_links
+        self._lock = threading.Lock()
+        self._counts: Dict[int, int] = {}
+        self._stored: "OrderedDict[int, int]" = OrderedDict()
+        self._events: List[dict] = []
+        self._loop_task: Optional[asyncio.Task] = None
+        self._event_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def record(self, share_link_id: int, resource_id: int) -> None:
+        """Count one view. Safe to call from any thread."""
+        with self._lock:
+            self._counts[share_link_id] = self._counts.get(share_link_id, 0) + 1
+            self._events.append({
+                "share_link_id": share_link_id,
+                "resource_id": resource_id,
+                "accessed_at": datetime.now(timezone.utc),
+            })
+            full = len(self._events) >= self.max_pending
+        if full and self._event_loop is not None and self._wakeup is not None:
+            self._event_loop.call_soon_threadsafe(self._wakeup.set)
+
+    def pending(self, share_link_id: int) -> int:
+        """Views of a link not yet written to the database."""
+        with self._lock:
+            return self._counts.get(share_link_id, 0)
+
+    def count(self, share_link_id: int) -> int:
+        """
+        Views of a link: its stored count plus the views still buffered here.
+        The stored count is read once and then kept current by this process's
+        flushes, so views counted by other workers show up after the next
+        flush of the link.
+        """
+        with self._lock:
+            stored = self._stored.get(share_link_id)
+        if stored is None:
+            with self.session_factory() as db:
+                stored = db.execute(
+                    select(_links.c.access_count).where(_links.c.id == share_link_id)
+                ).scalar() or 0
+            self._remember({share_link_id: stored})
+        return stored + self.pending(share_link_id)
+
+    def forget(self) -> None:
+        """Drop the remembered stored counts; they are re-read on the next view."""
+        with self._lock:
+            self._stored.clear()
+
+    def _remember(self, stored: Dict[int, int]) -> None:
+        with self._lock:
+            for link_id, count in stored.items():
+                self._stored[link_id] = count or 0
+                self._stored.move_to_end(link_id)
+            while len(self._stored) > self.max_links:
+                self._stored.popitem(last=False)
+
+    def flush(self) -> int:
+        """Write everything buffered so far. Returns the number of views written."""
+        with self._lock:
+            counts, events = self._counts, self._events
+            self._counts, self._events = {}, []
+        if not events:
+            return 0
+        try:
+            with self.session_factory() as db:
+                db.execute(_INCREMENT, [{"link_id": link_id, "n": n} for link_id, n in counts.items()])
+                db.execute(insert(ShareAccessEvent), events)
+                stored = dict(db.execute(
+                    select(_links.c.id, _links.c.access_count).where(_links.c.id.in_(list(counts)))
+                ).all())
+                db.commit()
+        except Exception:
+            with self._lock:
+                for link_id, n in counts.items():
+                    self._counts[link_id] = self._counts.get(link_id, 0) + n
+                self._events[:0] = events
+                dropped = self._events[:max(len(self._events) - self.max_buffered, 0)]
+                for event in dropped:
+                    link_id = event["share_link_id"]
+                    self._counts[link_id] -= 1
+                    if not self._counts[link_id]:
+                        del self._counts[link_id]
+                del self._events[:len(dropped)]
+            if dropped:
+                print(f"Share access buffer full: dropped {len(dropped)} oldest views")
+            raise
+        self._remember(stored)
+        return len(events)
+
+    def start(self) -> None:
+        self._event_loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._loop_task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        if self._loop_task:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+        try:
+            await run_in_threadpool(self.flush)
+        except Exception as e:
+            print(f"Share access flush at shutdown failed: {e}")
+
+    async def _run_forever(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await run_in_threadpool(self.flush)
+            except Exception as e:
+                print(f"Share access flush failed: {e}")
+
+share_access_buffer = ShareAccessBuffer()
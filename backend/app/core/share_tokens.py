@@ -0,0 +1,115 @@
+import base64
+import hashlib
+import hmac
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, NamedTuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.core.config import SHARE_DENYLIST_REFRESH, SHARE_SIGNING_KEY, SessionLocal
+from app.models.database import ShareRevocation
+
+# Signed share tokens: "s.<link id>.<resource id>.<expires epoch>.<mac>".
+# The MAC is a truncated HMAC-SHA256 over the rest, so a token proves which
+# resource it opens and until when; only revocation needs outside state.
+# token_urlsafe() never produces ".", so random tokens cannot collide.
+
+SIGNED_PREFIX = "s."
+_MAC_BYTES = 16
+
+class InvalidShareToken(ValueError):
+    pass
+
+class SignedShare(NamedTuple):
+    link_id: int
+    resource_id: int
+    expires_at: datetime
+
+def signing_enabled() -> bool:
+    return bool(SHARE_SIGNING_KEY)
+
+def is_signed_token(token: str) -> bool:
+    return token.startswith(SIGNED_PREFIX)
+
+def _mac(body: str) -> str:
+    digest = hmac.new(SHARE_SIGNING_KEY.encode(), body.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:_MAC_BYTES]).decode().rstrip("=")
+
+def sign_share_token(link_id: int, resource_id: int, expires_at: datetime) -> str:
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    body = f"{SIGNED_PREFIX}{link_id}.{resource_id}.{int(expires_at.timestamp())}"
+    return f"{body}.{_mac(body)}"
+
+def verify_share_token(token: str) -> SignedShare:
+    """Decode a signed token, raising InvalidShareToken if it was not issued with our key."""
+    if not signing_enabled() or not is_signed_token(token):
+        raise InvalidShareToken(token)
+    body, _, mac = token.rpartition(".")
+    if not hmac.compare_digest(mac, _mac(body)):
+        raise InvalidShareToken(token)
+    try:
+        link_id, resource_id, expires = (int(part) for part in body[len(SIGNED_PREFIX):].split("."))
+    except ValueError:
+        raise InvalidShareToken(token)
+    return SignedShare(link_id, resource_id, datetime.fromtimestamp(expires, tz=timezone.utc))
+
+class ShareDenylist:
+    """
+    Revoked signed links held in memory as {link id: expiry epoch}.
+
+    Every `refresh_interval` seconds the whole unexpired set is read again,
+    so revocations made by other workers arrive within that delay. The set
+    is small, and unlike paging by id it cannot miss a row whose sequence
+    number committed after a higher one had been seen.
+    Entries are dropped once the token has expired on its own.
+    """
+
+    def __init__(self, session_factory=SessionLocal, refresh_interval: float = SHARE_DENYLIST_REFRESH):
+        self.session_factory = session_factory
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._revoked: Dict[int, float] = {}
+        self._next_refresh = 0.0
+
+    def load(self) -> None:
+        with self._lock:
+            self._revoked = {}
+        self.refresh()
+
+    def refresh(self) -> None:
+        with self.session_factory() as db:
+            rows = db.execute(
+                select(ShareRevocation.share_link_id, ShareRevocation.expires_at)
+                .where(ShareRevocation.expires_at > datetime.now(timezone.utc))
+            ).all()
+        now = time.time()
+        with self._lock:
+            # Merged rather than replaced, so a local revoke() whose
+            # transaction has not committed yet is not forgotten meanwhile
+            for link_id, expires_at in rows:
+                if expires_at.tzinfo is None:
+                    expires_at = expires_at.replace(tzinfo=timezone.utc)
+                self._revoked[link_id] = expires_at.timestamp()
+            self._revoked = {k: v for k, v in self._revoked.items() if v > now}
+            self._next_refresh = time.monotonic() + self.refresh_interval
+
+    def is_revoked(self, link_id: int) -> bool:
+        if time.monotonic() >= self._next_refresh:
+            self.refresh()
+        with self._lock:
+            return link_id in self._revoked
+
+    def revoke(self, db: Session, link_id: int, expires_at: datetime) -> None:
+        """Record a revocation in the caller's transaction and apply it locally at once."""
+        if db.execute(select(ShareRevocation.id).where(ShareRevocation.share_link_id == link_id)).first() is None:
+            db.execute(insert(ShareRevocation).values(share_link_id=link_id, expires_at=expires_at))
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        with self._lock:
+            self._revoked[link_id] = expires_at.timestamp()
+
+share_denylist = ShareDenylist()
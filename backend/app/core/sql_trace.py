@@ -0,0 +1,223 @@
+import json
+import secrets
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import SQL_REPEAT_THRESHOLD, SQL_SLOW_QUERY_MS, SQL_TRACE_PARAMS
+
+# Statements are attributed to the request being served through a context
+# variable: FastAPI runs sync handlers, dependencies and streaming bodies in
+# threads that inherit the request's context, so every statement they issue
+# lands on the same RequestTrace. Statements outside a request (jobs,
+# scripts) are still checked for slowness. Output is one JSON object per
+# line on stdout.
+
+# Statement types that can be EXPLAINed; anything else (PRAGMA, DDL) is not
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+# Longest parameter value logged as-is
+MAX_PARAM_LENGTH = 200
+# Distinct parameter sets remembered per statement; counting stops there
+MAX_DISTINCT_PARAMETERS = 1000
+
+class StatementStats:
+    __slots__ = ("count", "seconds", "parameter_sets")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.parameter_sets = set()
+
+class RequestTrace:
+    """The statements one request has run, grouped by SQL text."""
+
+    def __init__(self, request_id: str, method: str, path: str):
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.queries = 0
+        self.seconds = 0.0
+        self.slow = 0
+        self.statements: Dict[str, StatementStats] = {}
+        # Handlers can hop between threads mid-request
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, parameters, seconds: float, executemany: bool = False) -> None:
+        shortened = [loggable_parameters(row) for row in parameters] if executemany else loggable_parameters(parameters)
+        # Only a hash of the shortened form is kept, so blob inserts cost a few bytes each
+        key = hash(repr(shortened))
+        with self._lock:
+            self.queries += 1
+            self.seconds += seconds
+            stats = self.statements.get(statement)
+            if stats is None:
+                stats = self.statements[statement] = StatementStats()
+            stats.count += 1
+            stats.seconds += seconds
+            if len(stats.parameter_sets) < MAX_DISTINCT_PARAMETERS:
+                stats.parameter_sets.add(key)
+
+    def repeated(self, threshold: int) -> List[dict]:
+        """Statements run at least `threshold` times, most frequent first."""
+        with self._lock:
+            found = [
+                {"statement": statement, "count": stats.count, "distinct_parameters": len(stats.parameter_sets),
+                 "total_ms": round(stats.seconds * 1000, 3)}
+                for statement, stats in self.statements.items() if stats.count >= threshold
+            ]
+        return sorted(found, key=lambda entry: -entry["count"])
+
+    def describe(self) -> dict:
+        return {"id": self.request_id, "method": self.method, "path": self.path, "route": self.route}
+
+current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("current_trace", default=None)
+
+def emit(record: dict) -> None:
+    line = json.dumps({"ts": datetime.now(timezone.utc).isoformat(), **record}, ensure_ascii=False, default=str)
+    # One write per line, so lines from concurrent threads never interleave
+    sys.stdout.write(line + "\n")
+
+def _loggable(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, str) and len(value) > MAX_PARAM_LENGTH:
+        return value[:MAX_PARAM_LENGTH] + f"...<{len(value)} chars>"
+    return value
+
+def loggable_parameters(parameters):
+    """Parameters shaped for a log line: blobs and long text are shortened."""
+    if isinstance(parameters, dict):
+        return {key: _loggable(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_loggable(value) for value in parameters]
+    return _loggable(parameters)
+
+def explain(dialect: str, cursor, statement: str, parameters) -> Optional[List[str]]:
+    """
+    The plan of `statement`, run on the DB-API connection of `cursor` so it
+    sees the same transaction. EXPLAIN never executes the statement. On
+    Postgres it runs inside a savepoint, since a failed EXPLAIN would
+    otherwise abort the caller's transaction.
+    """
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    if verb not in EXPLAINABLE:
+        return None
+    if dialect == "sqlite":
+        prefix, savepoint = "EXPLAIN QUERY PLAN ", False
+    elif dialect == "postgresql":
+        prefix, savepoint = "EXPLAIN ", True
+    else:
+        return None
+    plan_cursor = cursor.connection.cursor()
+    try:
+        if savepoint:
+            plan_cursor.execute("SAVEPOINT sql_trace_explain")
+        try:
+            plan_cursor.execute(prefix + statement, parameters)
+            rows = plan_cursor.fetchall()
+        except Exception as e:
+            if savepoint:
+                plan_cursor.execute("ROLLBACK TO SAVEPOINT sql_trace_explain")
+            return [f"EXPLAIN failed: {e}"]
+        if savepoint:
+            plan_cursor.execute("RELEASE SAVEPOINT sql_trace_explain")
+    finally:
+        plan_cursor.close()
+    # SQLite: (id, parent, notused, detail); Postgres: one text line per row
+    return [str(row[3]) if dialect == "sqlite" else str(row[0]) for row in rows]
+
+def trace_engine(engine: Engine, slow_ms: float = SQL_SLOW_QUERY_MS, log: Callable[[dict], None] = emit) -> None:
+    """Time every statement on `engine`, attribute it to the current request and log the slow ones."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("sql_trace_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["sql_trace_start"].pop()
+        trace = current_trace.get()
+        if trace is not None:
+            trace.record(statement, parameters, seconds, executemany)
+        if seconds * 1000 < slow_ms:
+            return
+        if trace is not None:
+            trace.slow += 1
+        record = {
+            "event": "slow_query",
+            "request": trace.describe() if trace is not None else None,
+            "duration_ms": round(seconds * 1000, 3),
+            "statement": statement,
+            "executemany": executemany,
+        }
+        if SQL_TRACE_PARAMS:
+            record["parameters"] = (
+                f"<{len(parameters)} parameter sets>" if executemany else loggable_parameters(parameters)
+            )
+        if not executemany:
+            try:
+                record["plan"] = explain(engine.dialect.name, cursor, statement, parameters)
+            except Exception as e:
+                record["plan"] = [f"EXPLAIN failed: {e}"]
+        log(record)
+
+    @event.listens_for(engine, "handle_error")
+    def on_error(context):
+        starts = context.connection.info.get("sql_trace_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+class SqlTraceMiddleware:
+    """
+    Open a RequestTrace for each HTTP request and, once the response has
+    been sent, log its repeated statements (probable N+1) and a summary of
+    its SQL. Requests with nothing to report log nothing. The request id is
+    taken from X-Request-ID when the client sends one.
+    """
+
+    def __init__(self, app: ASGIApp, repeat_threshold: int = SQL_REPEAT_THRESHOLD,
+                 log: Callable[[dict], None] = emit):
+        self.app = app
+        self.repeat_threshold = repeat_threshold
+        self.log = log
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or secrets.token_hex(8)
+        trace = RequestTrace(request_id, scope["method"], scope["path"])
+        token = current_trace.set(trace)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_trace.reset(token)
+            trace.route = getattr(scope.get("route"), "path", None)
+            self._report(trace, time.perf_counter() - start)
+
+    def _report(self, trace: RequestTrace, seconds: float) -> None:
+        repeated = trace.repeated(self.repeat_threshold)
+        for entry in repeated:
+            self.log({"event": "n_plus_one", "request": trace.describe(), **entry})
+        if repeated or trace.slow:
+            self.log({
+                "event": "request_sql",
+                "request": trace.describe(),
+                "duration_ms": round(seconds * 1000, 3),
+                "queries": trace.queries,
+                "distinct_statements": len(trace.statements),
+                "sql_ms": round(trace.seconds * 1000, 3),
+                "slow_queries": trace.slow,
+                "repeated_statements": len(repeated),
+            })
@@ -0,0 +1,134 @@
+import asyncio
+import os
+import re
+import shutil
+import tempfile
+from collections import deque
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.cache import resource_cache
+from app.core.config import MAX_UPLOAD_SIZE, STORAGE_CHUNK_SIZE
+from app.core.jobs import JobContext
+from app.core.mp4 import ingest_media
+from app.models.database import LearningResource
+from app.storage import get_default_backend, open_resource_blob
+from app.storage.blobs import release_resource_bytes, store_deduplicated
+
+DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+
+def ffmpeg_available() -> bool:
+    return shutil.which("ffmpeg") is not None
+
+def transcode_command(in_path: str, out_path: str) -> list:
+    # Transcode: 720p, H.264 + AAC, ~2Mbps
+    return [
+        "ffmpeg", "-y", "-nostats", "-loglevel", "info", "-i", in_path,
+        "-vf", "scale=-2:720",
+        "-c:v", "libx264", "-preset", "veryfast", "-b:v", "2000k",
+        "-c:a", "aac", "-b:a", "128k",
+        # moov ahead of mdat, so playback starts before the download ends
+        "-movflags", "+faststart",
+        "-progress", "pipe:1",
+        out_path
+    ]
+
+async def transcode_video(ctx: JobContext) -> None:
+    """
+    Job handler: transcode a resource's video and swap the compressed
+    rendition in. The resource keeps serving the original until the swap.
+    """
+    if not ffmpeg_available():
+        raise RuntimeError("FFmpeg not found")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        in_path = os.path.join(tmpdir, "input.mp4")
+        out_path = os.path.join(tmpdir, "output.mp4")
+        found = await run_in_threadpool(_export_source, ctx, in_path)
+        if not found:
+            print(f"Job {ctx.job_id}: resource {ctx.resource_id} is gone, nothing to transcode")
+            return
+
+        await _run_ffmpeg(ctx, transcode_command(in_path, out_path))
+        await ctx.set_progress(1.0, force=True)
+        await run_in_threadpool(_swap_in, ctx, out_path)
+
+def _export_source(ctx: JobContext, in_path: str) -> bool:
+    with ctx.session_factory() as db:
+        resource = db.get(LearningResource, ctx.resource_id)
+        if resource is None:
+            return False
+        blob = open_resource_blob(db, resource)
+        if blob is None:
+            raise RuntimeError("Source file not found")
+        with open(in_path, "wb") as f:
+            for data in blob.iter_range(0, blob.size - 1):
+                f.write(data)
+    return True
+
+async def _run_ffmpeg(ctx: JobContext, cmd: list) -> None:
+    proc = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    duration: Optional[float] = None
+    stderr_tail = deque(maxlen=20)
+
+    async def read_stderr():
+        nonlocal duration
+        async for raw in proc.stderr:
+            line = raw.decode(errors="replace").rstrip()
+            stderr_tail.append(line)
+            if duration is None:
+                m = DURATION_RE.search(line)
+                if m:
+                    duration = int(m.group(1)) * 3600 + int(m.group(2)) * 60 + float(m.group(3))
+
+    async def read_progress():
+        # -progress writes key=value blocks; out_time_us is the output position
+        async for raw in proc.stdout:
+            key, _, value = raw.decode(errors="replace").strip().partition("=")
+            if key in ("out_time_us", "out_time_ms") and duration and value.isdigit():
+                await ctx.set_progress(int(value) / 1_000_000 / duration * 0.99)
+
+    try:
+        await asyncio.gather(read_stderr(), read_progress())
+        returncode = await proc.wait()
+    except asyncio.CancelledError:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        raise
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg exited with {returncode}: " + " | ".join(stderr_tail))
+
+def _swap_in(ctx: JobContext, out_path: str) -> None:
+    with ctx.session_factory() as db:
+        resource = db.get(LearningResource, ctx.resource_id)
+        if resource is None:
+            return
+        storage = get_default_backend(db)
+        key = storage.new_key(resource.id, "compressed.mp4")
+        try:
+            with open(out_path, "rb") as f:
+                reader, info = ingest_media(f)
+                blob = store_deduplicated(
+                    db, storage, key, reader, max_size=MAX_UPLOAD_SIZE, media_type=resource.media_type
+                )
+            cleanup = release_resource_bytes(db, resource)
+            resource.file_url = blob.storage_url
+            resource.content_hash = blob.sha256
+            resource.content_encoding = blob.encoding
+            resource.size = blob.size
+            if info is not None and info.width:
+                # Scaled to 720p
+                resource.width, resource.height = info.width, info.height
+            db.commit()
+            resource_cache.invalidate(resource.id)
+        except Exception:
+            db.rollback()
+            if storage.scheme != "db":
+                storage.delete(key)
+            raise
+        if cleanup:
+            cleanup()
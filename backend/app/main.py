@@ -2,21 +2,42 @@ from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import anyio.to_thread
 
-from app.core.config import init_db, engine
+from app.core.config import init_db, engine, SQL_TRACE, THREADPOOL_SIZE, UPLOADS_DIR
 from app.core.migration import check_and_migrate_tables
+from app.core.uploads import UploadSizeLimitMiddleware
+from app.core.metrics import MetricsMiddleware, instrument_engine, metrics
+from app.core.sql_trace import SqlTraceMiddleware, trace_engine
+from app.storage.responses import RangeStaticFiles
+from app.core.jobs import job_worker
+from app.core.share_access import share_access_buffer
+from app.core.share_tokens import share_denylist
 from app.api.resources import router as resources_router
 from app.api.shares import router as shares_router
 from app.api.categories import router as categories_router
+from app.api.admin import router as admin_router
+from app.api.jobs import router as jobs_router
+from app.api.metrics import router as metrics_router
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Sync route handlers and run_in_threadpool share this limiter
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
     init_db()
     try:
         check_and_migrate_tables(engine)
     except Exception as e:
         print(f"Migration warning: {e}")
+    # Revoked signed share links, checked in memory on every share view
+    share_denylist.load()
+    job_worker.start()
+    share_access_buffer.start()
+    metrics.start()
     yield
+    await job_worker.stop()
+    await share_access_buffer.stop()
+    await metrics.stop()
 
 app = FastAPI(
     title="MedStudy-Archive API",
@@ -32,12 +53,17 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(UploadSizeLimitMiddleware)
+if SQL_TRACE:
+    app.add_middleware(SqlTraceMiddleware)
+    trace_engine(engine)
+# Outermost, so rejected uploads and CORS preflights are counted too
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
 
 # Ensure uploads directory exists to prevent StaticFiles error
 import os
-# Use absolute path to ensure we create/mount the correct directory regardless of CWD
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-UPLOADS_DIR = os.path.join(BASE_DIR, "uploads")
+# UPLOADS_DIR is absolute so we create/mount the correct directory regardless of CWD
 try:
     os.makedirs(UPLOADS_DIR, exist_ok=True)
 except Exception as e:
@@ -45,13 +71,16 @@ except Exception as e:
 
 if os.path.exists(UPLOADS_DIR):
     print(f"Mounting uploads directory at: {UPLOADS_DIR}")
-    app.mount("/uploads", StaticFiles(directory=UPLOADS_DIR), name="uploads")
+    app.mount("/uploads", RangeStaticFiles(directory=UPLOADS_DIR), name="uploads")
 else:
     print(f"Warning: Uploads directory {UPLOADS_DIR} does not exist, skipping mount.")
 
 app.include_router(resources_router)
 app.include_router(shares_router)
 app.include_router(categories_router)
+app.include_router(admin_router)
+app.include_router(jobs_router)
+app.include_router(metrics_router)
 
 # Production: Serve React App
 import os
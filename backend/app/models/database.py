@@ -1,9 +1,28 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Enum as SQLEnum, func, LargeBinary
-from sqlalchemy.orm import declarative_base
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, Date, DateTime, Text, Float, Enum as SQLEnum, func, LargeBinary, Index
+from sqlalchemy.orm import declarative_base, deferred
+from sqlalchemy.types import TypeDecorator
 import enum
 
+from app.core.compression import compress_text, decompress_text
+
 Base = declarative_base()
 
+class CompressedText(TypeDecorator):
+    """
+    Text that is compressed in the row once it is long enough to be worth it.
+    Readers always get plain str; rows written before compression still load.
+    """
+
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        # SQLite keeps bytes as a BLOB even in a TEXT column
+        return compress_text(value, binary=dialect.name == "sqlite")
+
+    def process_result_value(self, value, dialect):
+        return decompress_text(value)
+
 class ResourceCategory(str, enum.Enum):
     CLINICAL_TEACHING = "临床带教"
     DOCTOR_PATIENT_COMMUNICATION = "医患沟通"
@@ -16,6 +35,12 @@ class MediaType(str, enum.Enum):
     IMAGE = "IMAGE"
     DOC = "DOC"
 
+class JobStatus(str, enum.Enum):
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
+
 class Category(Base):
     __tablename__ = "categories"
 
@@ -36,13 +61,83 @@ class LearningResource(Base):
     file_url = Column(String(500), nullable=False)
     size = Column(Integer, default=0)
     duration = Column(Integer, nullable=True) # Seconds
-    key_points = Column(Text, nullable=True)
+    # Display size of video resources, read from the uploaded file
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    key_points = Column(CompressedText, nullable=True)
     patient_anonymized = Column(Boolean, default=False)
-    transcript = Column(Text, nullable=True)
-    content = Column(LargeBinary, nullable=True) # Binary content of the file
+    transcript = Column(CompressedText, nullable=True)
+    # Binary content of the file. Deferred so metadata queries never pull the
+    # blob; only the content endpoint loads it explicitly.
+    content = deferred(Column(LargeBinary, nullable=True))
+    # SHA-256 of the stored bytes; points at media_blobs. NULL for rows
+    # uploaded before deduplication.
+    content_hash = Column(String(64), nullable=True, index=True)
+    # Codec of the stored bytes ("gzip", "zstd"), copied from media_blobs;
+    # NULL when they are stored as uploaded
+    content_encoding = Column(String(16), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+    # Keyset pagination walks (created_at, id) in descending order, with or
+    # without a category filter
+    __table_args__ = (
+        Index("ix_learning_resources_created_id", "created_at", "id"),
+        Index("ix_learning_resources_category_created_id", "category", "created_at", "id"),
+    )
+
+class ResourceChunk(Base):
+    # Chunks of files stored by the "db" storage backend (file_url db://<id>)
+    __tablename__ = "resource_chunks"
+
+    # Storage key, not a reference to learning_resources: the resource id for
+    # early uploads and migrated legacy rows, otherwise a random id in
+    # DatabaseStorage.NEW_KEY_RANGE (2^30 and up). The column keeps its
+    # original name so existing databases need no table rewrite.
+    resource_id = Column(Integer, primary_key=True)
+    seq = Column(Integer, primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+
+class MediaBlob(Base):
+    # One row per distinct payload. Resources with the same content share the
+    # stored bytes at storage_url; they are deleted when ref_count hits zero.
+    __tablename__ = "media_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    # sha256 and size describe the content; the bytes at storage_url are
+    # compressed with `encoding` when it is set
+    size = Column(BigInteger, nullable=False)
+    storage_url = Column(String(500), nullable=False)
+    encoding = Column(String(16), nullable=True)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ResourceRendition(Base):
+    # Downscaled copies of an image resource (thumbnail, medium), stored as
+    # deduplicated media blobs. source_hash is the content_hash of the
+    # original they were made from; a mismatch means they are stale.
+    __tablename__ = "resource_renditions"
+
+    resource_id = Column(Integer, primary_key=True)
+    name = Column(String(20), primary_key=True)
+    source_hash = Column(String(64), nullable=False)
+    content_hash = Column(String(64), nullable=False)
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ResourceDailyCount(Base):
+    # Resources created per day, category and media type. Kept in step with
+    # learning_resources by app.core.rollups so the timeline reads one row per
+    # day instead of scanning every resource.
+    __tablename__ = "resource_daily_counts"
+
+    day = Column(Date, primary_key=True)
+    category = Column(String(50), primary_key=True)
+    media_type = Column(String(10), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
 class ShareLink(Base):
     __tablename__ = "share_links"
 
@@ -53,3 +148,54 @@ class ShareLink(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     expires_at = Column(DateTime(timezone=True), nullable=False)
     access_count = Column(Integer, default=0)
+
+class ShareRevocation(Base):
+    # Revoked signed share links. Signed tokens are checked without a
+    # ShareLink lookup, so revocation must outlive the deleted row until the
+    # token would have expired anyway; see app.core.share_tokens.
+    __tablename__ = "share_revocations"
+
+    id = Column(Integer, primary_key=True)
+    share_link_id = Column(Integer, nullable=False, unique=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ShareAccessEvent(Base):
+    # One row per shared-resource view, written in batches by
+    # app.core.share_access. Kept after the link itself is revoked.
+    __tablename__ = "share_access_events"
+
+    id = Column(Integer, primary_key=True)
+    share_link_id = Column(Integer, nullable=False, index=True)
+    resource_id = Column(Integer, nullable=False, index=True)
+    accessed_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+class Job(Base):
+    # Background work (e.g. video transcoding) picked up by app.core.jobs
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)
+    resource_id = Column(Integer, nullable=True, index=True)
+    status = Column(SQLEnum(JobStatus, native_enum=False), nullable=False, default=JobStatus.PENDING, index=True)
+    progress = Column(Float, default=0.0)  # 0.0 - 1.0
+    attempts = Column(Integer, default=0)
+    payload = Column(Text, nullable=True)  # JSON
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Bumped on every progress report; doubles as the heartbeat used to
+    # requeue jobs whose worker died
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+class PrivacyFinding(Base):
+    # Latest privacy audit result per resource. rule_version identifies the
+    # rules in app/core/privacy.py the row was scanned with, so a rule change
+    # makes every row eligible for rescanning.
+    __tablename__ = "privacy_findings"
+
+    resource_id = Column(Integer, primary_key=True)
+    rule_version = Column(String(64), nullable=False, index=True)
+    risk_level = Column(String(10), nullable=False, index=True)
+    findings = Column(Text, nullable=True)  # JSON: {field: {"risk": ..., "alerts": [...]}}
+    scanned_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,8 +1,10 @@
 from pydantic import BaseModel, Field, model_validator
-from typing import Optional, List
+from typing import Any, Optional, List, Dict
 from datetime import datetime
 from enum import Enum
 
+from app.core.config import RENDITION_SIZES
+
 class ResourceCategory(str, Enum):
     CLINICAL_TEACHING = "临床带教"
     DOCTOR_PATIENT_COMMUNICATION = "医患沟通"
@@ -38,21 +40,50 @@ class ResourceResponse(BaseModel):
     file_url: str
     size: int = 0
     duration: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
     key_points: Optional[str]
     patient_anonymized: bool
     transcript: Optional[str]
     created_at: datetime
     updated_at: Optional[datetime]
+    # sha256 of the stored bytes; changes whenever the content does
+    content_hash: Optional[str] = None
+    # How the bytes are stored ("gzip", "zstd"); the content URL serves
+    # them decoded to clients that do not accept that coding
+    content_encoding: Optional[str] = None
+    # Images only: {"thumb": url, "medium": url, "original": url}
+    renditions: Optional[Dict[str, str]] = None
 
     @model_validator(mode='after')
     def transform_file_url(self):
-        if self.file_url and self.file_url.startswith("db://"):
+        # Stored files (db://, fs://, s3://) are only reachable through the API.
+        # The hash makes the URL content-addressed, so it can be cached forever.
+        if self.file_url and self.file_url.split("://", 1)[0] in ("db", "fs", "s3"):
             self.file_url = f"/api/resources/{self.id}/content"
+            if self.content_hash:
+                self.file_url += f"?v={self.content_hash}"
+                if self.media_type == MediaType.IMAGE:
+                    self.renditions = {
+                        name: f"/api/resources/{self.id}/renditions/{name}?v={self.content_hash}"
+                        for name in RENDITION_SIZES
+                    }
+                    self.renditions["original"] = self.file_url
         return self
 
     class Config:
         from_attributes = True
 
+class ResourcePage(BaseModel):
+    items: List[ResourceResponse]
+    # Opaque; pass back as ?cursor= to get the next page. None on the last page.
+    next_cursor: Optional[str] = None
+
+class SearchResult(ResourceResponse):
+    score: float
+    # Matching fields only, HTML-escaped with hits wrapped in <mark>
+    highlights: Dict[str, str] = {}
+
 class CategoryCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=50)
     type: str = "tag"
@@ -81,6 +112,38 @@ class ShareLinkResponse(BaseModel):
     expires_at: datetime
     access_count: int = 0
 
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    resource_id: Optional[int] = None
+    status: str
+    progress: float = 0.0
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class PrivacyFindingResponse(BaseModel):
+    resource_id: int
+    title: str
+    risk_level: str
+    rule_version: str
+    findings: Dict[str, Any] = {}
+    scanned_at: Optional[datetime] = None
+
+class PrivacyAuditSummary(BaseModel):
+    rule_version: str
+    # Resources not yet scanned under rule_version
+    pending: int
+    by_risk: Dict[str, int]
+    flagged: List[PrivacyFindingResponse]
+    # Audit job currently queued or running, if any
+    active_job: Optional[JobResponse] = None
+
 class PrivacyAlert(BaseModel):
     contains_patient_name: bool
     alert_message: str
@@ -0,0 +1,72 @@
+from typing import Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import STORAGE_BACKEND, UPLOADS_DIR
+from app.models.database import LearningResource
+from app.storage.base import IteratorReader, StorageBackend, StoredBlob
+from app.storage.compression import DecodedBlob
+from app.storage.database import DatabaseStorage
+from app.storage.filesystem import FilesystemStorage
+from app.storage.s3 import S3Storage
+
+BACKENDS = {
+    DatabaseStorage.scheme: DatabaseStorage,
+    FilesystemStorage.scheme: FilesystemStorage,
+    S3Storage.scheme: S3Storage,
+}
+
+_shared_s3: Optional[S3Storage] = None
+
+def get_backend(scheme: str, db: Session) -> StorageBackend:
+    """Instantiate the storage driver for `scheme`, bound to the request session."""
+    global _shared_s3
+    if scheme == DatabaseStorage.scheme:
+        return DatabaseStorage(db)
+    if scheme == FilesystemStorage.scheme:
+        return FilesystemStorage()
+    if scheme == S3Storage.scheme:
+        # boto3 clients are thread-safe and expensive to build; share one
+        if _shared_s3 is None:
+            _shared_s3 = S3Storage()
+        return _shared_s3
+    raise ValueError(f"Unknown storage backend: {scheme}")
+
+def get_default_backend(db: Session) -> StorageBackend:
+    return get_backend(STORAGE_BACKEND, db)
+
+def resolve(db: Session, resource: LearningResource) -> Tuple[StorageBackend, str]:
+    """Map a resource's file_url to the driver holding its bytes and the driver key."""
+    url = resource.file_url or ""
+    scheme, sep, key = url.partition("://")
+    if sep and scheme in BACKENDS:
+        if scheme == DatabaseStorage.scheme and not key.isdigit():
+            # Pre-storage-layer rows: db://<token>_<filename>, bytes filed
+            # under the resource's own id
+            key = str(resource.id)
+        return get_backend(scheme, db), key
+    # Legacy on-disk uploads (/uploads/<name>)
+    return FilesystemStorage(UPLOADS_DIR), url.lstrip("/").removeprefix("uploads/")
+
+def open_stored(db: Session, storage_url: str) -> Optional[StoredBlob]:
+    """Open bytes by their scheme://key storage URL (e.g. a media_blobs row)."""
+    scheme, _, key = storage_url.partition("://")
+    return get_backend(scheme, db).open(key)
+
+def open_resource_blob(db: Session, resource: LearningResource, decoded: bool = True) -> Optional[StoredBlob]:
+    """
+    The resource's bytes. Compressed payloads are decompressed on the fly
+    unless `decoded` is False, which gives the stored bytes (to copy them,
+    or to send them with Content-Encoding).
+    """
+    if "://" not in (resource.file_url or ""):
+        # Legacy rows may have been filled by migrate_files_to_db.py, which
+        # put the bytes in `content` but left the /uploads url in place
+        blob = DatabaseStorage(db).open(str(resource.id))
+        if blob is not None:
+            return blob
+    backend, key = resolve(db, resource)
+    blob = backend.open(key)
+    if blob is not None and decoded and resource.content_encoding:
+        return DecodedBlob(blob, resource.content_encoding, resource.size)
+    return blob
@@ -0,0 +1,96 @@
+import hashlib
+import io
+from typing import BinaryIO, Iterable, Iterator, Optional, Protocol
+
+from app.core.uploads import UploadTooLarge
+
+class StoredBlob(Protocol):
+    """Handle to a stored file that can be read by byte range."""
+
+    size: int
+    # Local filesystem path when the bytes can be handed to the server as a
+    # file (sendfile); None for blobs that must be streamed through Python.
+    path: Optional[str]
+
+    def iter_range(self, start: int, end: int) -> Iterator[bytes]:
+        """Yield bytes start..end (inclusive)."""
+        ...
+
+class StorageBackend:
+    """
+    A place file bytes live. Resources point at their bytes with
+    file_url = "<scheme>://<key>".
+    """
+
+    scheme: str = ""
+
+    def new_key(self, resource_id: int, filename: Optional[str]) -> str:
+        raise NotImplementedError
+
+    def save(self, key: str, source: BinaryIO) -> int:
+        """Copy a file-like object into storage under `key`. Returns the size."""
+        raise NotImplementedError
+
+    def open(self, key: str) -> Optional[StoredBlob]:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def url(self, key: str) -> str:
+        return f"{self.scheme}://{key}"
+
+class IteratorReader(io.RawIOBase):
+    """Expose an iterator of byte chunks as a readable file-like object."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            try:
+                self._pending = next(self._chunks)
+            except StopIteration:
+                return 0
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+class HashingReader(io.RawIOBase):
+    """
+    Pass-through reader that hashes and counts bytes as they are consumed,
+    raising UploadTooLarge once more than `max_size` bytes went through.
+    """
+
+    def __init__(self, source: BinaryIO, max_size: int = 0):
+        self._source = source
+        self._hash = hashlib.sha256()
+        self.size = 0
+        self.max_size = max_size
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._source.read(len(buffer))
+        if not data:
+            return 0
+        n = len(data)
+        buffer[:n] = data
+        self.size += n
+        if self.max_size and self.size > self.max_size:
+            raise UploadTooLarge(self.max_size)
+        self._hash.update(data)
+        return n
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+def safe_filename(filename: Optional[str]) -> str:
+    name = (filename or "file").replace("\\", "/").rsplit("/", 1)[-1]
+    return name.strip(". ") or "file"
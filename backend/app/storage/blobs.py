@@ -0,0 +1,130 @@
+from typing import BinaryIO, Callable, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.database import LearningResource, MediaBlob
+from app.storage import get_backend, resolve
+from app.storage.base import HashingReader, StorageBackend
+from app.storage.compression import compressing_reader
+
+def store_deduplicated(
+    db: Session,
+    storage: StorageBackend,
+    key: str,
+    source: BinaryIO,
+    max_size: int = 0,
+    media_type=None,
+) -> MediaBlob:
+    """
+    Stream `source` into `storage` under `key` while hashing it, then file the
+    payload in media_blobs. If the same SHA-256 is already stored, the fresh
+    copy is dropped and the existing blob gains a reference instead.
+    Hashing, size counting and the `max_size` check all happen on the same
+    pass, one storage chunk at a time. With a `media_type` the bytes may be
+    compressed on the way in (see compressing_reader); the hash and size are
+    always those of the content itself. Callers copy blob.encoding to the
+    resource.
+    The caller commits; on failure it must discard `key` from external storage.
+    """
+    reader = HashingReader(source, max_size)
+    stored, encoding = compressing_reader(reader, media_type) if media_type is not None else (reader, None)
+    storage.save(key, stored)
+    digest = reader.hexdigest()
+
+    blob = _add_reference(db, digest)
+    if blob is not None:
+        storage.delete(key)
+        return blob
+
+    blob = MediaBlob(sha256=digest, size=reader.size, storage_url=storage.url(key), ref_count=1, encoding=encoding)
+    try:
+        with db.begin_nested():
+            db.add(blob)
+    except IntegrityError:
+        # A concurrent upload of the same payload won the insert
+        blob = _add_reference(db, digest)
+        storage.delete(key)
+    return blob
+
+def _add_reference(db: Session, digest: str) -> Optional[MediaBlob]:
+    # Increment in SQL so concurrent uploads never lose a reference; a row
+    # deleted by a concurrent release simply matches nothing.
+    updated = db.execute(
+        update(MediaBlob)
+        .where(MediaBlob.sha256 == digest, MediaBlob.ref_count > 0)
+        .values(ref_count=MediaBlob.ref_count + 1)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not updated:
+        return None
+    blob = db.get(MediaBlob, digest)
+    db.refresh(blob)
+    return blob
+
+def release_blob(db: Session, digest: str) -> Optional[Callable[[], None]]:
+    """
+    Drop one reference to a payload. When it was the last one the blob row is
+    deleted and the stored bytes are removed: in the same transaction for the
+    db backend, otherwise through the returned callback, which the caller
+    runs after committing.
+    """
+    db.execute(
+        update(MediaBlob)
+        .where(MediaBlob.sha256 == digest)
+        .values(ref_count=MediaBlob.ref_count - 1)
+        .execution_options(synchronize_session=False)
+    )
+    blob = db.get(MediaBlob, digest)
+    if blob is None:
+        return None
+    db.refresh(blob)
+    if blob.ref_count > 0:
+        return None
+
+    scheme, _, key = blob.storage_url.partition("://")
+    storage = get_backend(scheme, db)
+    db.delete(blob)
+    if storage.scheme == "db":
+        storage.delete(key)
+        return None
+    return lambda: storage.delete(key)
+
+def release_resource_bytes(db: Session, resource: LearningResource) -> Optional[Callable[[], None]]:
+    """
+    Release whatever bytes `resource` points at, as part of deleting or
+    replacing it. Same contract as release_blob for the returned callback.
+    """
+    if resource.content_hash:
+        return release_blob(db, resource.content_hash)
+    # Pre-dedup rows own their bytes outright
+    storage, key = resolve(db, resource)
+    if storage.scheme == "db":
+        storage.delete(key)
+        return None
+    return lambda: storage.delete(key)
+
+def dedup_stats(db: Session) -> dict:
+    blobs, stored_bytes, references = db.execute(
+        select(
+            func.count(MediaBlob.sha256),
+            func.coalesce(func.sum(MediaBlob.size), 0),
+            func.coalesce(func.sum(MediaBlob.ref_count), 0),
+        )
+    ).one()
+    logical_bytes = db.execute(
+        select(func.coalesce(func.sum(MediaBlob.size * MediaBlob.ref_count), 0))
+    ).scalar()
+    undeduplicated = db.execute(
+        select(func.count(LearningResource.id)).where(LearningResource.content_hash.is_(None))
+    ).scalar()
+    return {
+        "blobs": blobs,
+        "references": references,
+        "logical_bytes": logical_bytes,
+        "stored_bytes": stored_bytes,
+        "bytes_saved": logical_bytes - stored_bytes,
+        "dedup_ratio": round(logical_bytes / stored_bytes, 4) if stored_bytes else 1.0,
+        "resources_without_hash": undeduplicated,
+    }
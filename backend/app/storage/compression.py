@@ -0,0 +1,51 @@
+import itertools
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from app.core.compression import compress_chunks, decompress_chunks, storage_codec, worth_compressing
+from app.core.config import STORAGE_CHUNK_SIZE
+from app.storage.base import IteratorReader, StoredBlob
+
+# Bytes looked at to decide whether a payload is worth compressing
+PROBE_SIZE = 64 * 1024
+
+def compressing_reader(source: BinaryIO, media_type) -> Tuple[BinaryIO, Optional[str]]:
+    """
+    What to store for `source`: its bytes compressed with the storage codec
+    when the media type and a probe of its head say so, else unchanged.
+    Returns (reader, encoding or None). Streams; nothing is read twice.
+    """
+    codec = storage_codec()
+    if codec is None:
+        return source, None
+    head = source.read(PROBE_SIZE)
+    chunks = itertools.chain([head], iter(lambda: source.read(STORAGE_CHUNK_SIZE), b""))
+    if not worth_compressing(media_type, head):
+        return IteratorReader(chunks), None
+    return IteratorReader(compress_chunks(chunks, codec)), codec
+
+class DecodedBlob:
+    """
+    The uncompressed view of a compressed stored blob. `size` is the content
+    size from the database row; ranges decode from the start and skip, so
+    they cost a read of everything before them.
+    """
+
+    path = None
+
+    def __init__(self, blob: StoredBlob, encoding: str, size: int):
+        self.blob = blob
+        self.encoding = encoding
+        self.size = size
+
+    def iter_range(self, start: int, end: int) -> Iterator[bytes]:
+        stored = self.blob.iter_range(0, self.blob.size - 1) if self.blob.size else iter(())
+        position = 0
+        for data in decompress_chunks(stored, self.encoding):
+            chunk_end = position + len(data)
+            if chunk_end > start:
+                piece = data[max(start - position, 0):end - position + 1]
+                if piece:
+                    yield piece
+            position = chunk_end
+            if position > end:
+                return
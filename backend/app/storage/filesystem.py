@@ -0,0 +1,74 @@
+import os
+import secrets
+import shutil
+from typing import BinaryIO, Iterator, Optional
+
+from app.core.config import STORAGE_CHUNK_SIZE, STORAGE_DIR
+from app.storage.base import StorageBackend, safe_filename
+
+class FileBlob:
+    """A file on local disk. Served with sendfile when the server supports it."""
+
+    def __init__(self, path: str, size: int, chunk_size: int = STORAGE_CHUNK_SIZE):
+        self.path = path
+        self.size = size
+        self.chunk_size = chunk_size
+
+    def iter_range(self, start: int, end: int) -> Iterator[bytes]:
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                data = f.read(min(self.chunk_size, remaining))
+                if not data:
+                    return
+                remaining -= len(data)
+                yield data
+
+class FilesystemStorage(StorageBackend):
+    scheme = "fs"
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = os.path.abspath(root or STORAGE_DIR)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise ValueError(f"Storage key escapes storage root: {key}")
+        return path
+
+    def new_key(self, resource_id: int, filename: Optional[str]) -> str:
+        return f"{resource_id}/{secrets.token_hex(8)}_{safe_filename(filename)}"
+
+    def save(self, key: str, source: BinaryIO) -> int:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write next to the target and rename so readers never see a partial file
+        tmp_path = f"{path}.{secrets.token_hex(4)}.part"
+        try:
+            with open(tmp_path, "wb") as f:
+                shutil.copyfileobj(source, f, STORAGE_CHUNK_SIZE)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return os.path.getsize(path)
+
+    def open(self, key: str) -> Optional[FileBlob]:
+        path = self._path(key)
+        if not os.path.isfile(path):
+            return None
+        return FileBlob(path, os.path.getsize(path))
+
+    def delete(self, key: str) -> None:
+        path = self._path(key)
+        if os.path.exists(path):
+            os.remove(path)
+        # Drop the per-resource directory once it is empty
+        parent = os.path.dirname(path)
+        if parent != self.root:
+            try:
+                os.rmdir(parent)
+            except OSError:
+                pass
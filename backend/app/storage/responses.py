@@ -0,0 +1,165 @@
+import os
+import secrets
+from typing import Iterator, List, Mapping, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response, StreamingResponse
+from starlette.staticfiles import StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from app.core.config import STORAGE_CHUNK_SIZE
+from app.core.http_cache import RangeNotSatisfiable, if_range_matches, parse_http_date, parse_range
+from app.storage.base import StoredBlob
+from app.storage.filesystem import FileBlob
+
+class FileRangeResponse(Response):
+    """
+    Send bytes start..end of a local file.
+
+    Uses the ASGI zero-copy extensions when the server advertises them
+    (`http.response.zerocopysend` for any range, `http.response.pathsend` for
+    whole files), so the kernel moves the bytes with sendfile. Otherwise the
+    file is read in STORAGE_CHUNK_SIZE pieces off the event loop.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        start: int,
+        end: int,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+    ):
+        self.path = path
+        self.start = start
+        self.end = end
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(headers)
+        self.headers["content-length"] = str(max(end - start + 1, 0))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        extensions = scope.get("extensions") or {}
+        count = max(self.end - self.start + 1, 0)
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+
+        if scope["method"].upper() == "HEAD" or count == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        size = os.path.getsize(self.path)
+        if "http.response.pathsend" in extensions and self.start == 0 and count == size:
+            await send({"type": "http.response.pathsend", "path": os.path.abspath(self.path)})
+            return
+
+        if "http.response.zerocopysend" in extensions:
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f,
+                    "offset": self.start,
+                    "count": count,
+                    "more_body": False,
+                })
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as f:
+            await f.seek(self.start)
+            remaining = count
+            while remaining > 0:
+                data = await f.read(min(STORAGE_CHUNK_SIZE, remaining))
+                if not data:
+                    break
+                remaining -= len(data)
+                await send({"type": "http.response.body", "body": data, "more_body": remaining > 0})
+            if remaining > 0:
+                # File shrank underneath us; close the body rather than hang
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+def _multipart_parts(blob: StoredBlob, ranges: List[Tuple[int, int]], media_type: str, boundary: str):
+    """(part header, start, end) for each range of a multipart/byteranges body."""
+    return [
+        (
+            f"--{boundary}\r\nContent-Type: {media_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{blob.size}\r\n\r\n".encode(),
+            start,
+            end,
+        )
+        for start, end in ranges
+    ]
+
+def _iter_multipart(blob: StoredBlob, parts, boundary: str) -> Iterator[bytes]:
+    for i, (header, start, end) in enumerate(parts):
+        yield (b"\r\n" if i else b"") + header
+        yield from blob.iter_range(start, end)
+    yield f"\r\n--{boundary}--\r\n".encode()
+
+def range_response(
+    blob: StoredBlob,
+    ranges: Optional[List[Tuple[int, int]]],
+    headers: Optional[Mapping[str, str]] = None,
+    media_type: Optional[str] = None,
+) -> Response:
+    """
+    The whole blob (ranges None), one range as a 206, or several as a
+    streamed multipart/byteranges 206. Nothing is read ahead of the socket:
+    local files use FileRangeResponse, other blobs their iter_range().
+    """
+    headers = dict(headers or {})
+    headers["Accept-Ranges"] = "bytes"
+    media_type = media_type or "application/octet-stream"
+
+    if not ranges or len(ranges) == 1:
+        start, end = ranges[0] if ranges else (0, blob.size - 1)
+        status_code = 206 if ranges else 200
+        if ranges:
+            headers["Content-Range"] = f"bytes {start}-{end}/{blob.size}"
+        if blob.path:
+            return FileRangeResponse(blob.path, start, end, status_code=status_code, headers=headers, media_type=media_type)
+        headers["Content-Length"] = str(max(end - start + 1, 0))
+        return StreamingResponse(blob.iter_range(start, end), status_code=status_code, headers=headers, media_type=media_type)
+
+    boundary = secrets.token_hex(12)
+    parts = _multipart_parts(blob, ranges, media_type, boundary)
+    # Exact length up front: clients show progress and keep the connection
+    length = sum(len(header) + end - start + 1 for header, start, end in parts)
+    length += 2 * (len(parts) - 1) + len(f"\r\n--{boundary}--\r\n")
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(
+        _iter_multipart(blob, parts, boundary),
+        status_code=206,
+        headers=headers,
+        media_type=f"multipart/byteranges; boundary={boundary}",
+    )
+
+def not_satisfiable(size: int, headers: Optional[Mapping[str, str]] = None) -> Response:
+    return Response(status_code=416, headers={**(headers or {}), "Content-Range": f"bytes */{size}"})
+
+class RangeStaticFiles(StaticFiles):
+    """StaticFiles that also answers Range and If-Range requests (legacy /uploads)."""
+
+    def file_response(self, full_path, stat_result, scope: Scope, status_code: int = 200) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        request_headers = Headers(scope=scope)
+        range_header = request_headers.get("range")
+        if response.status_code != 200 or not range_header:
+            response.headers["accept-ranges"] = "bytes"
+            return response
+
+        last_modified = parse_http_date(response.headers.get("last-modified", ""))
+        # Starlette's file ETag is derived from mtime and size, so it can act
+        # as a strong validator for If-Range
+        if not if_range_matches(request_headers.get("if-range"), response.headers.get("etag"), last_modified):
+            response.headers["accept-ranges"] = "bytes"
+            return response
+
+        validators = {k: v for k, v in response.headers.items() if k in ("etag", "last-modified")}
+        try:
+            ranges = parse_range(range_header, stat_result.st_size)
+        except RangeNotSatisfiable:
+            return not_satisfiable(stat_result.st_size, validators)
+        blob = FileBlob(str(full_path), stat_result.st_size)
+        return range_response(blob, ranges, validators, response.media_type)
@@ -0,0 +1,61 @@
+import sys
+import os
+import argparse
+from datetime import datetime
+
+# Add the parent directory to sys.path to allow importing app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.archive import export_archive, open_archive
+from app.core.bulk_import import Checkpoint, run_bulk_import
+from app.core.config import BULK_IMPORT_BATCH_SIZE, BULK_IMPORT_WORKERS, engine, init_db
+
+def export(args):
+    archive_format = args.format or ("tar" if args.output.endswith(".tar") else "zip")
+    written = 0
+    with open(args.output, "wb") as f:
+        for chunk in export_archive(engine, archive_format, args.category, args.start_date, args.end_date):
+            f.write(chunk)
+            written += len(chunk)
+    print(f"Exported {written / 1e6:.1f} MB to {args.output}")
+
+def load(args):
+    checkpoint = Checkpoint(args.checkpoint or f"{os.path.abspath(args.archive)}.checkpoint.jsonl")
+    with open_archive(args.archive) as (items, parallel):
+        result = run_bulk_import(
+            items,
+            checkpoint,
+            workers=args.workers if parallel else 1,
+            batch_size=args.batch_size,
+        )
+    for key, error in result["failures"]:
+        print(f"  failed: {key}: {error}")
+    sys.exit(1 if result["failed"] else 0)
+
+def main():
+    parser = argparse.ArgumentParser(description="Export resources to a zip/tar archive, or load one back")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="write resources and a metadata manifest to an archive")
+    export_parser.add_argument("output", help="archive to write (.zip or .tar)")
+    export_parser.add_argument("--format", choices=["zip", "tar"], help="default: from the output extension")
+    export_parser.add_argument("--category")
+    export_parser.add_argument("--start-date", type=datetime.fromisoformat)
+    export_parser.add_argument("--end-date", type=datetime.fromisoformat)
+
+    import_parser = commands.add_parser("import", help="load an exported archive as new resources")
+    import_parser.add_argument("archive")
+    import_parser.add_argument("--checkpoint", help="progress file used to resume (default: <archive>.checkpoint.jsonl)")
+    import_parser.add_argument("--workers", type=int, default=BULK_IMPORT_WORKERS, help="reader threads (zip only)")
+    import_parser.add_argument("--batch-size", type=int, default=BULK_IMPORT_BATCH_SIZE, help="files per commit")
+    args = parser.parse_args()
+
+    print(f"Database: {engine.url}")
+    init_db()
+    if args.command == "export":
+        export(args)
+    else:
+        load(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+import sys
+import os
+
+# Add the parent directory to sys.path to allow importing app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import engine, init_db
+from app.core.rollups import rebuild_daily_counts
+
+def main():
+    init_db()
+    cells = rebuild_daily_counts(engine)
+    print(f"Successfully backfilled {cells} daily count cells.")
+
+if __name__ == "__main__":
+    main()
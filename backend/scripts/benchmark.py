@@ -0,0 +1,332 @@
+import sys
+import os
+import argparse
+import asyncio
+import json
+import random
+import resource
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+# Add the parent directory to sys.path to allow importing app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.benchmark_concurrency import free_port, percentile
+
+SCENARIOS = ("listing", "timeline", "range", "upload", "share")
+# Regressions are judged on these; "higher" means bigger is worse
+COMPARED = (("p95_ms", "higher"), ("p99_ms", "higher"), ("rps", "lower"), ("peak_rss_mb", "higher"))
+# Options that do not change what is measured
+UNCOMPARED_SETTINGS = ("baseline", "save", "tolerance", "scenarios")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the main endpoints against a synthetic corpus and compare with a baseline"
+    )
+    parser.add_argument("--database-url", help="use this database as-is; defaults to a freshly generated SQLite file")
+    parser.add_argument("--resources", type=int, default=2000, help="resources to generate")
+    parser.add_argument("--shares", type=int, default=200, help="share links to generate")
+    parser.add_argument("--size-scale", type=float, default=0.05, help="payload size scale, see generate_mock_data.py")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--server", choices=("asgi", "uvicorn"), default="asgi",
+                        help="drive the app in-process over ASGI, or through a local uvicorn on a socket")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="clients in flight at once")
+    parser.add_argument("--range-kb", type=int, default=256, help="bytes requested per range, KiB")
+    parser.add_argument("--upload-kb", type=int, default=256, help="size of each uploaded document, KiB")
+    parser.add_argument("--baseline", help="compare with results saved earlier with --save")
+    parser.add_argument("--save", help="write the results as JSON, to use as a baseline later")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative change before it counts as a regression")
+    return parser.parse_args(argv)
+
+class RssSampler:
+    """Peak resident set size of this process while active, sampled from /proc."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def current() -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            # No procfs (macOS): the process-wide high-water mark, KiB on
+            # Linux but bytes on macOS
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak if sys.platform == "darwin" else peak * 1024
+
+    def __enter__(self):
+        self.peak = self.current()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.current())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+class Workload:
+    """What the scenarios ask for, picked from the corpus in the database."""
+
+    def __init__(self, session_factory, args):
+        from sqlalchemy import select
+        from app.models.database import LearningResource, MediaType, ShareLink
+
+        self.rng = random.Random(args.seed)
+        self.range_size = args.range_kb * 1024
+        self.upload_size = args.upload_kb * 1024
+        with session_factory() as db:
+            self.categories = [row[0] for row in db.execute(select(LearningResource.category).distinct())]
+            self.years = sorted({
+                row[0].year for row in db.execute(select(LearningResource.created_at).limit(5000)) if row[0]
+            })
+            self.ranged = [
+                (row.id, row.size) for row in db.execute(
+                    select(LearningResource.id, LearningResource.size)
+                    .where(LearningResource.media_type.in_((MediaType.VIDEO, MediaType.AUDIO)),
+                           LearningResource.size >= self.range_size,
+                           LearningResource.content_hash.is_not(None))
+                    .limit(1000)
+                )
+            ]
+            self.tokens = [
+                row[0] for row in db.execute(
+                    select(ShareLink.share_token).where(ShareLink.expires_at > datetime.now(timezone.utc)).limit(1000)
+                )
+            ]
+
+    def missing(self, scenario: str):
+        """Why `scenario` cannot run on this corpus, or None."""
+        if scenario == "range" and not self.ranged:
+            return f"no stored video or audio of at least {self.range_size} bytes"
+        if scenario == "share" and not self.tokens:
+            return "no unexpired share links"
+        return None
+
+    def request(self, scenario: str):
+        """(method, url, httpx keyword arguments, accepted status codes) for one request."""
+        rng = self.rng
+        if scenario == "listing":
+            params = {"limit": 50}
+            if self.categories and rng.random() < 0.5:
+                params["category"] = rng.choice(self.categories)
+            return "GET", "/api/resources", {"params": params}, (200,)
+        if scenario == "timeline":
+            params = {"year": rng.choice(self.years)} if self.years and rng.random() < 0.5 else {}
+            return "GET", "/api/resources/timeline", {"params": params}, (200,)
+        if scenario == "range":
+            resource_id, size = rng.choice(self.ranged)
+            start = rng.randrange(size - self.range_size + 1)
+            headers = {"Range": f"bytes={start}-{start + self.range_size - 1}"}
+            return "GET", f"/api/resources/{resource_id}/content", {"headers": headers}, (206,)
+        if scenario == "upload":
+            from app.core.mock_data import mock_text, mock_title
+            from app.models.database import MediaType
+
+            body = mock_text(rng, self.upload_size // 3 + 1).encode("utf-8")[:self.upload_size]
+            form = {"title": mock_title(rng, MediaType.DOC), "category": "临床带教", "media_type": "DOC"}
+            files = {"file": ("bench.pdf", b"%PDF-1.4\n" + body, "application/pdf")}
+            return "POST", "/api/resources", {"data": form, "files": files}, (200,)
+        if scenario == "share":
+            return "GET", f"/api/shares/{rng.choice(self.tokens)}", {}, (200,)
+        raise ValueError(f"unknown scenario {scenario!r}")
+
+async def run_scenario(client, workload: Workload, scenario: str, requests: int, concurrency: int, warmup: int = 0):
+    """Run `requests` requests of `scenario`, `concurrency` at a time. Returns its result dict."""
+    for _ in range(warmup):
+        method, url, kwargs, _ = workload.request(scenario)
+        await client.request(method, url, **kwargs)
+
+    latencies = []
+    errors = []
+    remaining = [requests]
+
+    async def worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            method, url, kwargs, ok = workload.request(scenario)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                status = response.status_code
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            if status not in ok:
+                errors.append(status)
+
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    if errors:
+        print(f"  {scenario}: {len(errors)} failed requests, e.g. {errors[:5]}")
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "peak_rss_mb": rss.peak / 1024 / 1024,
+    }
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    """
+    Relative change of each compared metric per scenario in both runs.
+    Returns (rows, regressions): rows are (scenario, metric, base, now,
+    change); regressions the subset outside `tolerance` in the bad direction.
+    """
+    rows = []
+    regressions = []
+    for scenario, now in results.items():
+        base = baseline.get(scenario)
+        if not base:
+            continue
+        for metric, worse in COMPARED:
+            if not base.get(metric):
+                continue
+            change = now[metric] / base[metric] - 1
+            row = (scenario, metric, base[metric], now[metric], change)
+            rows.append(row)
+            if (change > tolerance) if worse == "higher" else (change < -tolerance):
+                regressions.append(row)
+    return rows, regressions
+
+def print_results(results: dict):
+    print(f"{'scenario':>10} {'req':>6} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'peak RSS':>10}")
+    for scenario, r in results.items():
+        print(
+            f"{scenario:>10} {r['requests']:6d} {r['errors']:4d} {r['p50_ms']:8.1f} {r['p95_ms']:8.1f} "
+            f"{r['p99_ms']:8.1f} {r['rps']:8.1f} {r['peak_rss_mb']:7.1f} MiB"
+        )
+
+async def drive(app, base_url, workload, scenarios, args):
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    if base_url is None:
+        # In-process: no sockets, but the app's startup and shutdown still run
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120)
+        lifespan = app.router.lifespan_context(app)
+    else:
+        client = httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120)
+        lifespan = None
+
+    results = {}
+    try:
+        if lifespan is not None:
+            await lifespan.__aenter__()
+        for scenario in scenarios:
+            results[scenario] = await run_scenario(
+                client, workload, scenario, args.requests, args.concurrency, args.warmup
+            )
+    finally:
+        if lifespan is not None:
+            await lifespan.__aexit__(None, None, None)
+        await client.aclose()
+    return results
+
+def main():
+    args = parse_args()
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        sys.exit(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    tmpdir = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        tmpdir = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+
+    from app.main import app
+    from app.core.config import SessionLocal, engine, init_db
+    from app.core.mock_data import generate_corpus
+
+    init_db()
+    if tmpdir:
+        started = time.perf_counter()
+        corpus = generate_corpus(
+            engine, args.resources, shares=args.shares, size_scale=args.size_scale, seed=args.seed
+        )
+        print(
+            f"Generated {corpus.resources} resources, {len(corpus.share_tokens)} share links, "
+            f"{corpus.payload_bytes / 1024 / 1024:.1f} MiB of payloads in {time.perf_counter() - started:.1f}s"
+        )
+    workload = Workload(SessionLocal, args)
+    for scenario in list(scenarios):
+        reason = workload.missing(scenario)
+        if reason:
+            print(f"Skipping {scenario}: {reason}")
+            scenarios.remove(scenario)
+
+    server = thread = base_url = None
+    if args.server == "uvicorn":
+        import uvicorn
+
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.05)
+        base_url = f"http://127.0.0.1:{port}"
+
+    print(f"{args.server}, {args.concurrency} clients, {args.requests} requests per scenario")
+    try:
+        results = asyncio.run(drive(app, base_url, workload, scenarios, args))
+    finally:
+        if server is not None:
+            server.should_exit = True
+            thread.join()
+    print_results(results)
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            saved = json.load(f)
+        settings = {key: value for key, value in vars(args).items() if key not in UNCOMPARED_SETTINGS}
+        differing = sorted(key for key, value in saved.get("settings", {}).items()
+                           if key in settings and settings[key] != value)
+        if differing:
+            print(f"\nWarning: the baseline was run with different {', '.join(differing)}")
+        rows, regressions = compare(results, saved["scenarios"], args.tolerance)
+        print(f"\nAgainst {args.baseline} (tolerance {args.tolerance:.0%}):")
+        for scenario, metric, base, now, change in rows:
+            flag = "  REGRESSION" if (scenario, metric, base, now, change) in regressions else ""
+            print(f"{scenario:>10} {metric:>12} {base:10.1f} -> {now:10.1f} {change:+7.1%}{flag}")
+        status = 1 if regressions else 0
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "settings": {key: value for key, value in vars(args).items() if key not in UNCOMPARED_SETTINGS},
+                "scenarios": results,
+            }, f, indent=2)
+        print(f"Results saved to {args.save}")
+
+    if tmpdir:
+        engine.dispose()
+        tmpdir.cleanup()
+    sys.exit(status)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import sys
+import os
+import argparse
+import asyncio
+import socket
+import tempfile
+import threading
+import time
+
+# Add the parent directory to sys.path to allow importing app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Measure fast-request latency while slow requests (large downloads) run alongside"
+    )
+    parser.add_argument("--database-url", help="defaults to a throwaway SQLite file")
+    parser.add_argument("--resources", type=int, default=500, help="rows to seed")
+    parser.add_argument("--blob-mb", type=int, default=64, help="size of the file the slow clients download")
+    parser.add_argument("--slow", type=int, default=8, help="concurrent clients downloading the large file")
+    parser.add_argument("--fast", type=int, default=16, help="concurrent clients hitting metadata endpoints")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per phase")
+    return parser.parse_args()
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def seed(count: int, blob_mb: int):
+    from app.core.config import SessionLocal
+    from app.models.database import LearningResource, MediaType
+    from app.storage import get_default_backend
+    from app.storage.base import IteratorReader
+    from app.storage.blobs import store_deduplicated
+
+    with SessionLocal() as db:
+        db.add_all(
+            LearningResource(
+                title=f"基准测试资料{i}", category="临床带教", media_type=MediaType.DOC,
+                file_url="/uploads/bench.pdf", key_points="牙体预备要点", transcript="讲解" * 50,
+            )
+            for i in range(count)
+        )
+        big = LearningResource(title="基准测试大文件", category="临床带教", media_type=MediaType.VIDEO, file_url="")
+        db.add(big)
+        db.flush()
+        storage = get_default_backend(db)
+        chunk = os.urandom(1024 * 1024)
+        blob = store_deduplicated(
+            db, storage, storage.new_key(big.id, "bench.mp4"), IteratorReader(chunk for _ in range(blob_mb))
+        )
+        big.file_url, big.content_hash, big.size = blob.storage_url, blob.sha256, blob.size
+        db.commit()
+        return big.id
+
+async def fast_client(client, stop, latencies, ids):
+    i = 0
+    while not stop.is_set():
+        path = "/api/resources?limit=20" if i % 2 else f"/api/resources/{ids[i % len(ids)]}"
+        start = time.perf_counter()
+        response = await client.get(path)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+        i += 1
+
+async def slow_client(client, stop, transferred, blob_id):
+    while not stop.is_set():
+        async with client.stream("GET", f"/api/resources/{blob_id}/content") as response:
+            async for data in response.aiter_bytes():
+                transferred[0] += len(data)
+                if stop.is_set():
+                    break
+
+async def phase(base_url, args, blob_id, ids, with_slow: bool):
+    import httpx
+
+    stop = asyncio.Event()
+    latencies = []
+    transferred = [0]
+    limits = httpx.Limits(max_connections=args.fast + args.slow)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        tasks = [asyncio.create_task(fast_client(client, stop, latencies, ids)) for _ in range(args.fast)]
+        if with_slow:
+            tasks += [asyncio.create_task(slow_client(client, stop, transferred, blob_id)) for _ in range(args.slow)]
+        await asyncio.sleep(args.duration)
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    label = f"fast + {args.slow} slow" if with_slow else "fast only"
+    print(
+        f"{label:>16}: {len(latencies) / args.duration:8.1f} req/s   "
+        f"p50 {percentile(latencies, 50) * 1000:7.1f} ms   "
+        f"p95 {percentile(latencies, 95) * 1000:7.1f} ms   "
+        f"p99 {percentile(latencies, 99) * 1000:7.1f} ms   "
+        f"downloads {transferred[0] / args.duration / 1024 / 1024:7.1f} MiB/s"
+    )
+
+def main():
+    args = parse_args()
+    tmpdir = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        tmpdir = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir.name, 'bench.db')}"
+
+    import uvicorn
+    from app.main import app
+    from app.core.config import init_db, SessionLocal
+    from app.models.database import LearningResource
+
+    init_db()
+    blob_id = seed(args.resources, args.blob_mb)
+    with SessionLocal() as db:
+        ids = [row.id for row in db.query(LearningResource.id).limit(200)]
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{port}"
+    print(f"{args.fast} fast clients, {args.duration:.0f}s per phase, {args.blob_mb} MiB download")
+    asyncio.run(phase(base_url, args, blob_id, ids, with_slow=False))
+    asyncio.run(phase(base_url, args, blob_id, ids, with_slow=True))
+
+    server.should_exit = True
+    thread.join()
+    if tmpdir:
+        tmpdir.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import sys
+import os
+import argparse
+
+# Add the parent directory to sys.path to allow importing app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.bulk_import import Checkpoint, read_manifest, run_bulk_import, scan_directory
+from app.core.config import BULK_IMPORT_BATCH_SIZE, BULK_IMPORT_WORKERS, engine, init_db
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Import a directory tree or a CSV/JSONL manifest of files as resources"
+    )
+    parser.add_argument("source", help="directory to walk, or a .csv / .jsonl manifest")
+    parser.add_argument("--category", help="category for every item (default: top-level folder name)")
+    parser.add_argument("--checkpoint", help="progress file used to resume (default: <source>.checkpoint.jsonl)")
+    parser.add_argument("--workers", type=int, default=BULK_IMPORT_WORKERS, help="reader threads")
+    parser.add_argument("--batch-size", type=int, default=BULK_IMPORT_BATCH_SIZE, help="files per commit")
+    args = parser.parse_args()
+
+    source = os.path.abspath(args.source).rstrip(os.sep)
+    if os.path.isdir(source):
+        items = scan_directory(source, args.category)
+    elif os.path.isfile(source):
+        items = read_manifest(source, args.category)
+    else:
+        parser.error(f"{args.source} does not exist")
+    checkpoint = Checkpoint(args.checkpoint or f"{source}.checkpoint.jsonl")
+
+    print(f"Importing {source} into {engine.url} (checkpoint {checkpoint.path})")
+    init_db()
+    result = run_bulk_import(items, checkpoint, workers=args.workers, batch_size=args.batch_size)
+    for key, error in result["failures"]:
+        print(f"  failed: {key}: {error}")
+    sys.exit(1 if result["failed"] else 0)
+
+if __name__ == "__main__":
+    main()
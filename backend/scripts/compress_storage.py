@@ -0,0 +1,111 @@
+import sys
+import os
+import argparse
+
+# Add the parent directory to sys.path to allow importing app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, update
+
+from app.core.compression import storage_codec
+from app.core.config import STORAGE_COMPRESS_TYPES, SessionLocal, init_db
+from app.models.database import LearningResource, MediaBlob
+from app.storage import get_backend, open_stored
+from app.storage.base import IteratorReader
+from app.storage.compression import compressing_reader
+
+def compress_texts(session_factory=SessionLocal, page_size: int = 200) -> int:
+    """
+    Rewrite every transcript and key points value so long ones are stored
+    compressed. Each page commits on its own; updated_at is left alone.
+    """
+    rewritten = 0
+    last_id = 0
+    with session_factory() as db:
+        while True:
+            rows = db.execute(
+                select(LearningResource.id, LearningResource.transcript, LearningResource.key_points)
+                .where(LearningResource.id > last_id)
+                .order_by(LearningResource.id)
+                .limit(page_size)
+            ).all()
+            if not rows:
+                break
+            for resource_id, transcript, key_points in rows:
+                db.execute(
+                    update(LearningResource)
+                    .where(LearningResource.id == resource_id)
+                    .values(transcript=transcript, key_points=key_points, updated_at=LearningResource.updated_at)
+                )
+            db.commit()
+            rewritten += len(rows)
+            last_id = rows[-1].id
+    return rewritten
+
+def compress_blobs(session_factory=SessionLocal, limit: int = 0) -> int:
+    """
+    Re-store uncompressed payloads whose resources are all of a compressed
+    media type, in the same backend, and repoint those resources. One commit
+    per payload, so the run can be interrupted and restarted. Workers that
+    cached the old location catch up within METADATA_CACHE_TTL.
+    """
+    compressed = 0
+    with session_factory() as db:
+        digests = db.execute(
+            select(MediaBlob.sha256).where(MediaBlob.encoding.is_(None)).order_by(MediaBlob.created_at)
+        ).scalars().all()
+        for digest in digests:
+            if limit and compressed >= limit:
+                break
+            owners = db.query(LearningResource).filter(LearningResource.content_hash == digest).all()
+            if not owners or any(owner.media_type.value not in STORAGE_COMPRESS_TYPES for owner in owners):
+                continue
+            media = db.get(MediaBlob, digest)
+            blob = open_stored(db, media.storage_url)
+            if blob is None:
+                print(f"Skipping blob {digest[:12]}: no stored bytes")
+                continue
+            scheme, _, old_key = media.storage_url.partition("://")
+            storage = get_backend(scheme, db)
+            source = IteratorReader(blob.iter_range(0, blob.size - 1) if blob.size else iter(()))
+            reader, encoding = compressing_reader(source, owners[0].media_type)
+            if encoding is None:
+                continue
+            new_key = storage.new_key(owners[0].id, digest)
+            try:
+                stored_size = storage.save(new_key, reader)
+                media.storage_url = storage.url(new_key)
+                media.encoding = encoding
+                db.query(LearningResource).filter(LearningResource.content_hash == digest).update(
+                    {LearningResource.file_url: media.storage_url, LearningResource.content_encoding: encoding},
+                    synchronize_session=False,
+                )
+                if scheme == "db":
+                    storage.delete(old_key)
+                db.commit()
+            except Exception:
+                db.rollback()
+                if scheme != "db":
+                    storage.delete(new_key)
+                raise
+            if scheme != "db":
+                storage.delete(old_key)
+            compressed += 1
+            print(f"Compressed blob {digest[:12]}: {media.size} -> {stored_size} bytes ({encoding})")
+    return compressed
+
+def main():
+    parser = argparse.ArgumentParser(description="Compress documents and long text stored before compression was enabled")
+    parser.add_argument("--limit", type=int, default=0, help="Stop after this many payloads (0 = all)")
+    parser.add_argument("--skip-text", action="store_true", help="leave transcripts and key points alone")
+    args = parser.parse_args()
+    if storage_codec() is None:
+        parser.error("STORAGE_COMPRESSION is off")
+
+    init_db()
+    if not args.skip_text:
+        print(f"Rewrote text of {compress_texts()} resources.")
+    print(f"Compressed {compress_blobs(limit=args.limit)} payloads with {storage_codec()}.")
+
+if __name__ == "__main__":
+    main()
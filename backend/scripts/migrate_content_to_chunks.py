@@ -0,0 +1,17 @@
+import sys
+import os
+
+# Add the parent directory to sys.path to allow importing app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import engine, init_db
+from app.core.migration import check_and_migrate_tables, migrate_content_to_chunks
+
+def main():
+    init_db()
+    check_and_migrate_tables(engine)
+    count = migrate_content_to_chunks(engine)
+    print(f"Successfully migrated {count} resources to chunked storage.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import sys
+import os
+import argparse
+
+# Add the parent directory to sys.path to allow importing app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import SessionLocal, init_db
+from app.models.database import LearningResource, MediaBlob
+from app.storage import BACKENDS, get_backend, open_resource_blob, resolve
+from app.storage.base import IteratorReader
+
+def _copy(blob, target, new_key: str) -> int:
+    try:
+        return target.save(new_key, IteratorReader(blob.iter_range(0, blob.size - 1)))
+    except Exception:
+        if target.scheme != "db":
+            target.delete(new_key)
+        raise
+
+def move_resources(source_scheme: str, target_scheme: str, limit: int = 0) -> int:
+    """
+    Copy stored payloads under `source_scheme` into `target_scheme`, repoint
+    every resource using them and then drop the old bytes. Deduplicated
+    payloads are moved once for all resources sharing them. Each payload is
+    moved with its own commit, so the run can be interrupted and restarted;
+    bytes are streamed, never held whole in memory.
+    """
+    db = SessionLocal()
+    moved = 0
+    target = get_backend(target_scheme, db)
+    try:
+        digests = [
+            row.sha256 for row in db.query(MediaBlob.sha256)
+            .filter(MediaBlob.storage_url.like(f"{source_scheme}://%"))
+            .order_by(MediaBlob.created_at)
+        ]
+        for digest in digests:
+            if limit and moved >= limit:
+                return moved
+            media = db.get(MediaBlob, digest)
+            owner = db.query(LearningResource).filter(LearningResource.content_hash == digest).first()
+            if owner is None:
+                continue
+            blob = open_resource_blob(db, owner, decoded=False)
+            if blob is None:
+                print(f"Skipping blob {digest}: no stored bytes")
+                continue
+            old_storage, old_key = resolve(db, owner)
+            new_key = target.new_key(owner.id, digest)
+            try:
+                _copy(blob, target, new_key)
+                media.storage_url = target.url(new_key)
+                db.query(LearningResource).filter(LearningResource.content_hash == digest).update(
+                    {LearningResource.file_url: media.storage_url}, synchronize_session=False
+                )
+                if old_storage.scheme == "db":
+                    old_storage.delete(old_key)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            if old_storage.scheme != "db":
+                old_storage.delete(old_key)
+            moved += 1
+            print(f"Moved blob {digest[:12]} -> {media.storage_url} ({media.size} bytes)")
+
+        # Resources uploaded before deduplication own their bytes
+        ids = [
+            row.id for row in db.query(LearningResource.id)
+            .filter(LearningResource.file_url.like(f"{source_scheme}://%"), LearningResource.content_hash.is_(None))
+            .order_by(LearningResource.id)
+        ]
+        for resource_id in ids:
+            if limit and moved >= limit:
+                break
+            resource = db.get(LearningResource, resource_id)
+            blob = open_resource_blob(db, resource, decoded=False)
+            if blob is None:
+                print(f"Skipping resource {resource_id}: no stored bytes")
+                continue
+
+            old_storage, old_key = resolve(db, resource)
+            new_key = target.new_key(resource.id, resource.file_url.rsplit("/", 1)[-1])
+            try:
+                size = _copy(blob, target, new_key)
+                resource.file_url = target.url(new_key)
+                resource.size = size
+                if old_storage.scheme == "db":
+                    old_storage.delete(old_key)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            if old_storage.scheme != "db":
+                old_storage.delete(old_key)
+            moved += 1
+            print(f"Moved resource {resource_id} -> {resource.file_url} ({size} bytes)")
+    finally:
+        db.close()
+    return moved
+
+def main():
+    parser = argparse.ArgumentParser(description="Move stored resource files between storage backends")
+    parser.add_argument("--from", dest="source", default="db", choices=sorted(BACKENDS))
+    parser.add_argument("--to", dest="target", required=True, choices=sorted(BACKENDS))
+    parser.add_argument("--limit", type=int, default=0, help="Stop after this many resources (0 = all)")
+    args = parser.parse_args()
+    if args.source == args.target:
+        parser.error("--from and --to must differ")
+
+    init_db()
+    count = move_resources(args.source, args.target, args.limit)
+    print(f"Successfully moved {count} payloads from {args.source} to {args.target}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import sys
+import os
+import argparse
+
+# Add the parent directory to sys.path to allow importing app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import PRIVACY_AUDIT_PAGE_SIZE, PRIVACY_AUDIT_WORKERS, init_db
+from app.core.privacy_audit import run_privacy_audit
+
+def main():
+    parser = argparse.ArgumentParser(description="Rescan stored resources with the current privacy rules")
+    parser.add_argument("--workers", type=int, default=PRIVACY_AUDIT_WORKERS,
+                        help="scanner processes (0 = one per CPU, 1 = in-process)")
+    parser.add_argument("--page-size", type=int, default=PRIVACY_AUDIT_PAGE_SIZE)
+    parser.add_argument("--full", action="store_true",
+                        help="rescan everything, including resources already scanned under these rules")
+    args = parser.parse_args()
+
+    init_db()
+    result = run_privacy_audit(workers=args.workers, page_size=args.page_size, full=args.full)
+    print(f"Rule version {result['rule_version']}: scanned {result['scanned']}, flagged {result['flagged']}.")
+
+if __name__ == "__main__":
+    main()
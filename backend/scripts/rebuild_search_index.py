@@ -0,0 +1,16 @@
+import sys
+import os
+
+# Add the parent directory to sys.path to allow importing app modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import engine, init_db
+from app.core.search import rebuild_search_index
+
+def main():
+    init_db()
+    count = rebuild_search_index(engine)
+    print(f"Successfully indexed {count} resources for search.")
+
+if __name__ == "__main__":
+    main()
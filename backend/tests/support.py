@@ -0,0 +1,85 @@
+import sys
+import os
+import tempfile
+
+# Add the parent directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.cache import category_cache, resource_cache
+from app.core.config import get_db
+from app.core.share_access import share_access_buffer
+from app.core.share_tokens import share_denylist
+from app.models.database import Base
+from app.api.resources import router as resources_router
+from app.api.shares import router as shares_router
+from app.api.categories import router as categories_router
+from app.api.admin import router as admin_router
+from app.api.jobs import router as jobs_router
+
+class ApiTestCase:
+    """
+    Mixin that wires the routers to a private throwaway SQLite database and
+    records every SQL statement issued, so tests can assert on query shape.
+    The database is a real file so each thread gets its own connection, as
+    in production; a shared in-memory connection breaks under background jobs.
+    """
+
+    def setUp(self):
+        # Caches are per process; entries from another test's database would leak
+        resource_cache.invalidate()
+        category_cache.invalidate()
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.engine = create_engine(
+            f"sqlite:///{os.path.join(self._tmpdir.name, 'test.db')}",
+            connect_args={"check_same_thread": False},
+        )
+        Base.metadata.create_all(bind=self.engine)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        share_access_buffer.session_factory = self.SessionLocal
+        share_access_buffer.forget()
+        share_denylist.session_factory = self.SessionLocal
+        share_denylist.load()
+        self.statements = []
+
+        @event.listens_for(self.engine, "before_cursor_execute")
+        def record(conn, cursor, statement, parameters, context, executemany):
+            self.statements.append(statement)
+
+        def override_get_db():
+            db = self.SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app = FastAPI()
+        app.include_router(resources_router)
+        app.include_router(shares_router)
+        app.include_router(categories_router)
+        app.include_router(admin_router)
+        app.include_router(jobs_router)
+        app.dependency_overrides[get_db] = override_get_db
+        self.app = app
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        share_access_buffer.flush()
+        self.client.close()
+        self.engine.dispose()
+        self._tmpdir.cleanup()
+
+    def upload(self, title="实习生牙体预备演示", media_type="VIDEO", data=b"x" * 1024, **fields):
+        form = {"title": title, "category": "临床带教", "media_type": media_type}
+        form.update(fields)
+        response = self.client.post(
+            "/api/resources",
+            data=form,
+            files={"file": ("clip.bin", data, "application/octet-stream")},
+        )
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()
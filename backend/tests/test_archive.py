@@ -0,0 +1,99 @@
+import io
+import json
+import os
+import tarfile
+import tempfile
+import unittest
+import zipfile
+
+from support import ApiTestCase
+
+from app.core.archive import MANIFEST_NAME, export_archive, open_archive
+from app.core.bulk_import import Checkpoint, run_bulk_import
+from app.models.database import LearningResource
+
+class TestArchive(ApiTestCase, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.video = self.upload(title="根管治疗示范", data=b"v" * 3000, key_points="要点一")
+        self.doc = self.upload(title="牙周讲义", media_type="DOC", data=b"%PDF" + b"d" * 500)
+        self.client.put(f"/api/resources/{self.doc['id']}", json={"category": "牙周"})
+        self._tmpdir_export = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._tmpdir_export.cleanup()
+        super().tearDown()
+
+    def export(self, **params):
+        response = self.client.get("/api/resources/export", params=params)
+        self.assertEqual(response.status_code, 200, response.text)
+        return response
+
+    def save(self, data, name):
+        path = os.path.join(self._tmpdir_export.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_zip_export(self):
+        response = self.export()
+        self.assertEqual(response.headers["content-type"], "application/zip")
+        self.assertIn("attachment", response.headers["content-disposition"])
+
+        archive = zipfile.ZipFile(io.BytesIO(response.content))
+        self.assertIsNone(archive.testzip())
+        names = archive.namelist()
+        self.assertEqual(names[-1], MANIFEST_NAME)
+        manifest = [json.loads(line) for line in archive.read(MANIFEST_NAME).splitlines()]
+        self.assertEqual([entry["title"] for entry in manifest], ["根管治疗示范", "牙周讲义"])
+        self.assertEqual(archive.read(manifest[0]["file"]), b"v" * 3000)
+        self.assertEqual(manifest[0]["key_points"], "要点一")
+
+    def test_tar_export_filtered_by_category(self):
+        response = self.export(format="tar", category="牙周")
+        archive = tarfile.open(fileobj=io.BytesIO(response.content))
+        self.assertEqual(len(response.content) % tarfile.RECORDSIZE, 0)
+        manifest = [json.loads(line) for line in archive.extractfile(MANIFEST_NAME).read().splitlines()]
+        self.assertEqual([entry["title"] for entry in manifest], ["牙周讲义"])
+        self.assertEqual(archive.extractfile(manifest[0]["file"]).read(), b"%PDF" + b"d" * 500)
+
+    def test_invalid_format(self):
+        response = self.client.get("/api/resources/export", params={"format": "rar"})
+        self.assertEqual(response.status_code, 422)
+
+    def snapshot(self):
+        with self.SessionLocal() as db:
+            return {r.title: (r.category, r.created_at, r.content_hash) for r in db.query(LearningResource)}
+
+    def assert_round_trip(self, archive_format):
+        path = self.save(b"".join(export_archive(self.engine, archive_format)), f"export.{archive_format}")
+        originals = self.snapshot()
+        for resource in (self.video, self.doc):
+            self.client.delete(f"/api/resources/{resource['id']}")
+
+        with open_archive(path) as (items, parallel):
+            self.assertEqual(parallel, archive_format == "zip")
+            result = run_bulk_import(
+                items, Checkpoint(path + ".checkpoint"), session_factory=self.SessionLocal,
+                report=lambda message: None,
+            )
+        self.assertEqual((result["imported"], result["failed"]), (2, 0))
+        self.assertEqual(self.snapshot(), originals)
+
+    def test_zip_round_trip(self):
+        self.assert_round_trip("zip")
+
+    def test_tar_round_trip(self):
+        self.assert_round_trip("tar")
+
+    def test_import_rejects_other_archives(self):
+        data = io.BytesIO()
+        with zipfile.ZipFile(data, "w") as archive:
+            archive.writestr("notes.txt", "hello")
+        path = self.save(data.getvalue(), "other.zip")
+        with self.assertRaisesRegex(ValueError, MANIFEST_NAME):
+            with open_archive(path):
+                pass
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from support import ApiTestCase
+
+from app.core.bulk_import import Checkpoint, read_manifest, run_bulk_import, scan_directory
+from app.models.database import LearningResource, MediaBlob, MediaType
+from test_mp4 import movie
+
+class TestBulkImport(ApiTestCase, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self._source = tempfile.TemporaryDirectory()
+        self.root = self._source.name
+        self.files = {
+            "牙体牙髓/根管预备.mp4": movie(),
+            "牙体牙髓/讲义.pdf": b"%PDF" + b"a" * 3000,
+            "口腔外科/拔牙示意.png": b"\x89PNG" + b"b" * 2000,
+            "口腔外科/拔牙示意副本.png": b"\x89PNG" + b"b" * 2000,
+            "口腔外科/notes.xyz": b"ignored",
+        }
+        for name, data in self.files.items():
+            path = os.path.join(self.root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+        self.checkpoint = Checkpoint(os.path.join(self.root, "import.checkpoint.jsonl"))
+
+    def tearDown(self):
+        self._source.cleanup()
+        super().tearDown()
+
+    def run_import(self, items, **kwargs):
+        kwargs.setdefault("report", lambda message: None)
+        return run_bulk_import(items, self.checkpoint, session_factory=self.SessionLocal, **kwargs)
+
+    def test_directory_import(self):
+        result = self.run_import(scan_directory(self.root), batch_size=2)
+        self.assertEqual((result["imported"], result["failed"]), (4, 0))
+
+        with self.SessionLocal() as db:
+            rows = {r.title: r for r in db.query(LearningResource)}
+            self.assertEqual(rows["根管预备"].category, "牙体牙髓")
+            self.assertEqual(rows["根管预备"].media_type, MediaType.VIDEO)
+            self.assertEqual(rows["根管预备"].duration, 126)
+            self.assertEqual(rows["拔牙示意"].category, "口腔外科")
+            self.assertEqual(rows["讲义"].media_type, MediaType.DOC)
+            # The two identical images share one stored payload
+            self.assertEqual(db.query(MediaBlob).count(), 3)
+            pdf_id = rows["讲义"].id
+
+        content = self.client.get(f"/api/resources/{pdf_id}/content").content
+        self.assertEqual(content, self.files["牙体牙髓/讲义.pdf"])
+        found = self.client.get("/api/resources/search", params={"q": "根管"}).json()
+        self.assertEqual([r["title"] for r in found], ["根管预备"])
+
+    def test_resumes_from_checkpoint(self):
+        items = list(scan_directory(self.root))
+        self.run_import(items[:2], batch_size=1)
+        self.assertEqual(len(self.checkpoint.load()), 2)
+
+        result = self.run_import(items)
+        self.assertEqual((result["imported"], result["skipped"]), (2, 2))
+        with self.SessionLocal() as db:
+            self.assertEqual(db.query(LearningResource).count(), 4)
+
+    def test_failed_item_is_retried_on_rerun(self):
+        items = list(scan_directory(self.root))
+        with mock.patch("app.core.bulk_import.count_created", side_effect=[None, RuntimeError("boom")]):
+            result = self.run_import(items[:2], batch_size=10)
+        self.assertEqual((result["imported"], result["failed"]), (1, 1))
+        self.assertEqual(result["failures"][0][0], items[1].key)
+
+        # Only the failed item is retried
+        result = self.run_import(items)
+        self.assertEqual((result["imported"], result["skipped"]), (3, 1))
+        with self.SessionLocal() as db:
+            self.assertEqual(db.query(LearningResource).count(), 4)
+
+    def test_privacy_check_rejects_titles(self):
+        path = os.path.join(self.root, "manifest.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"path": "牙体牙髓/讲义.pdf", "title": "患者张三的病历"}, ensure_ascii=False) + "\n")
+        result = self.run_import(read_manifest(path))
+        self.assertEqual((result["imported"], result["failed"]), (0, 1))
+        self.assertIn("隐私", result["failures"][0][1])
+        self.assertEqual(self.checkpoint.load(), set())
+
+    def test_csv_manifest(self):
+        path = os.path.join(self.root, "manifest.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("path,title,category,media_type,duration,patient_anonymized\n")
+            f.write("口腔外科/notes.xyz,术后医嘱,护理,DOC,,true\n")
+            f.write("牙体牙髓/讲义.pdf,,,,,\n")
+        items = list(read_manifest(path))
+        self.assertEqual(items[0].title, "术后医嘱")
+        self.assertEqual(items[1].title, "讲义")
+        self.assertTrue(items[0].patient_anonymized)
+
+        result = self.run_import(items)
+        self.assertEqual(result["imported"], 2)
+        with self.SessionLocal() as db:
+            row = db.query(LearningResource).filter(LearningResource.title == "术后医嘱").one()
+            self.assertEqual((row.category, row.media_type), ("护理", MediaType.DOC))
+
+    def test_manifest_errors_name_the_line(self):
+        path = os.path.join(self.root, "manifest.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('{"path": "a.pdf"}\n{"title": "x"}\n')
+        with self.assertRaisesRegex(ValueError, "manifest.jsonl:2"):
+            list(read_manifest(path))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+from unittest import mock
+
+from support import ApiTestCase
+
+from app.core.cache import MetadataCache
+
+class TestMetadataCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = MetadataCache("t", max_size=2, ttl=60)
+        for key in "abc":
+            cache.get_or_load(key, lambda: key.upper())
+        cache.get_or_load("b", lambda: "reloaded")
+        self.assertEqual(cache.get_or_load("a", lambda: "reloaded"), "reloaded")
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (1, 4, 2))
+
+    def test_ttl_expiry(self):
+        cache = MetadataCache("t", max_size=10, ttl=5)
+        with mock.patch("app.core.cache.time.monotonic", return_value=100.0):
+            cache.get_or_load("k", lambda: 1)
+        with mock.patch("app.core.cache.time.monotonic", return_value=104.0):
+            self.assertEqual(cache.get_or_load("k", lambda: 2), 1)
+        with mock.patch("app.core.cache.time.monotonic", return_value=105.0):
+            self.assertEqual(cache.get_or_load("k", lambda: 2), 2)
+
+    def test_load_racing_an_invalidation_is_not_stored(self):
+        cache = MetadataCache("t", max_size=10, ttl=60)
+
+        def stale_load():
+            # A writer commits and invalidates while this read is in flight
+            cache.invalidate("k")
+            return "old"
+
+        self.assertEqual(cache.get_or_load("k", stale_load), "old")
+        self.assertEqual(cache.get_or_load("k", lambda: "new"), "new")
+
+    def test_disabled_and_none_values(self):
+        cache = MetadataCache("t", max_size=10, ttl=0)
+        cache.get_or_load("k", lambda: 1)
+        self.assertEqual(cache.get_or_load("k", lambda: 2), 2)
+        cache = MetadataCache("t", max_size=10, ttl=60)
+        self.assertIsNone(cache.get_or_load("k", lambda: None))
+        self.assertEqual(cache.get_or_load("k", lambda: 3), 3)
+
+class TestCachedEndpoints(ApiTestCase, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.resource = self.upload()
+        self.url = f"/api/resources/{self.resource['id']}"
+
+    def resource_selects(self):
+        return [s for s in self.statements if s.lstrip().startswith("SELECT") and "learning_resources" in s]
+
+    def test_detail_served_from_cache_until_written(self):
+        self.client.get(self.url)
+        self.statements.clear()
+        self.assertEqual(self.client.get(self.url).json()["title"], self.resource["title"])
+        self.assertEqual(self.resource_selects(), [])
+
+        self.client.put(self.url, json={"title": "修改后的标题"})
+        self.assertEqual(self.client.get(self.url).json()["title"], "修改后的标题")
+
+        self.client.delete(self.url)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_share_lookup_uses_cache(self):
+        token = self.client.post("/api/shares", json={"resource_id": self.resource["id"]}).json()["share_token"]
+        self.client.get(self.url)
+        self.statements.clear()
+        response = self.client.get(f"/api/shares/{token}")
+        self.assertEqual(response.json()["resource"]["id"], self.resource["id"])
+        self.assertEqual(self.resource_selects(), [])
+
+    def test_category_changes_invalidate(self):
+        self.client.post("/api/categories", json={"name": "临床带教"})
+        self.assertEqual([c["name"] for c in self.client.get("/api/categories").json()], ["临床带教"])
+        self.client.get(self.url)
+
+        response = self.client.put(
+            "/api/categories/ops/rename-by-name", params={"old_name": "临床带教", "new_name": "临床示教"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c["name"] for c in self.client.get("/api/categories").json()], ["临床示教"])
+        self.assertEqual(self.client.get(self.url).json()["category"], "临床示教")
+
+        category_id = self.client.get("/api/categories").json()[0]["id"]
+        self.client.delete(f"/api/categories/{category_id}")
+        self.assertEqual(self.client.get("/api/categories").json(), [])
+
+    def test_stats_endpoint(self):
+        before = self.client.get("/api/admin/cache").json()["resources"]
+        self.client.get(self.url)
+        self.client.get(self.url)
+        stats = self.client.get("/api/admin/cache").json()
+        # Counters are per process and accumulate across tests
+        self.assertEqual(stats["resources"]["hits"] - before["hits"], 1)
+        self.assertEqual(stats["resources"]["misses"] - before["misses"], 1)
+        self.assertIn("evictions", stats["categories"])
+
+if __name__ == '__main__':
+    unittest.main()
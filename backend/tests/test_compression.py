@@ -0,0 +1,112 @@
+import gzip
+import os
+import unittest
+from unittest import mock
+
+from sqlalchemy import text
+
+from support import ApiTestCase
+
+from app.core.compression import storage_codec, worth_compressing
+from app.core.http_cache import accepts_encoding
+from app.core.cache import resource_cache
+from app.models.database import LearningResource, MediaBlob, MediaType
+from scripts.compress_storage import compress_blobs, compress_texts
+
+# Text-heavy document: compresses well
+DOCUMENT = b"%PDF-1.4\n" + b"".join(b"BT /F1 12 Tf (line %d of the lecture notes) Tj ET\n" % i for i in range(20000))
+
+class TestCompressionRules(unittest.TestCase):
+    def test_accepts_encoding(self):
+        self.assertTrue(accepts_encoding("gzip, deflate, br", "gzip"))
+        self.assertTrue(accepts_encoding("br;q=1.0, *;q=0.5", "zstd"))
+        self.assertFalse(accepts_encoding("gzip;q=0, *", "gzip"))
+        self.assertFalse(accepts_encoding("identity", "gzip"))
+        self.assertFalse(accepts_encoding(None, "gzip"))
+
+    def test_worth_compressing(self):
+        self.assertTrue(worth_compressing(MediaType.DOC, DOCUMENT[:65536]))
+        self.assertFalse(worth_compressing(MediaType.VIDEO, DOCUMENT[:65536]))
+        self.assertFalse(worth_compressing(MediaType.DOC, os.urandom(65536)))
+        self.assertFalse(worth_compressing(MediaType.DOC, b"PK\x03\x04" + DOCUMENT[:65536]))
+
+class TestStoredCompression(ApiTestCase, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.codec = storage_codec()
+        self.doc = self.upload(title="牙体解剖讲义", media_type="DOC", data=DOCUMENT)
+        self.url = f"/api/resources/{self.doc['id']}/content"
+
+    def test_document_is_stored_compressed(self):
+        self.assertEqual(self.doc["content_encoding"], self.codec)
+        self.assertEqual(self.doc["size"], len(DOCUMENT))
+        with self.SessionLocal() as db:
+            blob = db.get(MediaBlob, self.doc["content_hash"])
+            self.assertEqual((blob.encoding, blob.size), (self.codec, len(DOCUMENT)))
+            stored = db.execute(text("SELECT sum(length(data)) FROM resource_chunks")).scalar()
+        self.assertLess(stored, len(DOCUMENT) // 5)
+
+    def test_passthrough_when_accepted(self):
+        response = self.client.get(self.url, headers={"Accept-Encoding": self.codec})
+        self.assertEqual(response.headers["content-encoding"], self.codec)
+        self.assertEqual(response.headers["vary"], "Accept-Encoding")
+        self.assertEqual(response.headers["etag"], f'"{self.doc["content_hash"]}.{self.codec}"')
+        self.assertLess(int(response.headers["content-length"]), len(DOCUMENT) // 5)
+        self.assertEqual(response.content, DOCUMENT)
+
+    def test_decoded_for_other_clients(self):
+        response = self.client.get(self.url, headers={"Accept-Encoding": "identity"})
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(response.headers["etag"], f'"{self.doc["content_hash"]}"')
+        self.assertEqual(int(response.headers["content-length"]), len(DOCUMENT))
+        self.assertEqual(response.content, DOCUMENT)
+
+    def test_ranges_address_decoded_bytes(self):
+        response = self.client.get(self.url, headers={"Range": "bytes=500000-500099", "Accept-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 206)
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(response.content, DOCUMENT[500000:500100])
+        self.assertEqual(response.headers["content-range"], f"bytes 500000-500099/{len(DOCUMENT)}")
+
+    def test_precompressed_and_media_types_skipped(self):
+        for media_type, data in (("DOC", gzip.compress(DOCUMENT)), ("VIDEO", DOCUMENT + b"v")):
+            resource = self.upload(media_type=media_type, data=data)
+            self.assertIsNone(resource["content_encoding"])
+            self.assertEqual(self.client.get(resource["file_url"]).content, data)
+
+    def test_long_transcript_compressed_in_row(self):
+        transcript = "根管预备时先确定工作长度，再逐号扩大。" * 400
+        resource = self.upload(title="根管预备", transcript=transcript)
+        with self.engine.connect() as conn:
+            stored = conn.execute(
+                text("SELECT typeof(transcript), length(transcript) FROM learning_resources WHERE id = :id"),
+                {"id": resource["id"]},
+            ).one()
+        self.assertEqual(stored[0], "blob")
+        self.assertLess(stored[1], len(transcript.encode()) // 5)
+        self.assertEqual(self.client.get(f"/api/resources/{resource['id']}").json()["transcript"], transcript)
+        found = self.client.get("/api/resources/search", params={"q": "工作长度"}).json()
+        self.assertEqual([r["id"] for r in found], [resource["id"]])
+
+    def test_backfill_of_existing_rows(self):
+        with mock.patch("app.core.compression.STORAGE_COMPRESSION", "off"):
+            old = self.upload(title="旧讲义", media_type="DOC", data=DOCUMENT + b"old", transcript="旧" * 3000)
+        self.assertIsNone(old["content_encoding"])
+        with self.SessionLocal() as db:
+            updated_at = db.get(LearningResource, old["id"]).updated_at
+
+        self.assertEqual(compress_blobs(self.SessionLocal), 1)
+        compress_texts(self.SessionLocal)
+        with self.engine.connect() as conn:
+            kind = conn.execute(text("SELECT typeof(transcript) FROM learning_resources WHERE id = :id"),
+                                {"id": old["id"]}).scalar()
+        self.assertEqual(kind, "blob")
+        with self.SessionLocal() as db:
+            row = db.get(LearningResource, old["id"])
+            self.assertEqual((row.content_encoding, row.updated_at), (self.codec, updated_at))
+        # Served from the new layout once the cached metadata expires
+        resource_cache.invalidate(old["id"])
+        self.assertEqual(self.client.get(f"/api/resources/{old['id']}/content").content, DOCUMENT + b"old")
+
+if __name__ == '__main__':
+    unittest.main()
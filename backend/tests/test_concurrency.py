@@ -0,0 +1,54 @@
+import asyncio
+import inspect
+import threading
+import unittest
+from unittest import mock
+
+import httpx
+
+from support import ApiTestCase
+
+from app.api import admin, categories, jobs, resources, shares
+import app.storage as storage
+
+class TestNonBlockingRoutes(ApiTestCase, unittest.TestCase):
+    def test_database_routes_run_in_threadpool(self):
+        # `async def` handlers would run their blocking SQLAlchemy calls on
+        # the event loop
+        for module in (resources, shares, categories, admin, jobs):
+            for route in module.router.routes:
+                self.assertFalse(
+                    inspect.iscoroutinefunction(route.endpoint),
+                    f"{module.__name__}.{route.endpoint.__name__} must be a plain def",
+                )
+
+    def test_slow_request_does_not_stall_others(self):
+        resource = self.upload()
+        slow_open = storage.open_resource_blob
+        entered, released = threading.Event(), threading.Event()
+        outcome = {}
+
+        def open_slowly(db, res, **kwargs):
+            # Held open until the other request has finished: if the slow one
+            # blocked the server, the wait would time out instead
+            entered.set()
+            outcome["released"] = released.wait(timeout=5)
+            return slow_open(db, res, **kwargs)
+
+        async def run():
+            transport = httpx.ASGITransport(app=self.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                slow = asyncio.create_task(client.get(f"/api/resources/{resource['id']}/content"))
+                self.assertTrue(await asyncio.to_thread(entered.wait, 5))
+                fast = await client.get(f"/api/resources/{resource['id']}")
+                released.set()
+                self.assertEqual((await slow).status_code, 200)
+                return fast
+
+        with mock.patch("app.api.resources.open_resource_blob", open_slowly):
+            fast = asyncio.run(run())
+        self.assertEqual(fast.status_code, 200)
+        self.assertTrue(outcome["released"])
+
+if __name__ == '__main__':
+    unittest.main()
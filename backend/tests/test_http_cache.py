@@ -0,0 +1,115 @@
+import hashlib
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from support import ApiTestCase
+
+from app.core.http_cache import etag_matches, http_date, if_range_matches, not_modified
+
+class TestConditionalHelpers(unittest.TestCase):
+    def test_etag_comparison(self):
+        self.assertTrue(etag_matches('"a", W/"b"', 'W/"b"'))
+        self.assertTrue(etag_matches('W/"b"', '"b"'))
+        self.assertFalse(etag_matches('W/"b"', '"b"', weak=False))
+        self.assertTrue(etag_matches("*", '"x"'))
+        self.assertFalse(etag_matches('"a"', '"b"'))
+
+    def test_if_none_match_overrides_if_modified_since(self):
+        modified = datetime(2024, 3, 1, 8, 0, 0, 500000)
+        later = http_date(modified + timedelta(days=1))
+        self.assertTrue(not_modified(None, later, '"x"', modified))
+        self.assertTrue(not_modified(None, http_date(modified), '"x"', modified))
+        self.assertFalse(not_modified('"y"', later, '"x"', modified))
+        self.assertFalse(not_modified(None, "not a date", '"x"', modified))
+
+    def test_if_range(self):
+        modified = datetime(2024, 3, 1, 8, 0, tzinfo=timezone.utc)
+        self.assertTrue(if_range_matches(None, '"x"', modified))
+        self.assertTrue(if_range_matches('"x"', '"x"', modified))
+        self.assertFalse(if_range_matches('W/"x"', '"x"', modified))
+        self.assertTrue(if_range_matches(http_date(modified), None, modified))
+        self.assertFalse(if_range_matches(http_date(modified - timedelta(seconds=1)), None, modified))
+
+class TestContentCaching(ApiTestCase, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.payload = b"\x89PNG" + bytes(range(256)) * 400
+        self.resource = self.upload(media_type="IMAGE", data=self.payload)
+        self.url = f"/api/resources/{self.resource['id']}/content"
+        self.etag = f'"{hashlib.sha256(self.payload).hexdigest()}"'
+
+    def test_validators_and_cache_control(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.headers["etag"], self.etag)
+        self.assertIn("last-modified", response.headers)
+        self.assertEqual(response.headers["cache-control"], "private, no-cache")
+
+        self.assertTrue(self.resource["file_url"].endswith(f"?v={self.etag.strip(chr(34))}"))
+        response = self.client.get(self.resource["file_url"])
+        self.assertEqual(response.content, self.payload)
+        self.assertIn("immutable", response.headers["cache-control"])
+        response = self.client.get(self.url, params={"v": "stale"})
+        self.assertNotIn("immutable", response.headers["cache-control"])
+
+    def test_not_modified_skips_the_blob(self):
+        self.statements.clear()
+        response = self.client.get(self.url, headers={"If-None-Match": self.etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response.headers["etag"], self.etag)
+        self.assertFalse([s for s in self.statements if "resource_chunks" in s or "media_blobs" in s])
+
+        last_modified = self.client.get(self.url).headers["last-modified"]
+        response = self.client.get(self.url, headers={"If-Modified-Since": last_modified})
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(self.url, headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.url, headers={"If-None-Match": '"other"', "If-Modified-Since": last_modified})
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_range(self):
+        headers = {"Range": "bytes=0-99", "If-Range": self.etag}
+        response = self.client.get(self.url, headers=headers)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.content, self.payload[:100])
+
+        # A stale validator means the client's partial copy is useless
+        response = self.client.get(self.url, headers=dict(headers, **{"If-Range": '"stale"'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.payload)
+
+class TestMetadataCaching(ApiTestCase, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.resource = self.upload()
+        self.upload(title="第二个资料")
+
+    def assert_revalidates(self, url):
+        first = self.client.get(url)
+        etag = first.headers["etag"]
+        self.assertTrue(etag.startswith('W/"'))
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+        self.client.put(f"/api/resources/{self.resource['id']}", json={"key_points": "新要点"})
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["etag"], etag)
+
+    def test_list(self):
+        self.assert_revalidates("/api/resources")
+
+    def test_unpaginated_list(self):
+        self.assert_revalidates("/api/resources?unpaginated=true")
+
+    def test_detail(self):
+        self.assert_revalidates(f"/api/resources/{self.resource['id']}")
+
+    def test_delete_changes_list_etag(self):
+        etag = self.client.get("/api/resources").headers["etag"]
+        self.client.delete(f"/api/resources/{self.resource['id']}")
+        self.assertEqual(self.client.get("/api/resources", headers={"If-None-Match": etag}).status_code, 200)
+
+if __name__ == '__main__':
+    unittest.main()
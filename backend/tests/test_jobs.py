@@ -0,0 +1,150 @@
+import asyncio
+import sys
+import unittest
+from unittest import mock
+
+from support import ApiTestCase
+
+from app.core.jobs import JobWorker
+from app.core.transcode import transcode_video
+from app.models.database import Job, JobStatus
+
+# Stand-in for ffmpeg: reports progress like `-progress pipe:1` and writes a
+# "compressed" copy (the input's first half) to the output path
+FAKE_FFMPEG = """
+import sys
+src, dst = sys.argv[1], sys.argv[2]
+sys.stderr.write("  Duration: 00:00:10.00, start: 0.000000, bitrate: 1 kb/s\\n")
+for us in (2500000, 5000000, 10000000):
+    print(f"out_time_us={us}", flush=True)
+data = open(src, "rb").read()
+open(dst, "wb").write(data[: len(data) // 2])
+"""
+
+FAILING_FFMPEG = "import sys; sys.stderr.write('Invalid data found when processing input\\n'); sys.exit(1)"
+
+def fake_command(script):
+    return lambda in_path, out_path: [sys.executable, "-c", script, in_path, out_path]
+
+class TestTranscodeJobs(ApiTestCase, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.worker = JobWorker(self.SessionLocal, handlers={"transcode": transcode_video})
+        self.payload = bytes(range(256)) * 4096
+        patcher = mock.patch("app.core.transcode.ffmpeg_available", return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        with mock.patch("app.api.resources.ffmpeg_available", return_value=True):
+            response = self.client.post(
+                "/api/resources",
+                data={"title": "手术录像", "category": "临床带教", "media_type": "VIDEO", "compress": "true"},
+                files={"file": ("clip.mp4", self.payload, "video/mp4")},
+            )
+        self.assertEqual(response.status_code, 200, response.text)
+        self.resource = response.json()
+        self.job_id = int(response.headers["X-Job-Id"])
+
+    def run_jobs(self, script):
+        with mock.patch("app.core.transcode.transcode_command", fake_command(script)):
+            asyncio.run(self.worker.run_until_idle())
+        return self.client.get(f"/api/jobs/{self.job_id}").json()
+
+    def test_upload_returns_original_before_transcode(self):
+        job = self.client.get(f"/api/jobs/{self.job_id}").json()
+        self.assertEqual(job["status"], "PENDING")
+        self.assertEqual(job["resource_id"], self.resource["id"])
+        content = self.client.get(f"/api/resources/{self.resource['id']}/content").content
+        self.assertEqual(content, self.payload)
+
+    def test_successful_job_swaps_in_compressed_file(self):
+        job = self.run_jobs(FAKE_FFMPEG)
+        self.assertEqual(job["status"], "SUCCEEDED")
+        self.assertEqual(job["progress"], 1.0)
+        self.assertEqual(job["attempts"], 1)
+
+        detail = self.client.get(f"/api/resources/{self.resource['id']}").json()
+        self.assertEqual(detail["size"], len(self.payload) // 2)
+        content = self.client.get(f"/api/resources/{self.resource['id']}/content").content
+        self.assertEqual(content, self.payload[: len(self.payload) // 2])
+        stats = self.client.get("/api/admin/storage/dedup").json()
+        self.assertEqual(stats["blobs"], 1)
+
+    def test_failed_job_can_be_retried(self):
+        job = self.run_jobs(FAILING_FFMPEG)
+        self.assertEqual(job["status"], "FAILED")
+        self.assertIn("Invalid data", job["error"])
+        self.assertEqual(
+            self.client.get(f"/api/resources/{self.resource['id']}/content").content, self.payload
+        )
+
+        response = self.client.post(f"/api/jobs/{self.job_id}/retry")
+        self.assertEqual(response.json()["status"], "PENDING")
+        self.assertEqual(self.client.post(f"/api/jobs/{self.job_id}/retry").status_code, 409)
+
+        job = self.run_jobs(FAKE_FFMPEG)
+        self.assertEqual(job["status"], "SUCCEEDED")
+        self.assertEqual(job["attempts"], 2)
+
+    def test_concurrency_limit(self):
+        with self.SessionLocal() as db:
+            for _ in range(4):
+                db.add(Job(kind="sleep", status=JobStatus.PENDING, attempts=0, payload="{}"))
+            db.commit()
+
+        running = 0
+        peak = 0
+
+        async def sleep_job(ctx):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.05)
+            running -= 1
+
+        async def drive():
+            worker = JobWorker(self.SessionLocal, concurrency=2, handlers={"sleep": sleep_job, "transcode": sleep_job})
+            worker.start()
+            for _ in range(100):
+                await asyncio.sleep(0.02)
+                with self.SessionLocal() as db:
+                    if db.query(Job).filter(Job.status != JobStatus.SUCCEEDED).count() == 0:
+                        break
+            await worker.stop()
+
+        asyncio.run(drive())
+        self.assertEqual(peak, 2)
+        with self.SessionLocal() as db:
+            self.assertEqual(db.query(Job).filter(Job.status == JobStatus.SUCCEEDED).count(), 5)
+
+    def test_silent_job_is_not_requeued_while_running(self):
+        with self.SessionLocal() as db:
+            db.add(Job(kind="silent", status=JobStatus.PENDING, attempts=0, payload="{}"))
+            db.commit()
+        statuses = []
+
+        async def silent_job(ctx):
+            # No progress reports at all, like a renditions job
+            await asyncio.sleep(1.0)
+
+        async def drive():
+            worker = JobWorker(self.SessionLocal, handlers={"silent": silent_job}, heartbeat_interval=0.05)
+            other = JobWorker(self.SessionLocal, handlers={})
+            run = asyncio.create_task(worker.run_until_idle())
+            await asyncio.sleep(0.3)
+            with mock.patch("app.core.jobs.JOB_STALE_SECONDS", 0.25):
+                for _ in range(6):
+                    # Another process looking for jobs abandoned by a dead worker
+                    other._requeue_stale()
+                    with self.SessionLocal() as db:
+                        statuses.append(db.query(Job.status).filter(Job.kind == "silent").scalar())
+                    await asyncio.sleep(0.1)
+            await run
+
+        asyncio.run(drive())
+        self.assertEqual(set(statuses), {JobStatus.RUNNING})
+        with self.SessionLocal() as db:
+            job = db.query(Job).filter(Job.kind == "silent").one()
+            self.assertEqual((job.status, job.attempts), (JobStatus.SUCCEEDED, 1))
+
+if __name__ == '__main__':
+    unittest.main()
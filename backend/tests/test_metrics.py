@@ -0,0 +1,158 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from support import ApiTestCase
+
+from app.api.metrics import router as metrics_router
+from app.core.metrics import MetricsMiddleware, MetricsRegistry, instrument_engine
+
+def parse(text):
+    """{'name{labels}': value} for every sample line of an exposition."""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            series, _, value = line.rpartition(" ")
+            samples[series] = float(value)
+    return samples
+
+class TestRequestMetrics(ApiTestCase, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.registry = MetricsRegistry(directory=None)
+        self.app.add_middleware(MetricsMiddleware, registry=self.registry)
+        self.app.include_router(metrics_router)
+        instrument_engine(self.engine, self.registry)
+        patcher = mock.patch("app.api.metrics.metrics", self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def scrape(self):
+        response = self.client.get("/api/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain; version=0.0.4"))
+        return parse(response.text)
+
+    def test_requests_by_route_template(self):
+        first = self.upload(title="牙周讲义")
+        second = self.upload(title="拔牙示教")
+        sizes = [len(self.client.get(f"/api/resources/{r['id']}").content) for r in (first, second)]
+        self.client.get("/api/no-such-thing")
+
+        samples = self.scrape()
+        route = 'route="/api/resources/{resource_id}"'
+        self.assertEqual(samples[f'http_requests_total{{method="GET",{route},status="200"}}'], 2)
+        self.assertEqual(samples['http_requests_total{method="POST",route="/api/resources",status="200"}'], 2)
+        self.assertEqual(samples['http_requests_total{method="GET",route="unmatched",status="404"}'], 1)
+        self.assertEqual(samples[f'http_response_size_bytes_sum{{method="GET",{route}}}'], sum(sizes))
+        self.assertEqual(samples[f'http_request_duration_seconds_count{{method="GET",{route}}}'], 2)
+        self.assertEqual(samples[f'http_request_duration_seconds_bucket{{method="GET",{route},le="+Inf"}}'], 2)
+        # The scrape itself is in flight while it renders
+        self.assertEqual(samples["http_requests_in_flight"], 1)
+
+    def test_database_metrics(self):
+        self.upload()
+        self.client.get("/api/resources")
+        samples = self.scrape()
+        self.assertGreater(samples['db_queries_total{type="SELECT"}'], 0)
+        self.assertGreater(samples['db_queries_total{type="INSERT"}'], 0)
+        self.assertEqual(samples['db_query_duration_seconds_count{type="SELECT"}'], samples['db_queries_total{type="SELECT"}'])
+        self.assertGreater(samples["db_pool_checkouts_total"], 0)
+        self.assertEqual(samples["db_pool_checked_out"], 0)
+        self.assertIn("db_pool_size", samples)
+
+class TestMultiProcess(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmpdir.cleanup)
+        self.directory = self._tmpdir.name
+
+    def write_worker(self, pid, requests, in_flight):
+        snapshot = {
+            "pid": pid,
+            "values": [
+                ["http_requests_total", [["method", "GET"], ["route", "/api/health"], ["status", "200"]], requests],
+                ["http_requests_in_flight", [], in_flight],
+            ],
+            "histograms": [["db_query_duration_seconds", [["type", "SELECT"]], [requests] + [0] * 11 + [0.001, requests]]],
+        }
+        with open(os.path.join(self.directory, f"{pid}.json"), "w") as f:
+            json.dump(snapshot, f)
+
+    def test_aggregates_workers(self):
+        exited = subprocess.Popen([sys.executable, "-c", "pass"])
+        exited.wait()
+        self.write_worker(os.getppid(), requests=3, in_flight=2)
+        self.write_worker(exited.pid, requests=4, in_flight=5)
+
+        registry = MetricsRegistry(directory=self.directory)
+        registry.inc("http_requests_total", method="GET", route="/api/health", status="200")
+        registry.inc("http_requests_in_flight")
+        samples = parse(registry.render())
+
+        # Counters of exited workers still count; their gauges do not
+        self.assertEqual(samples['http_requests_total{method="GET",route="/api/health",status="200"}'], 8)
+        self.assertEqual(samples["http_requests_in_flight"], 3)
+        self.assertEqual(samples['db_query_duration_seconds_bucket{type="SELECT",le="0.0005"}'], 7)
+        self.assertEqual(samples['db_query_duration_seconds_count{type="SELECT"}'], 7)
+
+    def test_flush_and_pid_reuse(self):
+        registry = MetricsRegistry(directory=self.directory)
+        registry.inc("db_pool_checkouts_total", 5)
+        registry.flush()
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        with open(path) as f:
+            self.assertEqual(json.load(f)["values"], [["db_pool_checkouts_total", [], 5]])
+
+        # A new process with the same pid keeps the old totals
+        reborn = MetricsRegistry(directory=self.directory)
+
+        async def start():
+            reborn.start()
+            await reborn.stop()
+
+        asyncio.run(start())
+        reborn.inc("db_pool_checkouts_total", 2)
+        self.assertEqual(parse(reborn.render())["db_pool_checkouts_total"], 7)
+        # The earlier process's file was merged into dead.json and removed
+        self.assertFalse([name for name in os.listdir(self.directory) if name.startswith("dead-")])
+
+    def test_exited_workers_are_compacted(self):
+        exited = []
+        for _ in range(2):
+            process = subprocess.Popen([sys.executable, "-c", "pass"])
+            process.wait()
+            exited.append(process.pid)
+        self.write_worker(os.getppid(), requests=3, in_flight=2)
+        self.write_worker(exited[0], requests=4, in_flight=5)
+        self.write_worker(exited[1], requests=1, in_flight=1)
+
+        registry = MetricsRegistry(directory=self.directory)
+        before = parse(registry.render())
+        registry.compact()
+        self.assertEqual(
+            sorted(name for name in os.listdir(self.directory) if name.endswith(".json")),
+            sorted(["dead.json", f"{os.getppid()}.json"]),
+        )
+        self.assertEqual(parse(registry.render()), before)
+
+        # A later compaction adds to the merged totals
+        self.write_worker(exited[0], requests=2, in_flight=1)
+        registry.compact()
+        samples = parse(registry.render())
+        self.assertEqual(samples['http_requests_total{method="GET",route="/api/health",status="200"}'], 10)
+        self.assertEqual(samples['db_query_duration_seconds_count{type="SELECT"}'], 10)
+        self.assertEqual(samples["http_requests_in_flight"], 2)
+
+    def test_label_values_escaped(self):
+        registry = MetricsRegistry(directory=None)
+        registry.inc("http_requests_total", method="GET", route='/a"b\\c', status="200")
+        self.assertIn('route="/a\\"b\\\\c"', registry.render())
+
+if __name__ == '__main__':
+    unittest.main()
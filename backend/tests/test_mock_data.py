@@ -0,0 +1,93 @@
+import asyncio
+import random
+import unittest
+from collections import Counter
+
+import httpx
+from sqlalchemy import func, select
+
+from support import ApiTestCase
+
+from app.core.mock_data import SIZE_PROFILES, generate_corpus, sample_size
+from app.models.database import LearningResource, MediaBlob, MediaType, ShareLink
+from scripts.benchmark import Workload, compare, parse_args, run_scenario
+
+class TestSizeProfiles(unittest.TestCase):
+    def test_sizes_follow_profile(self):
+        rng = random.Random(1)
+        sizes = sorted(sample_size(rng, MediaType.IMAGE) for _ in range(501))
+        self.assertAlmostEqual(sizes[250] / SIZE_PROFILES[MediaType.IMAGE].median, 1, delta=0.15)
+        self.assertLessEqual(sizes[-1], SIZE_PROFILES[MediaType.IMAGE].cap)
+
+class TestMockCorpus(ApiTestCase, unittest.TestCase):
+    def generate(self, **kwargs):
+        kwargs = {"shares": 20, "pool_size": 2, "size_scale": 0.001, **kwargs}
+        return generate_corpus(self.engine, 300, **kwargs)
+
+    def test_corpus_is_consistent(self):
+        corpus = self.generate()
+        self.assertEqual((corpus.resources, len(corpus.share_tokens)), (300, 20))
+        with self.SessionLocal() as db:
+            self.assertEqual(db.query(LearningResource).count(), 300)
+            # Every reference to a pooled payload is counted
+            references = Counter(db.execute(select(LearningResource.content_hash)).scalars())
+            blobs = {blob.sha256: blob for blob in db.query(MediaBlob)}
+            self.assertEqual(len(blobs), corpus.blobs)
+            self.assertEqual(references, Counter({digest: blob.ref_count for digest, blob in blobs.items()}))
+            video = db.query(LearningResource).filter(LearningResource.media_type == MediaType.VIDEO).first()
+            self.assertEqual(video.size, blobs[video.content_hash].size)
+            self.assertGreater(db.execute(select(func.count()).select_from(ShareLink)).scalar(), 0)
+
+        content = self.client.get(f"/api/resources/{video.id}/content", headers={"Range": "bytes=0-99"})
+        self.assertEqual(content.status_code, 206)
+        self.assertEqual(len(content.content), 100)
+        timeline = self.client.get("/api/resources/timeline").json()
+        self.assertEqual(sum(day["count"] for day in timeline), 300)
+        shared = self.client.get(f"/api/shares/{corpus.share_tokens[0]}")
+        self.assertEqual(shared.status_code, 200)
+        found = self.client.get("/api/resources/search", params={"q": video.title}).json()
+        self.assertIn(video.id, [r["id"] for r in found])
+
+    def test_same_seed_same_corpus(self):
+        self.generate(with_blobs=False, shares=0)
+        with self.SessionLocal() as db:
+            first = [(r.title, r.created_at.date()) for r in db.query(LearningResource).order_by(LearningResource.id)]
+            db.query(LearningResource).delete()
+            db.commit()
+        self.generate(with_blobs=False, shares=0)
+        with self.SessionLocal() as db:
+            second = [(r.title, r.created_at.date()) for r in db.query(LearningResource).order_by(LearningResource.id)]
+        self.assertEqual(first, second)
+
+    def test_benchmark_scenarios(self):
+        self.generate()
+        args = parse_args(["--range-kb", "4", "--upload-kb", "4"])
+        workload = Workload(self.SessionLocal, args)
+
+        async def run():
+            transport = httpx.ASGITransport(app=self.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                return {
+                    scenario: await run_scenario(client, workload, scenario, requests=6, concurrency=3)
+                    for scenario in ("listing", "timeline", "range", "upload", "share")
+                }
+
+        results = asyncio.run(run())
+        for scenario, result in results.items():
+            self.assertEqual((result["requests"], result["errors"]), (6, 0), scenario)
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+            self.assertGreater(result["peak_rss_mb"], 0)
+
+class TestBaselineComparison(unittest.TestCase):
+    def test_regressions_outside_tolerance(self):
+        base = {"listing": {"p95_ms": 100, "p99_ms": 200, "rps": 50, "peak_rss_mb": 100}}
+        now = {
+            "listing": {"p95_ms": 130, "p99_ms": 150, "rps": 45, "peak_rss_mb": 110},
+            "upload": {"p95_ms": 1, "p99_ms": 1, "rps": 1, "peak_rss_mb": 1},
+        }
+        rows, regressions = compare(now, base, tolerance=0.2)
+        self.assertEqual(len(rows), 4)
+        self.assertEqual([(scenario, metric) for scenario, metric, *_ in regressions], [("listing", "p95_ms")])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import io
+import struct
+import unittest
+
+from support import ApiTestCase
+
+from app.core.mp4 import MediaInfo, Mp4Error, ingest_media, inspect_mp4, iter_boxes
+
+def box(kind, payload=b""):
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+def full_box(kind, version, payload):
+    return box(kind, struct.pack(">I", version << 24) + payload)
+
+def mvhd(timescale, duration):
+    return full_box(b"mvhd", 0, struct.pack(">IIII", 0, 0, timescale, duration) + b"\0" * 80)
+
+def tkhd(width, height, rotate=False):
+    matrix = (0, 0x10000, 0, -0x10000, 0, 0, 0, 0, 0x40000000) if rotate else \
+        (0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000)
+    payload = struct.pack(">IIIII", 0, 0, 1, 0, 0) + b"\0" * 16 + struct.pack(">9i", *matrix)
+    return full_box(b"tkhd", 0, payload + struct.pack(">II", width << 16, height << 16))
+
+def trak(handler, offsets, width=0, height=0, rotate=False):
+    stco = full_box(b"stco", 0, struct.pack(">I", len(offsets)) + b"".join(struct.pack(">I", o) for o in offsets))
+    hdlr = full_box(b"hdlr", 0, b"\0" * 4 + handler + b"\0" * 13)
+    minf = box(b"minf", box(b"stbl", stco))
+    return box(b"trak", tkhd(width, height, rotate) + box(b"mdia", hdlr + minf))
+
+def movie(faststart=False, rotate=False):
+    """A two-track movie whose chunks are 'V0', 'A0', 'V1' inside mdat; moov last unless faststart."""
+    ftyp = box(b"ftyp", b"isom\0\0\0\0isommp42")
+    chunks = [b"V0" * 50, b"A0" * 50, b"V1" * 50]
+
+    def build(mdat_at):
+        body = mdat_at + 8
+        offsets = [body, body + 100, body + 200]
+        return box(b"moov", mvhd(600, 75300) + trak(b"vide", [offsets[0], offsets[2]], 1920, 1080, rotate)
+                   + trak(b"soun", [offsets[1]]))
+
+    mdat = box(b"mdat", b"".join(chunks))
+    if faststart:
+        moov_size = len(build(0))
+        return ftyp + build(len(ftyp) + moov_size) + mdat
+    return ftyp + mdat + build(len(ftyp))
+
+def chunks_at(data):
+    """The chunk bytes each stco entry of the file points at."""
+    moov = next(b for b in iter_boxes(data, 0, len(data)) if b.type == b"moov")
+    found = []
+    position = 0
+    while True:
+        position = data.find(b"stco", moov.offset, moov.end)
+        if position < 0:
+            break
+        count = struct.unpack_from(">I", data, position + 8)[0]
+        for i in range(count):
+            offset = struct.unpack_from(">I", data, position + 12 + 4 * i)[0]
+            found.append(data[offset:offset + 2])
+        moov = moov._replace(offset=position + 4)
+    return found
+
+class TestFastStart(unittest.TestCase):
+    def test_moov_moved_ahead_of_mdat(self):
+        original = movie()
+        reader, info = ingest_media(io.BytesIO(original))
+        relocated = reader.read()
+
+        self.assertEqual(len(relocated), len(original))
+        types = [b.type for b in iter_boxes(relocated, 0, len(relocated))]
+        self.assertEqual(types, [b"ftyp", b"moov", b"mdat"])
+        self.assertEqual(chunks_at(original), [b"V0", b"V1", b"A0"])
+        self.assertEqual(chunks_at(relocated), [b"V0", b"V1", b"A0"])
+        self.assertEqual(info, MediaInfo(125.5, 1920, 1080))
+
+    def test_faststart_file_passes_through(self):
+        source = io.BytesIO(movie(faststart=True))
+        reader, info = ingest_media(source)
+        self.assertIs(reader, source)
+        self.assertEqual(reader.tell(), 0)
+        self.assertEqual(info.duration, 125.5)
+
+    def test_rotated_video_reports_display_size(self):
+        _, info = ingest_media(io.BytesIO(movie(rotate=True)))
+        self.assertEqual((info.width, info.height), (1080, 1920))
+
+    def test_other_formats_untouched(self):
+        for data in (b"ID3\x04" + b"\0" * 100, b"", b"\0\0\0\x10ftypisom" + b"\0" * 3):
+            source = io.BytesIO(data)
+            reader, info = ingest_media(source)
+            self.assertIs(reader, source)
+            self.assertIsNone(info)
+            self.assertEqual(reader.tell(), 0)
+
+    def test_overrunning_box_is_rejected(self):
+        data = movie()
+        corrupt = data[:-4]  # moov claims more bytes than are left
+        with self.assertRaises(Mp4Error):
+            inspect_mp4(io.BytesIO(corrupt))
+        reader, info = ingest_media(io.BytesIO(corrupt))
+        self.assertEqual(reader.read(), corrupt)
+        self.assertIsNone(info)
+
+class TestUploadIngest(ApiTestCase, unittest.TestCase):
+    def test_upload_is_stored_fast_start_with_media_info(self):
+        resource = self.upload(data=movie(), duration="9999")
+        self.assertEqual(resource["duration"], 126)
+        self.assertEqual((resource["width"], resource["height"]), (1920, 1080))
+
+        stored = self.client.get(resource["file_url"]).content
+        self.assertEqual([b.type for b in iter_boxes(stored, 0, len(stored))], [b"ftyp", b"moov", b"mdat"])
+        self.assertEqual(chunks_at(stored), [b"V0", b"V1", b"A0"])
+
+    def test_client_duration_kept_for_unparsed_files(self):
+        resource = self.upload(data=b"x" * 1024, duration="42")
+        self.assertEqual(resource["duration"], 42)
+        self.assertIsNone(resource["width"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,127 @@
 import sys
 import os
+import random
+import re
+import time
 import unittest
+from unittest import mock
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.core.privacy import PrivacyDetector
+from app.core import privacy
+from app.core.privacy import PrivacyDetector, PATIENT_NAME_PATTERNS, PRIVACY_KEYWORDS, SURNAMES, WHITELIST_TERMS
+
+# The pre-compilation detector, kept verbatim (minus debug output) as the
+# reference the compiled engine is checked against.
+def legacy_check_title(title):
+    alerts = []
+    if '患者' in title or '病人' in title:
+        alerts.append("标题包含'患者'或'病人'字样，建议使用编号替代真实姓名")
+    if any(keyword in title for keyword in PRIVACY_KEYWORDS):
+        alerts.append("标题可能包含个人身份信息关键字")
+    for pattern in PATIENT_NAME_PATTERNS:
+        match = re.search(pattern, title)
+        if match:
+            matched_text = match.group(0)
+            is_safe = False
+            for term in WHITELIST_TERMS:
+                if term in title:
+                    if matched_text in term or term in matched_text:
+                        is_safe = True
+                        break
+            if not is_safe:
+                alerts.append(f"标题可能包含真实姓名: {matched_text}")
+                break
+    if re.search(r'1[3-9]\d{9}', title):
+        alerts.append("标题可能包含手机号码")
+    if re.search(r'\d{17}[\dX]', title):
+        alerts.append("标题可能包含身份证号码")
+    if alerts:
+        return PrivacyDetector.RISK_HIGH, alerts
+    return PrivacyDetector.RISK_LOW, alerts
+
+def legacy_check_content(content):
+    alerts = []
+    if not content:
+        return PrivacyDetector.RISK_LOW, alerts
+    if re.search(r'\b\d{17}[\dX]\b', content):
+        alerts.append("内容可能包含身份证号码")
+        return PrivacyDetector.RISK_HIGH, alerts
+    if re.search(r'\b1[3-9]\d{9}\b', content):
+        alerts.append("内容可能包含手机号码")
+        return PrivacyDetector.RISK_MEDIUM, alerts
+    if re.search(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', content):
+        alerts.append("内容可能包含邮箱地址")
+        return PrivacyDetector.RISK_MEDIUM, alerts
+    return PrivacyDetector.RISK_LOW, alerts
+
+REALISTIC_TITLES = [
+    "关于患者张三的治疗方案", "张三 拔牙记录", "李明 根管治疗", "联系电话13812345678",
+    "关于牙周炎的文献综述", "患者张三的录音", "实习生牙体预备演示", "全冠牙体预备要点",
+    "儿童涂氟依从性管理", "上颌窦提升术讲解", "高血压患者拔牙注意事项",
+    "糖尿病与牙周病", "口腔白斑病理切片", "方丝弓矫治技术", "林可霉素用药",
+    "病人王芳复诊", "病历号20240001", "身份证110101199001011234", "John Smith case review",
+    "case review", "CAD/CAM 修复", "下颌第一磨牙根管治疗", "患者姓名及联系方式", "陈旧性骨折",
+    "黄疸患者用药", "种植体周围炎", "", "2024年病例讨论", "手机 13912345678 复诊",
+]
+
+# Titles exercising only name/keyword/number rules (no whitelist characters),
+# on which both engines must agree alert for alert
+def random_titles(count, seed=7):
+    rng = random.Random(seed)
+    whitelist_chars = set("".join(WHITELIST_TERMS))
+    surnames = [c for c in SURNAMES if c not in whitelist_chars]
+    fillers = list("的治疗根管修复种植复诊拔牙讲解记录") + [" ", "-", "A", "b"]
+    pieces = surnames + fillers + ["患者", "病人", "姓名", "电话", "Mary Lee", "13812345678", "11010119900101123X", "2024"]
+    return ["".join(rng.choice(pieces) for _ in range(rng.randint(1, 8))) for _ in range(count)]
+
+# The whitelist rules spelled out position by position, without the scanner:
+# a name candidate whose first character lies inside a whitelisted term is
+# skipped, otherwise it is cut at the next whitelisted term and re-matched
+def reference_check_title(title):
+    alerts = []
+    if '患者' in title or '病人' in title:
+        alerts.append("标题包含'患者'或'病人'字样，建议使用编号替代真实姓名")
+    if any(keyword in title for keyword in PRIVACY_KEYWORDS):
+        alerts.append("标题可能包含个人身份信息关键字")
+    terms = [(i, i + len(term)) for term in WHITELIST_TERMS for i in range(len(title)) if title.startswith(term, i)]
+    for pattern in PATIENT_NAME_PATTERNS:
+        regex = re.compile(pattern)
+        name = None
+        for start in range(len(title)):
+            match = regex.match(title, start)
+            if match is None or any(a <= start < b for a, b in terms):
+                continue
+            cut = min((a for a, _ in terms if start < a < match.end()), default=match.end())
+            match = regex.match(title, start, cut)
+            if match:
+                name = match.group(0)
+                break
+        if name:
+            alerts.append(f"标题可能包含真实姓名: {name}")
+            break
+    if re.search(r'1[3-9]\d{9}', title):
+        alerts.append("标题可能包含手机号码")
+    if re.search(r'\d{17}[\dX]', title):
+        alerts.append("标题可能包含身份证号码")
+    return (PrivacyDetector.RISK_HIGH if alerts else PrivacyDetector.RISK_LOW), alerts
+
+# Titles mixing whitelisted terms with names and keywords, including names
+# glued to terms (张三牙周炎), terms hiding a name (如何张三) and keywords
+# overlapping terms (联系方 + 丝弓 / 式)
+def random_whitelist_titles(count, seed=13):
+    rng = random.Random(seed)
+    pieces = WHITELIST_TERMS + list(SURNAMES) + list("三明芳的治疗复诊丝弓式") + [
+        "张三", "如何", "黄金冠", "患者", "病人", "姓名", "联系方", "病历号", " ", "Mary Lee", "13812345678",
+    ]
+    return ["".join(rng.choice(pieces) for _ in range(rng.randint(1, 8))) for _ in range(count)]
+
+def random_contents(count, seed=11):
+    rng = random.Random(seed)
+    pieces = ["病例", " ", ".", "a", "x@", "@", "doc@example.com", "13812345678", "23812345678",
+              "110101199001011234", "1101011990010112", "X", "_", "9", "\n"]
+    return ["".join(rng.choice(pieces) for _ in range(rng.randint(0, 12))) for _ in range(count)]
 
 class TestPrivacyDetector(unittest.TestCase):
     def test_patient_keyword(self):
@@ -52,5 +168,67 @@ class TestPrivacyDetector(unittest.TestCase):
         # Should contain hash part (Hex uppercase)
         self.assertRegex(suggestion, r'患者_[A-F0-9]+')
 
+class TestCompiledPrivacyEngine(unittest.TestCase):
+    def test_title_equivalence_on_realistic_titles(self):
+        for title in REALISTIC_TITLES:
+            self.assertEqual(PrivacyDetector.check_title(title), legacy_check_title(title), title)
+
+    def test_title_equivalence_on_random_titles(self):
+        for title in random_titles(3000):
+            self.assertEqual(PrivacyDetector.check_title(title), legacy_check_title(title), title)
+
+    def test_whitelist_titles_match_reference(self):
+        for title in random_whitelist_titles(3000):
+            self.assertEqual(PrivacyDetector.check_title(title), reference_check_title(title), title)
+
+    def test_content_equivalence(self):
+        for content in random_contents(3000):
+            self.assertEqual(PrivacyDetector.check_content(content), legacy_check_content(content), content)
+
+    def test_whitelist_uses_span_overlap(self):
+        # The legacy substring guess only looked at the first candidate per
+        # pattern and ignored positions; these are the cases it got wrong
+        cases = [
+            ("如何做根管治疗", PrivacyDetector.RISK_HIGH, PrivacyDetector.RISK_LOW),  # 何 belongs to 如何
+            ("牙周明显改善", PrivacyDetector.RISK_HIGH, PrivacyDetector.RISK_LOW),   # 周 belongs to 牙周
+            ("复杂牙周手术切口设计", PrivacyDetector.RISK_HIGH, PrivacyDetector.RISK_LOW),
+            ("龈下结石清除", PrivacyDetector.RISK_HIGH, PrivacyDetector.RISK_LOW),   # 石 belongs to 结石
+            ("黄金冠 黄明", PrivacyDetector.RISK_LOW, PrivacyDetector.RISK_HIGH),    # second candidate is a name
+        ]
+        for title, legacy_risk, risk in cases:
+            self.assertEqual(legacy_check_title(title)[0], legacy_risk, title)
+            self.assertEqual(PrivacyDetector.check_title(title)[0], risk, title)
+        # A name directly followed by a whitelisted term is still caught
+        risk, alerts = PrivacyDetector.check_title("张三牙周炎")
+        self.assertEqual(risk, PrivacyDetector.RISK_HIGH)
+        self.assertIn("标题可能包含真实姓名: 张三", alerts)
+
+    def test_rules_version_follows_rule_inputs(self):
+        version = privacy.rules_version()
+        self.assertEqual(privacy.rules_version(), version)
+        extended = re.compile(privacy.TERM_SCANNER.pattern + "|籍贯")
+        with mock.patch.object(privacy, "TERM_SCANNER", extended):
+            self.assertNotEqual(privacy.rules_version(), version)
+        with mock.patch.object(privacy, "RULES_REVISION", privacy.RULES_REVISION + 1):
+            self.assertNotEqual(privacy.rules_version(), version)
+
+    # Wall-clock comparison: too noisy for a shared CI runner, so opt-in.
+    # The equivalence tests above are the correctness check.
+    @unittest.skipUnless(os.getenv("RUN_BENCHMARKS"), "set RUN_BENCHMARKS=1 to run timing comparisons")
+    def test_content_faster_than_legacy(self):
+        contents = [t * 20 for t in REALISTIC_TITLES] * 20
+
+        def best_time(fn):
+            times = []
+            for _ in range(3):
+                start = time.perf_counter()
+                for content in contents:
+                    fn(content)
+                times.append(time.perf_counter() - start)
+            return min(times)
+
+        # About 2x on a quiet machine; a margin keeps this from flaking
+        self.assertLess(best_time(PrivacyDetector.check_content), best_time(legacy_check_content) / 1.3)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,82 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from support import ApiTestCase
+
+from app.core.jobs import JobWorker, default_handlers
+from app.core.privacy_audit import run_privacy_audit
+from app.models.database import LearningResource, MediaType, PrivacyFinding
+
+class TestPrivacyAudit(ApiTestCase, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.clean = self.upload(title="根管治疗流程")
+        self.phone = self.upload(title="复诊沟通要点", transcript="如有疑问请拨打 13812345678")
+        # Stored before the current rules existed, so never checked on upload
+        with self.SessionLocal() as db:
+            legacy = LearningResource(
+                title="患者王芳的病历", category="临床带教", media_type=MediaType.DOC,
+                file_url="/uploads/x.pdf", key_points="身份证 110101199001011234",
+            )
+            db.add(legacy)
+            db.commit()
+            self.legacy_id = legacy.id
+
+    def audit(self, **kwargs):
+        kwargs.setdefault("workers", 1)
+        return run_privacy_audit(self.SessionLocal, page_size=2, **kwargs)
+
+    def findings(self):
+        with self.SessionLocal() as db:
+            return {f.resource_id: f.risk_level for f in db.query(PrivacyFinding)}
+
+    def test_audit_records_findings_and_skips_scanned(self):
+        result = self.audit()
+        self.assertEqual((result["scanned"], result["flagged"]), (3, 2))
+        self.assertEqual(self.findings(), {
+            self.clean["id"]: "low", self.phone["id"]: "medium", self.legacy_id: "high",
+        })
+
+        summary = self.client.get("/api/admin/privacy-audit").json()
+        self.assertEqual(summary["pending"], 0)
+        self.assertEqual(summary["by_risk"], {"low": 1, "medium": 1, "high": 1})
+        self.assertEqual([f["resource_id"] for f in summary["flagged"]], [self.legacy_id, self.phone["id"]])
+        legacy = summary["flagged"][0]["findings"]
+        self.assertEqual(set(legacy), {"title", "key_points"})
+        self.assertEqual(summary["flagged"][1]["findings"]["transcript"]["risk"], "medium")
+
+        self.assertEqual(self.audit()["scanned"], 0)
+        self.assertEqual(self.audit(full=True)["scanned"], 3)
+
+    def test_edits_and_rule_changes_trigger_rescan(self):
+        self.audit()
+        self.client.put(f"/api/resources/{self.phone['id']}", json={"transcript": "已删除联系方式"})
+        self.assertEqual(self.client.get("/api/admin/privacy-audit").json()["pending"], 1)
+        self.assertEqual(self.audit()["scanned"], 1)
+        self.assertEqual(self.findings()[self.phone["id"]], "low")
+
+        with mock.patch("app.core.privacy_audit.rules_version", return_value="next-rules"):
+            self.assertEqual(self.audit()["scanned"], 3)
+
+    def test_process_pool_matches_in_process_scan(self):
+        self.audit()
+        expected = self.findings()
+        self.assertEqual(self.audit(workers=2, full=True)["scanned"], 3)
+        self.assertEqual(self.findings(), expected)
+
+    def test_audit_runs_as_single_job(self):
+        job = self.client.post("/api/admin/privacy-audit").json()
+        self.assertEqual(job["kind"], "privacy_audit")
+        self.assertEqual(self.client.post("/api/admin/privacy-audit").json()["id"], job["id"])
+        self.assertEqual(self.client.get("/api/admin/privacy-audit").json()["active_job"]["id"], job["id"])
+
+        with mock.patch("app.core.privacy_audit.PRIVACY_AUDIT_WORKERS", 1):
+            asyncio.run(JobWorker(self.SessionLocal, handlers=default_handlers()).run_until_idle())
+        self.assertEqual(self.client.get(f"/api/jobs/{job['id']}").json()["status"], "SUCCEEDED")
+        summary = self.client.get("/api/admin/privacy-audit").json()
+        self.assertIsNone(summary["active_job"])
+        self.assertEqual(summary["pending"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
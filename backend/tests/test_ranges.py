@@ -0,0 +1,152 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from support import ApiTestCase
+
+from app.core.http_cache import MAX_RANGES, RangeNotSatisfiable, parse_range
+from app.models.database import LearningResource, MediaType
+from app.storage.responses import RangeStaticFiles
+
+def parse_multipart(response):
+    """[(content-range, body)] of a multipart/byteranges response."""
+    content_type = response.headers["content-type"]
+    boundary = content_type.split("boundary=")[1].encode()
+    body = response.content
+    assert body.endswith(b"\r\n--" + boundary + b"--\r\n")
+    parts = []
+    for chunk in body.split(b"--" + boundary)[1:-1]:
+        head, _, data = chunk.partition(b"\r\n\r\n")
+        if data.endswith(b"\r\n"):
+            data = data[:-2]
+        headers = dict(line.split(": ", 1) for line in head.decode().strip().split("\r\n"))
+        parts.append((headers["Content-Range"], data))
+    return parts
+
+class TestParseRange(unittest.TestCase):
+    def test_forms(self):
+        self.assertEqual(parse_range("bytes=0-99", 1000), [(0, 99)])
+        self.assertEqual(parse_range("bytes=-300", 1000), [(700, 999)])
+        self.assertEqual(parse_range("bytes=-5000", 1000), [(0, 999)])
+        self.assertEqual(parse_range("bytes=900-", 1000), [(900, 999)])
+        self.assertEqual(parse_range("bytes=990-5000", 1000), [(990, 999)])
+        self.assertEqual(parse_range("BYTES = 0-0 , -1", 1000), [(0, 0), (999, 999)])
+
+    def test_overlapping_and_adjacent_ranges_coalesce(self):
+        self.assertEqual(parse_range("bytes=50-99,0-9,5-20,21-30", 1000), [(0, 30), (50, 99)])
+
+    def test_ignored_headers(self):
+        for header in ("items=0-1", "bytes=", "bytes=5-1", "bytes=a-b", "bytes=-", "bytes=1"):
+            self.assertIsNone(parse_range(header, 1000), header)
+        many = "bytes=" + ",".join(f"{i * 10}-{i * 10 + 1}" for i in range(MAX_RANGES + 1))
+        self.assertIsNone(parse_range(many, 100000))
+
+    def test_unsatisfiable(self):
+        for header in ("bytes=1000-", "bytes=-0", "bytes=2000-3000,5000-"):
+            with self.assertRaises(RangeNotSatisfiable):
+                parse_range(header, 1000)
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range("bytes=-10", 0)
+        # One satisfiable range is enough
+        self.assertEqual(parse_range("bytes=2000-,0-1", 1000), [(0, 1)])
+
+class TestContentRanges(ApiTestCase, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        # Spans several storage chunks
+        self.payload = os.urandom(2 * 1024 * 1024 + 12345)
+        self.resource = self.upload(media_type="DOC", data=self.payload)
+        self.url = f"/api/resources/{self.resource['id']}/content"
+
+    def get(self, range_header, **headers):
+        return self.client.get(self.url, headers=dict(headers, Range=range_header))
+
+    def test_suffix_range(self):
+        response = self.get("bytes=-1000")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.content, self.payload[-1000:])
+        size = len(self.payload)
+        self.assertEqual(response.headers["content-range"], f"bytes {size - 1000}-{size - 1}/{size}")
+
+    def test_multipart(self):
+        response = self.get("bytes=0-9, 1048570-1048590, -5")
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response.headers["content-type"].startswith("multipart/byteranges; boundary="))
+        self.assertEqual(int(response.headers["content-length"]), len(response.content))
+        size = len(self.payload)
+        self.assertEqual(parse_multipart(response), [
+            (f"bytes 0-9/{size}", self.payload[:10]),
+            (f"bytes 1048570-1048590/{size}", self.payload[1048570:1048591]),
+            (f"bytes {size - 5}-{size - 1}/{size}", self.payload[-5:]),
+        ])
+
+    def test_unsatisfiable_and_ignored(self):
+        response = self.get(f"bytes={len(self.payload)}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response.headers["content-range"], f"bytes */{len(self.payload)}")
+        response = self.get("bytes=10-5")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.content), len(self.payload))
+
+    def test_multipart_honors_if_range(self):
+        etag = self.client.get(self.url, headers={"Range": "bytes=0-0"}).headers["etag"]
+        self.assertEqual(self.get("bytes=0-1,5-6", **{"If-Range": etag}).status_code, 206)
+        self.assertEqual(self.get("bytes=0-1,5-6", **{"If-Range": '"old"'}).status_code, 200)
+
+    def test_legacy_upload_on_disk(self):
+        with tempfile.TemporaryDirectory() as uploads, mock.patch("app.storage.UPLOADS_DIR", uploads):
+            with open(os.path.join(uploads, "old.pdf"), "wb") as f:
+                f.write(self.payload)
+            with self.SessionLocal() as db:
+                legacy = LearningResource(
+                    title="旧资料", category="文献笔记", media_type=MediaType.DOC, file_url="/uploads/old.pdf"
+                )
+                db.add(legacy)
+                db.commit()
+                url = f"/api/resources/{legacy.id}/content"
+            response = self.client.get(url, headers={"Range": "bytes=-100,0-99"})
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual([data for _, data in parse_multipart(response)], [self.payload[:100], self.payload[-100:]])
+            response = self.client.get(url, headers={"Range": "bytes=100-199"})
+            self.assertEqual(response.content, self.payload[100:200])
+
+class TestRangeStaticFiles(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.payload = os.urandom(50000)
+        with open(os.path.join(self.dir.name, "clip.mp4"), "wb") as f:
+            f.write(self.payload)
+        app = FastAPI()
+        app.mount("/uploads", RangeStaticFiles(directory=self.dir.name), name="uploads")
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self.client.close()
+        self.dir.cleanup()
+
+    def test_ranges(self):
+        full = self.client.get("/uploads/clip.mp4")
+        self.assertEqual(full.headers["accept-ranges"], "bytes")
+        response = self.client.get("/uploads/clip.mp4", headers={"Range": "bytes=-10"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.content, self.payload[-10:])
+        self.assertEqual(response.headers["etag"], full.headers["etag"])
+
+        response = self.client.get("/uploads/clip.mp4", headers={"Range": "bytes=0-1,10-11"})
+        self.assertEqual([data for _, data in parse_multipart(response)], [self.payload[:2], self.payload[10:12]])
+        self.assertEqual(self.client.get("/uploads/clip.mp4", headers={"Range": "bytes=60000-"}).status_code, 416)
+
+    def test_if_range(self):
+        etag = self.client.get("/uploads/clip.mp4").headers["etag"]
+        response = self.client.get("/uploads/clip.mp4", headers={"Range": "bytes=0-9", "If-Range": etag})
+        self.assertEqual(response.status_code, 206)
+        response = self.client.get("/uploads/clip.mp4", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.payload)
+
+if __name__ == '__main__':
+    unittest.main()
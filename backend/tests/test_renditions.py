@@ -0,0 +1,143 @@
+import asyncio
+import importlib.util
+import io
+import unittest
+from unittest import mock
+
+from support import ApiTestCase
+
+from app.core.jobs import JobWorker
+from app.core.renditions import RenditionError, _renditions_for, render_renditions, renditions_job
+from app.models.database import Job, JobStatus, LearningResource, MediaBlob, ResourceRendition
+
+def fake_render(data, sizes):
+    return {name: (f"{name}:{edge}:{len(data)}".encode(), edge, edge // 2) for name, edge in sizes.items()}
+
+class TestRenditions(ApiTestCase, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.image = self.upload(title="病理切片", media_type="IMAGE", data=b"\xff\xd8" + b"x" * 5000)
+        self.thumb_url = self.image["renditions"]["thumb"]
+        # Resize in-process so the patched render_renditions is the one called
+        patcher = mock.patch("app.core.renditions.RENDITION_WORKERS", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_jobs(self):
+        asyncio.run(JobWorker(self.SessionLocal, handlers={"renditions": renditions_job}).run_until_idle())
+
+    def jobs(self):
+        with self.SessionLocal() as db:
+            return [(job.status, job.payload) for job in db.query(Job).order_by(Job.id)]
+
+    def test_urls_exposed_for_images_only(self):
+        renditions = self.image["renditions"]
+        self.assertEqual(set(renditions), {"thumb", "medium", "original"})
+        self.assertEqual(renditions["original"], self.image["file_url"])
+        self.assertTrue(self.thumb_url.endswith(f"?v={self.image['content_hash']}"))
+        self.assertIsNone(self.upload(media_type="VIDEO")["renditions"])
+
+    def test_redirects_to_original_without_pillow(self):
+        with mock.patch("app.api.resources.pillow_available", return_value=False):
+            response = self.client.get(self.thumb_url, follow_redirects=False)
+        self.assertEqual(response.status_code, 307)
+        self.assertEqual(response.headers["location"], self.image["file_url"])
+
+    @mock.patch("app.api.resources.pillow_available", return_value=True)
+    @mock.patch("app.core.renditions.render_renditions", side_effect=fake_render)
+    def test_made_by_job_then_cached(self, render, _):
+        # Not made yet: the request redirects and leaves the work to the job
+        # queued at upload, without queueing another
+        response = self.client.get(self.thumb_url, follow_redirects=False)
+        self.assertEqual(response.status_code, 307)
+        self.assertEqual(response.headers["location"], self.image["file_url"])
+        self.assertEqual(render.call_count, 0)
+        self.assertEqual(len(self.jobs()), 1)
+
+        self.run_jobs()
+        response = self.client.get(self.thumb_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"thumb:320:5002")
+        self.assertEqual(response.headers["content-type"], "image/jpeg")
+        self.assertIn("immutable", response.headers["cache-control"])
+
+        medium = self.client.get(self.image["renditions"]["medium"])
+        self.assertEqual(medium.content, b"medium:1280:5002")
+        self.assertEqual(render.call_count, 1)
+
+        response = self.client.get(self.thumb_url, headers={"If-None-Match": response.headers["etag"]})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(render.call_count, 1)
+
+    @mock.patch("app.api.resources.pillow_available", return_value=True)
+    @mock.patch("app.core.renditions.render_renditions", side_effect=fake_render)
+    def test_stale_renditions_are_regenerated(self, render, _):
+        self.run_jobs()
+        with self.SessionLocal() as db:
+            db.get(LearningResource, self.image["id"]).content_hash = "0" * 64
+            db.commit()
+        response = self.client.get(f"/api/resources/{self.image['id']}/renditions/thumb", follow_redirects=False)
+        self.assertEqual(response.status_code, 307)
+        self.run_jobs()
+        self.assertEqual(render.call_count, 2)
+        with self.SessionLocal() as db:
+            rows = db.query(ResourceRendition).all()
+            self.assertEqual({row.source_hash for row in rows}, {"0" * 64})
+
+    @mock.patch("app.api.resources.pillow_available", return_value=True)
+    @mock.patch("app.core.renditions.render_renditions", side_effect=RenditionError("cannot identify image file"))
+    def test_unreadable_image_is_not_retried_per_request(self, render, _):
+        with mock.patch("builtins.print"):
+            self.run_jobs()
+            for _ in range(3):
+                self.assertEqual(self.client.get(self.thumb_url, follow_redirects=False).status_code, 307)
+                self.run_jobs()
+        # The upload's job, then one for this content; both failed
+        self.assertEqual([status for status, _ in self.jobs()], [JobStatus.FAILED, JobStatus.FAILED])
+        self.assertEqual(render.call_count, 2)
+
+    @mock.patch("app.api.resources.pillow_available", return_value=True)
+    @mock.patch("app.core.renditions.render_renditions", side_effect=fake_render)
+    def test_delete_releases_rendition_bytes(self, render, _):
+        self.run_jobs()
+        self.client.delete(f"/api/resources/{self.image['id']}")
+        with self.SessionLocal() as db:
+            self.assertEqual(db.query(ResourceRendition).count(), 0)
+            self.assertEqual(db.query(MediaBlob).count(), 0)
+
+    def test_unknown_rendition(self):
+        response = self.client.get(f"/api/resources/{self.image['id']}/renditions/huge")
+        self.assertEqual(response.status_code, 404)
+
+@unittest.skipUnless(importlib.util.find_spec("PIL"), "Pillow not installed")
+class TestRenderRenditions(unittest.TestCase):
+    def test_downscales_to_longest_edge(self):
+        from PIL import Image
+
+        source = io.BytesIO()
+        Image.new("RGB", (4000, 3000), (200, 120, 90)).save(source, "PNG")
+        results = render_renditions(source.getvalue(), {"thumb": 320, "medium": 1280})
+        self.assertEqual(results["thumb"][1:], (320, 240))
+        self.assertEqual(results["medium"][1:], (1280, 960))
+        self.assertLess(len(results["thumb"][0]), len(source.getvalue()))
+
+@unittest.skipUnless(importlib.util.find_spec("PIL"), "Pillow not installed")
+class TestRenditionJob(ApiTestCase, unittest.TestCase):
+    def test_upload_queues_job_that_renders(self):
+        from PIL import Image
+
+        source = io.BytesIO()
+        Image.new("RGB", (2000, 1000), (10, 20, 30)).save(source, "PNG")
+        image = self.upload(media_type="IMAGE", data=source.getvalue())
+        with self.SessionLocal() as db:
+            self.assertEqual([job.kind for job in db.query(Job)], ["renditions"])
+
+        _renditions_for(self.SessionLocal, image["id"])
+        with self.SessionLocal() as db:
+            sizes = {row.name: (row.width, row.height) for row in db.query(ResourceRendition)}
+        self.assertEqual(sizes, {"thumb": (320, 160), "medium": (1280, 640)})
+        response = self.client.get(image["renditions"]["thumb"])
+        self.assertEqual(Image.open(io.BytesIO(response.content)).size, (320, 160))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,346 @@
+import os
+import hashlib
+from datetime import datetime
+import tempfile
+import unittest
+from unittest import mock
+
+from support import ApiTestCase
+
+from app.core.migration import migrate_content_to_chunks
+from app.core.queries import encode_cursor
+from app.models.database import LearningResource, MediaBlob, MediaType, ResourceChunk
+from app.core.uploads import UploadSizeLimitMiddleware
+from app.storage.database import DatabaseStorage
+from app.storage.s3 import S3Storage
+
+class TestResourceBlobLoading(ApiTestCase, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.payload = b"\x00\x01" * (256 * 1024)
+        self.resource = self.upload(data=self.payload)
+        self.statements.clear()
+
+    def assert_no_blob_selected(self):
+        selects = [s for s in self.statements if s.lstrip().upper().startswith("SELECT")]
+        self.assertTrue(selects)
+        for statement in selects:
+            self.assertNotRegex(statement, r"learning_resources\.content\b")
+
+    def test_list_does_not_fetch_content(self):
+        response = self.client.get("/api/resources")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["items"]), 1)
+        self.assert_no_blob_selected()
+
+    def test_timeline_day_does_not_fetch_content(self):
+        day = self.resource["created_at"][:10]
+        response = self.client.get(f"/api/resources/timeline/{day}")
+        self.assertEqual(response.status_code, 200)
+        self.assert_no_blob_selected()
+
+    def test_detail_and_update_do_not_fetch_content(self):
+        rid = self.resource["id"]
+        self.assertEqual(self.client.get(f"/api/resources/{rid}").status_code, 200)
+        response = self.client.put(f"/api/resources/{rid}", json={"key_points": "垂直褥式缝合"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["key_points"], "垂直褥式缝合")
+        self.assert_no_blob_selected()
+
+    def test_content_endpoint_still_serves_bytes(self):
+        response = self.client.get(f"/api/resources/{self.resource['id']}/content")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.payload)
+
+class TestPagination(ApiTestCase, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        # Server-default timestamps (no microseconds) mixed with ORM-written
+        # ones, several sharing the same second, in two categories
+        for _ in range(3):
+            self.upload()
+        with self.SessionLocal() as db:
+            for i in range(6):
+                db.add(LearningResource(
+                    title=f"病例{i}", category="病理照片" if i % 2 else "临床带教",
+                    media_type=MediaType.IMAGE, file_url="/uploads/x.png",
+                    created_at=datetime(2024, 5, 1, 8, 0, 0),
+                ))
+            db.commit()
+
+    def walk(self, **params):
+        ids, cursor = [], None
+        while True:
+            query = dict(params, limit=2)
+            if cursor:
+                query["cursor"] = cursor
+            page = self.client.get("/api/resources", params=query).json()
+            self.assertLessEqual(len(page["items"]), 2)
+            ids.extend(item["id"] for item in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return ids
+
+    def test_pages_cover_every_row_once_in_order(self):
+        legacy = self.client.get("/api/resources", params={"unpaginated": "true"}).json()
+        self.assertEqual(self.walk(), [r["id"] for r in legacy])
+        self.assertEqual(len(legacy), 9)
+
+    def test_category_filter(self):
+        ids = self.walk(category="病理照片")
+        self.assertEqual(len(ids), 3)
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+    def test_cursor_query_uses_keyset_not_offset(self):
+        first = self.client.get("/api/resources", params={"limit": 2}).json()
+        self.statements.clear()
+        self.client.get("/api/resources", params={"limit": 2, "cursor": first["next_cursor"]})
+        listing = [s for s in self.statements if "FROM learning_resources" in s][0]
+        self.assertIn("learning_resources.created_at <", listing)
+
+    def test_category_pages_use_composite_index(self):
+        with self.engine.connect() as conn:
+            plan = conn.exec_driver_sql(
+                "EXPLAIN QUERY PLAN SELECT id FROM learning_resources WHERE category = '病理照片' "
+                "AND (created_at < '2025-01-01' OR (created_at = '2025-01-01' AND id < 5)) "
+                "ORDER BY created_at DESC, id DESC LIMIT 3"
+            ).all()
+        detail = " ".join(row[-1] for row in plan)
+        self.assertIn("ix_learning_resources_category_created_id", detail)
+        self.assertNotIn("TEMP B-TREE", detail)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/resources", params={"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+        bad_timestamp = encode_cursor("yesterday", 1)
+        response = self.client.get("/api/resources", params={"cursor": bad_timestamp})
+        self.assertEqual(response.status_code, 400)
+
+class TestChunkedStorage(ApiTestCase, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.payload = bytes(range(256)) * (10 * 1024)  # 2.5 MiB -> 3 chunks
+        self.resource = self.upload(data=self.payload)
+
+    def test_streaming_holds_no_connection_between_chunks(self):
+        with self.SessionLocal() as db:
+            stored = db.get(LearningResource, self.resource["id"])
+            blob = DatabaseStorage(db).open(stored.file_url.removeprefix("db://"))
+        chunks = blob.iter_range(0, len(self.payload) - 1)
+        received = []
+        for data in chunks:
+            # Each yield happens with the chunk's connection back in the pool
+            self.assertEqual(self.engine.pool.checkedout(), 0)
+            received.append(data)
+        self.assertEqual(b"".join(received), self.payload)
+
+    def test_upload_is_split_into_chunks(self):
+        with self.SessionLocal() as db:
+            stored = db.get(LearningResource, self.resource["id"])
+            key = int(stored.file_url.removeprefix("db://"))
+            seqs = [row.seq for row in db.query(ResourceChunk.seq).filter(
+                ResourceChunk.resource_id == key
+            ).order_by(ResourceChunk.seq)]
+            self.assertEqual(seqs, [0, 1, 2])
+            self.assertIsNone(stored.content)
+        self.assertEqual(self.resource["size"], len(self.payload))
+
+    def test_range_reads_only_covering_chunks(self):
+        start, end = 1024 * 1024 + 10, 1024 * 1024 + 5000
+        self.statements.clear()
+        response = self.client.get(
+            f"/api/resources/{self.resource['id']}/content",
+            headers={"Range": f"bytes={start}-{end}"},
+        )
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.content, self.payload[start:end + 1])
+        self.assertEqual(response.headers["content-range"], f"bytes {start}-{end}/{len(self.payload)}")
+        chunk_reads = [s for s in self.statements if "SELECT resource_chunks.data" in s]
+        self.assertEqual(len(chunk_reads), 1)
+
+    def test_open_ended_and_oversized_ranges(self):
+        url = f"/api/resources/{self.resource['id']}/content"
+        response = self.client.get(url, headers={"Range": "bytes=2621000-"})
+        self.assertEqual(response.content, self.payload[2621000:])
+        response = self.client.get(url, headers={"Range": "bytes=10-99999999"})
+        self.assertEqual(response.content, self.payload[10:])
+        response = self.client.get(url, headers={"Range": "bytes=99999999-"})
+        self.assertEqual(response.status_code, 416)
+
+    def test_delete_removes_chunks(self):
+        self.client.delete(f"/api/resources/{self.resource['id']}")
+        with self.SessionLocal() as db:
+            self.assertEqual(db.query(ResourceChunk).count(), 0)
+
+    def test_legacy_blob_rows_are_served_and_migrated(self):
+        legacy = b"legacy-bytes-" * 1000
+        with self.SessionLocal() as db:
+            rows = [
+                LearningResource(
+                    title=title, category="文献笔记", media_type=MediaType.DOC,
+                    file_url="db://legacy.pdf", size=len(legacy), content=legacy,
+                )
+                for title in ("旧版资料", "旧版资料副本")
+            ]
+            db.add_all(rows)
+            db.commit()
+            rid, copy_id = rows[0].id, rows[1].id
+
+        url = f"/api/resources/{rid}/content"
+        self.assertEqual(self.client.get(url).content, legacy)
+        self.assertEqual(self.client.get(url, headers={"Range": "bytes=13-25"}).content, legacy[13:26])
+
+        self.assertEqual(migrate_content_to_chunks(self.engine, chunk_size=1000), 2)
+        digest = hashlib.sha256(legacy).hexdigest()
+        with self.SessionLocal() as db:
+            row, copy = db.get(LearningResource, rid), db.get(LearningResource, copy_id)
+            self.assertIsNone(row.content)
+            self.assertEqual(row.file_url, f"db://{rid}")
+            self.assertEqual(db.query(ResourceChunk).filter(ResourceChunk.resource_id == rid).count(), 13)
+            # Hashed and filed like an upload: the identical copy shares the chunks
+            self.assertEqual((row.content_hash, copy.content_hash), (digest, digest))
+            self.assertEqual(copy.file_url, f"db://{rid}")
+            self.assertEqual(db.query(ResourceChunk).filter(ResourceChunk.resource_id == copy_id).count(), 0)
+            self.assertEqual(db.get(MediaBlob, digest).ref_count, 2)
+        response = self.client.get(url)
+        self.assertEqual(response.content, legacy)
+        self.assertIn(digest, response.headers["etag"])
+        self.assertEqual(self.client.get(url, headers={"Range": "bytes=990-2010"}).content, legacy[990:2011])
+
+        self.client.delete(f"/api/resources/{rid}")
+        self.assertEqual(self.client.get(f"/api/resources/{copy_id}/content").content, legacy)
+        with self.SessionLocal() as db:
+            self.assertEqual(db.get(MediaBlob, digest).ref_count, 1)
+
+class TestDeduplication(ApiTestCase, unittest.TestCase):
+    def test_identical_uploads_share_one_copy(self):
+        payload = os.urandom(200 * 1024)
+        first = self.upload(title="病理切片一", data=payload)
+        second = self.upload(title="病理切片二", data=payload)
+        other = self.upload(title="其他资料", data=b"different")
+
+        with self.SessionLocal() as db:
+            digest = hashlib.sha256(payload).hexdigest()
+            blob = db.get(MediaBlob, digest)
+            self.assertEqual(blob.ref_count, 2)
+            rows = {r.id: r for r in db.query(LearningResource)}
+            self.assertEqual(rows[first["id"]].file_url, rows[second["id"]].file_url)
+            self.assertEqual(rows[second["id"]].content_hash, digest)
+            self.assertEqual(db.query(ResourceChunk).count(), 2)
+
+        stats = self.client.get("/api/admin/storage/dedup").json()
+        self.assertEqual(stats["blobs"], 2)
+        self.assertEqual(stats["bytes_saved"], len(payload))
+        self.assertEqual(stats["stored_bytes"], len(payload) + len(b"different"))
+
+        # Deleting the resource whose upload holds the bytes keeps them alive
+        self.client.delete(f"/api/resources/{first['id']}")
+        response = self.client.get(f"/api/resources/{second['id']}/content")
+        self.assertEqual(response.content, payload)
+
+        self.client.delete(f"/api/resources/{second['id']}")
+        with self.SessionLocal() as db:
+            self.assertIsNone(db.get(MediaBlob, hashlib.sha256(payload).hexdigest()))
+            self.assertEqual(db.query(ResourceChunk).count(), 1)
+            self.assertEqual(db.query(MediaBlob).count(), 1)
+        self.assertEqual(self.client.get(f"/api/resources/{other['id']}/content").content, b"different")
+
+class TestUploadLimits(ApiTestCase, unittest.TestCase):
+    def post_file(self, data):
+        return self.client.post(
+            "/api/resources",
+            data={"title": "大文件", "category": "临床带教", "media_type": "VIDEO"},
+            files={"file": ("big.mp4", data, "video/mp4")},
+        )
+
+    def test_limit_is_checked_while_storing(self):
+        with mock.patch("app.api.resources.MAX_UPLOAD_SIZE", 4096):
+            response = self.post_file(b"z" * 10000)
+        self.assertEqual(response.status_code, 413)
+        with self.SessionLocal() as db:
+            self.assertEqual(db.query(LearningResource).count(), 0)
+            self.assertEqual(db.query(ResourceChunk).count(), 0)
+
+    def test_middleware_rejects_oversized_body(self):
+        self.app.add_middleware(UploadSizeLimitMiddleware, max_size=4096)
+        response = self.post_file(b"z" * 10000)
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.json()["detail"]["max_bytes"], 4096)
+        self.assertEqual(self.post_file(b"z" * 100).status_code, 200)
+
+class FakeS3Client:
+    """Minimal in-memory stand-in for the boto3 S3 client calls we use."""
+
+    class NotFound(Exception):
+        response = {"Error": {"Code": "404"}}
+
+    def __init__(self):
+        self.objects = {}
+        self.ranges = []
+        self.configs = []
+
+    def upload_fileobj(self, fileobj, bucket, key, Config=None):
+        self.configs.append(Config)
+        self.objects[(bucket, key)] = fileobj.read()
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise self.NotFound()
+        return {"ContentLength": len(self.objects[(Bucket, Key)])}
+
+    def get_object(self, Bucket, Key, Range):
+        self.ranges.append(Range)
+        start, end = map(int, Range.removeprefix("bytes=").split("-"))
+        data = self.objects[(Bucket, Key)][start:end + 1]
+        body = mock.Mock()
+        body.iter_chunks = lambda size: iter([data[i:i + size] for i in range(0, len(data), size)])
+        return {"Body": body}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+class TestStorageBackends(ApiTestCase, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.payload = os.urandom(300 * 1024)
+
+    def test_filesystem_backend(self):
+        with tempfile.TemporaryDirectory() as root, \
+                mock.patch("app.storage.STORAGE_BACKEND", "fs"), \
+                mock.patch("app.storage.filesystem.STORAGE_DIR", root):
+            resource = self.upload(data=self.payload)
+            with self.SessionLocal() as db:
+                stored = db.get(LearningResource, resource["id"])
+                self.assertTrue(stored.file_url.startswith("fs://"))
+                path = os.path.join(root, stored.file_url.removeprefix("fs://"))
+            self.assertEqual(resource["file_url"], f"/api/resources/{resource['id']}/content?v={stored.content_hash}")
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), self.payload)
+
+            url = f"/api/resources/{resource['id']}/content"
+            self.assertEqual(self.client.get(url).content, self.payload)
+            response = self.client.get(url, headers={"Range": "bytes=100-199"})
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual(response.content, self.payload[100:200])
+            self.assertEqual(response.headers["content-length"], "100")
+
+            self.client.delete(f"/api/resources/{resource['id']}")
+            self.assertFalse(os.path.exists(path))
+
+    def test_s3_backend_with_stand_in_client(self):
+        fake = FakeS3Client()
+        storage = S3Storage(client=fake, bucket="test")
+        with mock.patch("app.storage.STORAGE_BACKEND", "s3"), \
+                mock.patch("app.storage._shared_s3", storage):
+            resource = self.upload(data=self.payload)
+            url = f"/api/resources/{resource['id']}/content"
+            response = self.client.get(url, headers={"Range": "bytes=1000-"})
+            self.assertEqual(response.content, self.payload[1000:])
+            self.assertEqual(fake.ranges[-1], f"bytes=1000-{len(self.payload) - 1}")
+            # The transfer settings apply from the first upload on, injected client or not
+            self.assertEqual(fake.configs, [storage._transfer_config])
+            self.client.delete(f"/api/resources/{resource['id']}")
+            self.assertEqual(fake.objects, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+from support import ApiTestCase
+
+from app.core.search import rebuild_search_index, tokenize
+
+class TestSearch(ApiTestCase, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.crown = self.upload(title="全冠牙体预备要点", key_points="肩台宽度1mm")
+        self.suture = self.upload(
+            title="缝合基础", key_points="间断缝合", transcript="讲解牙体预备后的临时冠制作"
+        )
+        self.other = self.upload(title="病例讨论 CAD/CAM", media_type="DOC")
+
+    def search(self, q, **params):
+        response = self.client.get("/api/resources/search", params=dict(params, q=q))
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()
+
+    def test_tokenize_uses_cjk_bigrams(self):
+        self.assertEqual(tokenize("牙体预备 CAD/CAM"), "牙体 体预 预备 cad cam")
+
+    def test_title_matches_rank_above_transcript(self):
+        results = self.search("牙体预备")
+        self.assertEqual([r["id"] for r in results], [self.crown["id"], self.suture["id"]])
+        self.assertGreater(results[0]["score"], results[1]["score"])
+        self.assertEqual(results[0]["highlights"]["title"], "全冠<mark>牙体预备</mark>要点")
+        self.assertIn("<mark>牙体预备</mark>", results[1]["highlights"]["transcript"])
+        self.assertNotIn("title", results[1]["highlights"])
+
+    def test_latin_words_and_single_characters(self):
+        self.assertEqual([r["id"] for r in self.search("cam")], [self.other["id"]])
+        self.assertEqual({r["id"] for r in self.search("冠")}, {self.crown["id"], self.suture["id"]})
+
+    def test_category_filter_and_no_match(self):
+        self.assertEqual(self.search("牙体预备", category="文献笔记"), [])
+        self.assertEqual(self.search("种植"), [])
+        self.assertEqual(self.search("!!!"), [])
+
+    def test_index_follows_update_and_delete(self):
+        rid = self.other["id"]
+        self.client.put(f"/api/resources/{rid}", json={"transcript": "根管治疗步骤"})
+        self.assertEqual([r["id"] for r in self.search("根管")], [rid])
+
+        self.client.delete(f"/api/resources/{rid}")
+        self.assertEqual(self.search("根管"), [])
+        self.assertEqual(self.search("cam"), [])
+
+    def test_rebuild(self):
+        self.assertEqual(rebuild_search_index(self.engine, only_if_empty=True), 0)
+        self.assertEqual(rebuild_search_index(self.engine), 3)
+        self.assertEqual(len(self.search("缝合")), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import asyncio
+import contextlib
+import io
+import threading
+import unittest
+
+from support import ApiTestCase
+
+from app.core.share_access import ShareAccessBuffer, share_access_buffer
+from app.models.database import ShareAccessEvent, ShareLink
+
+class TestShareAccessCounting(ApiTestCase, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.resource = self.upload()
+        response = self.client.post("/api/shares", json={"resource_id": self.resource["id"]})
+        self.link = response.json()
+
+    def stored(self):
+        with self.SessionLocal() as db:
+            count = db.get(ShareLink, self.link["id"]).access_count
+            events = db.query(ShareAccessEvent).count()
+        return count, events
+
+    def test_views_are_buffered_then_flushed_in_one_batch(self):
+        self.statements.clear()
+        counts = [
+            self.client.get(f"/api/shares/{self.link['share_token']}").json()["share_info"]["access_count"]
+            for _ in range(5)
+        ]
+        # Viewers see their own view counted even before it is written
+        self.assertEqual(counts, [1, 2, 3, 4, 5])
+        self.assertFalse([s for s in self.statements if s.startswith(("UPDATE", "INSERT"))])
+        self.assertEqual(self.stored(), (0, 0))
+
+        self.statements.clear()
+        self.assertEqual(share_access_buffer.flush(), 5)
+        self.assertEqual(self.stored(), (5, 5))
+        self.assertEqual(len([s for s in self.statements if s.startswith("UPDATE share_links")]), 1)
+        self.assertEqual(share_access_buffer.flush(), 0)
+
+    def test_concurrent_views_and_flushes_lose_nothing(self):
+        buffer = ShareAccessBuffer(session_factory=self.SessionLocal)
+
+        def view(n):
+            for i in range(n):
+                buffer.record(self.link["id"], self.resource["id"])
+                if i % 50 == 0:
+                    buffer.flush()
+
+        threads = [threading.Thread(target=view, args=(200,)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        buffer.flush()
+        self.assertEqual(self.stored(), (800, 800))
+
+    def test_failed_flush_keeps_the_batch(self):
+        def broken():
+            raise RuntimeError("database unavailable")
+
+        buffer = ShareAccessBuffer(session_factory=broken)
+        buffer.record(self.link["id"], self.resource["id"])
+        with self.assertRaises(RuntimeError):
+            buffer.flush()
+        self.assertEqual(buffer.pending(self.link["id"]), 1)
+        buffer.session_factory = self.SessionLocal
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(self.stored(), (1, 1))
+
+    def test_failing_flushes_drop_the_oldest_views(self):
+        def broken():
+            raise RuntimeError("database unavailable")
+
+        buffer = ShareAccessBuffer(session_factory=broken, max_buffered=5)
+        for resource_id in range(8):
+            buffer.record(self.link["id"], resource_id)
+            with self.assertRaises(RuntimeError), contextlib.redirect_stdout(io.StringIO()):
+                buffer.flush()
+        self.assertEqual(buffer.pending(self.link["id"]), 5)
+
+        buffer.session_factory = self.SessionLocal
+        self.assertEqual(buffer.flush(), 5)
+        self.assertEqual(self.stored(), (5, 5))
+        with self.SessionLocal() as db:
+            kept = sorted(event.resource_id for event in db.query(ShareAccessEvent))
+        self.assertEqual(kept, [3, 4, 5, 6, 7])
+
+    def test_background_flush_and_shutdown(self):
+        buffer = ShareAccessBuffer(session_factory=self.SessionLocal, interval=0.05, max_pending=3)
+
+        async def run():
+            buffer.start()
+            for _ in range(3):
+                buffer.record(self.link["id"], self.resource["id"])
+            await asyncio.sleep(0.3)
+            flushed = self.stored()
+            buffer.record(self.link["id"], self.resource["id"])
+            await buffer.stop()
+            return flushed
+
+        self.assertEqual(asyncio.run(run()), (3, 3))
+        self.assertEqual(self.stored(), (4, 4))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from support import ApiTestCase
+
+from app.core.share_access import share_access_buffer
+from app.core.share_tokens import InvalidShareToken, ShareDenylist, sign_share_token, verify_share_token
+from app.models.database import ShareRevocation
+
+KEY = "test-signing-key"
+
+@mock.patch("app.core.share_tokens.SHARE_SIGNING_KEY", KEY)
+class TestSignedTokens(unittest.TestCase):
+    def test_round_trip(self):
+        expires = datetime(2030, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        token = sign_share_token(7, 42, expires)
+        self.assertLessEqual(len(token), 64)
+        self.assertEqual(tuple(verify_share_token(token)), (7, 42, expires))
+
+    def test_tampering_and_other_keys_are_rejected(self):
+        token = sign_share_token(7, 42, datetime(2030, 1, 1, tzinfo=timezone.utc))
+        with self.assertRaises(InvalidShareToken):
+            verify_share_token(token.replace("s.7.42.", "s.7.43."))
+        with self.assertRaises(InvalidShareToken):
+            verify_share_token("s.not.a.token")
+        with mock.patch("app.core.share_tokens.SHARE_SIGNING_KEY", "other"):
+            with self.assertRaises(InvalidShareToken):
+                verify_share_token(token)
+
+@mock.patch("app.core.share_tokens.SHARE_SIGNING_KEY", KEY)
+class TestSignedShareLinks(ApiTestCase, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.resource = self.upload()
+
+    def share(self, **body):
+        response = self.client.post("/api/shares", json=dict(body, resource_id=self.resource["id"]))
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()
+
+    def test_signed_link_resolves_without_share_lookup(self):
+        token = self.share()["share_token"]
+        self.assertTrue(token.startswith("s."))
+        self.client.get(f"/api/shares/{token}")  # warms the metadata cache
+        self.statements.clear()
+        response = self.client.get(f"/api/shares/{token}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["resource"]["id"], self.resource["id"])
+        self.assertEqual(self.statements, [])
+        self.assertEqual(response.json()["share_info"]["access_count"], 2)
+
+        # After a flush the count is the stored one, kept without a lookup
+        share_access_buffer.flush()
+        self.statements.clear()
+        self.assertEqual(self.client.get(f"/api/shares/{token}").json()["share_info"]["access_count"], 3)
+        self.assertEqual(self.statements, [])
+
+    def test_expired_and_forged_tokens(self):
+        expired = sign_share_token(1, self.resource["id"], datetime.now(timezone.utc) - timedelta(minutes=1))
+        self.assertEqual(self.client.get(f"/api/shares/{expired}").status_code, 410)
+        forged = sign_share_token(1, self.resource["id"], datetime.now(timezone.utc) + timedelta(hours=1))[:-2] + "AA"
+        self.assertEqual(self.client.get(f"/api/shares/{forged}").status_code, 404)
+
+    def test_revocation_is_immediate_and_survives_reload(self):
+        token = self.share()["share_token"]
+        self.assertEqual(self.client.delete(f"/api/shares/{token}").status_code, 200)
+        self.assertEqual(self.client.get(f"/api/shares/{token}").status_code, 404)
+
+        # Another worker starting up, or refreshing, learns about it too
+        other = ShareDenylist(session_factory=self.SessionLocal, refresh_interval=60)
+        other.load()
+        link_id = verify_share_token(token).link_id
+        self.assertTrue(other.is_revoked(link_id))
+        self.assertFalse(other.is_revoked(link_id + 1))
+
+    def test_refresh_sees_revocations_committed_out_of_id_order(self):
+        # On Postgres a lower sequence id can commit after a higher one
+        expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
+        other = ShareDenylist(session_factory=self.SessionLocal, refresh_interval=60)
+        with self.SessionLocal() as db:
+            db.add(ShareRevocation(id=100, share_link_id=1, expires_at=expires_at))
+            db.commit()
+        other.load()
+        with self.SessionLocal() as db:
+            db.add(ShareRevocation(id=50, share_link_id=2, expires_at=expires_at))
+            db.add(ShareRevocation(id=51, share_link_id=3, expires_at=expires_at - timedelta(hours=2)))
+            db.commit()
+        other.refresh()
+        self.assertTrue(other.is_revoked(1))
+        self.assertTrue(other.is_revoked(2))
+        self.assertFalse(other.is_revoked(3))
+
+    def test_random_tokens_keep_working(self):
+        with mock.patch("app.core.share_tokens.SHARE_SIGNING_KEY", None):
+            token = self.share()["share_token"]
+            self.assertFalse(token.startswith("s."))
+        response = self.client.get(f"/api/shares/{token}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["share_info"]["access_count"], 1)
+
+    def test_signed_links_fall_back_to_lookup_without_a_key(self):
+        token = self.share()["share_token"]
+        with mock.patch("app.core.share_tokens.SHARE_SIGNING_KEY", None):
+            self.assertEqual(self.client.get(f"/api/shares/{token}").status_code, 200)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+
+from fastapi import Depends
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from support import ApiTestCase
+
+from app.core.config import get_db
+from app.core.sql_trace import MAX_DISTINCT_PARAMETERS, RequestTrace, SqlTraceMiddleware, loggable_parameters, trace_engine
+
+class TestSqlTrace(ApiTestCase, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.records = []
+        self.app.add_middleware(SqlTraceMiddleware, repeat_threshold=3, log=self.records.append)
+
+        @self.app.get("/loop")
+        def loop(n: int, db: Session = Depends(get_db)):
+            # One query per id: the classic N+1 shape
+            return [db.execute(text("SELECT title FROM learning_resources WHERE id = :id"), {"id": i}).scalar()
+                    for i in range(n)]
+
+    def events(self, name):
+        return [record for record in self.records if record["event"] == name]
+
+    def test_repeated_statements_flagged(self):
+        trace_engine(self.engine, slow_ms=10_000, log=self.records.append)
+        self.client.get("/loop", params={"n": 2})
+        self.client.get("/api/resources")
+        self.assertEqual(self.records, [])
+
+        self.client.get("/loop", params={"n": 4}, headers={"X-Request-ID": "req-42"})
+        [repeat] = self.events("n_plus_one")
+        self.assertEqual((repeat["count"], repeat["distinct_parameters"]), (4, 4))
+        self.assertIn("WHERE id = ?", repeat["statement"])
+        self.assertEqual(repeat["request"], {"id": "req-42", "method": "GET", "path": "/loop", "route": "/loop"})
+        [summary] = self.events("request_sql")
+        self.assertEqual((summary["queries"], summary["repeated_statements"], summary["slow_queries"]), (4, 1, 0))
+
+    def test_slow_queries_logged_with_plan(self):
+        resource = self.upload(title="牙周讲义")
+        trace_engine(self.engine, slow_ms=0, log=self.records.append)
+        response = self.client.get(f"/api/resources/{resource['id']}/content", headers={"X-Request-ID": "dl"})
+        self.assertEqual(response.status_code, 200)
+
+        slow = self.events("slow_query")
+        self.assertTrue(slow)
+        # Including the statements of the streamed body, which runs in its own session
+        self.assertTrue(all(record["request"]["id"] == "dl" for record in slow))
+        self.assertTrue(any("resource_chunks" in record["statement"] for record in slow))
+        select = next(record for record in slow if "FROM learning_resources" in record["statement"])
+        self.assertIn(resource["id"], select["parameters"])
+        self.assertTrue(any("learning_resources" in line for line in select["plan"]))
+        self.assertEqual(self.events("request_sql")[0]["slow_queries"], len(slow))
+
+    def test_writes_unaffected_by_explain(self):
+        trace_engine(self.engine, slow_ms=0, log=self.records.append)
+        resource = self.upload(title="根管预备", data=b"x" * 5000)
+        self.assertEqual(self.client.get(resource["file_url"]).content, b"x" * 5000)
+        inserts = [r for r in self.events("slow_query") if r["statement"].startswith("INSERT INTO learning_resources")]
+        self.assertTrue(inserts and inserts[0]["plan"] is not None)
+
+    def test_statements_outside_requests(self):
+        trace_engine(self.engine, slow_ms=0, log=self.records.append)
+        with self.SessionLocal() as db:
+            db.execute(text("SELECT count(*) FROM learning_resources")).scalar()
+        [record] = self.events("slow_query")
+        self.assertIsNone(record["request"])
+        self.assertEqual(self.events("request_sql"), [])
+
+    def test_parameters_shortened(self):
+        self.assertEqual(
+            loggable_parameters((1, b"\x00" * 2048, "牙" * 300)),
+            [1, "<2048 bytes>", "牙" * 200 + "...<300 chars>"],
+        )
+
+    def test_parameter_sets_bounded(self):
+        trace = RequestTrace("bulk", "POST", "/api/resources")
+        insert = "INSERT INTO resource_chunks (resource_id, seq, data) VALUES (?, ?, ?)"
+        for seq in range(20):
+            trace.record(insert, (1, seq, b"\x00" * 1024 * 1024), 0.001)
+        trace.record(insert, [(2, seq, b"\x00" * 1024) for seq in range(3)], 0.001, executemany=True)
+        stats = trace.statements[insert]
+        self.assertEqual(len(stats.parameter_sets), 21)
+        self.assertTrue(all(isinstance(key, int) for key in stats.parameter_sets))
+
+        select = "SELECT 1 WHERE ? = ?"
+        for i in range(MAX_DISTINCT_PARAMETERS + 10):
+            trace.record(select, (i, i), 0.001)
+        [entry] = [e for e in trace.repeated(2) if e["statement"] == select]
+        self.assertEqual((entry["count"], entry["distinct_parameters"]), (MAX_DISTINCT_PARAMETERS + 10, MAX_DISTINCT_PARAMETERS))
+
+if __name__ == '__main__':
+    unittest.main()
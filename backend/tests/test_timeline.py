@@ -0,0 +1,80 @@
+import unittest
+from datetime import datetime, timezone
+
+from support import ApiTestCase
+
+from app.core.rollups import rebuild_daily_counts
+from app.models.database import LearningResource, ResourceDailyCount
+
+class TestTimeline(ApiTestCase, unittest.TestCase):
+    def timeline(self, **params):
+        response = self.client.get("/api/resources/timeline", params=params)
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()
+
+    def cells(self):
+        with self.SessionLocal() as db:
+            return sorted(
+                (str(c.day), c.category, c.media_type, c.count)
+                for c in db.query(ResourceDailyCount)
+            )
+
+    def backdate(self, resource_id, created_at):
+        with self.SessionLocal() as db:
+            db.get(LearningResource, resource_id).created_at = created_at
+            db.commit()
+        rebuild_daily_counts(self.engine)
+
+    def test_counts_follow_create_update_delete(self):
+        first = self.upload()
+        self.upload(media_type="DOC")
+        today = str(datetime.now(timezone.utc).date())  # server_default now() is UTC
+        self.assertEqual(self.timeline(), [{"date": today, "count": 2}])
+        self.assertEqual(self.timeline(media_type="DOC"), [{"date": today, "count": 1}])
+
+        self.client.put(f"/api/resources/{first['id']}", json={"category": "文献笔记"})
+        self.assertEqual(self.timeline(category="文献笔记"), [{"date": today, "count": 1}])
+        self.assertEqual(self.timeline(category="临床带教"), [{"date": today, "count": 1}])
+
+        self.client.delete(f"/api/resources/{first['id']}")
+        self.assertEqual(self.timeline(category="文献笔记"), [])
+        self.assertEqual(self.timeline(), [{"date": today, "count": 1}])
+
+    def test_category_rename_moves_counts(self):
+        self.upload()
+        self.upload()
+        response = self.client.put(
+            "/api/categories/ops/rename-by-name", params={"old_name": "临床带教", "new_name": "临床示教"}
+        )
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(self.timeline(category="临床带教"), [])
+        self.assertEqual(self.timeline(category="临床示教")[0]["count"], 2)
+
+    def test_year_and_month_filters(self):
+        old = self.upload()
+        self.upload()
+        self.backdate(old["id"], datetime(2023, 5, 17, 9, 30, 0, 123456))
+        self.assertEqual(self.timeline(year=2023), [{"date": "2023-05-17", "count": 1}])
+        self.assertEqual(self.timeline(year=2023, month=5), [{"date": "2023-05-17", "count": 1}])
+        self.assertEqual(self.timeline(year=2023, month=6), [])
+        self.assertEqual(self.timeline(month=5)[0], {"date": "2023-05-17", "count": 1})
+        self.assertEqual(self.client.get("/api/resources/timeline", params={"month": 13}).status_code, 422)
+
+    def test_backfill_matches_incremental_counts(self):
+        for media_type in ("VIDEO", "DOC", "VIDEO"):
+            self.upload(media_type=media_type)
+        incremental = self.cells()
+        self.assertEqual(rebuild_daily_counts(self.engine, only_if_empty=True), 0)
+        self.assertEqual(rebuild_daily_counts(self.engine), 2)
+        self.assertEqual(self.cells(), incremental)
+
+    def test_timeline_reads_only_the_rollup(self):
+        self.upload()
+        self.statements.clear()
+        self.timeline(year=datetime.now(timezone.utc).year)
+        self.assertEqual(len(self.statements), 1)
+        self.assertIn("resource_daily_counts", self.statements[0])
+        self.assertNotIn("learning_resources", self.statements[0])
+
+if __name__ == '__main__':
+    unittest.main()
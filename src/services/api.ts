@@ -2,33 +2,49 @@ import { MedFile, ShareLink, FileType, DiseaseTag, CategoryNode } from '@/types/
 
 const API_BASE_URL = '/api';
 
+// Hash-versioned content URL: the server marks it immutable, so the browser
+// keeps the bytes until the resource's content changes.
+const contentUrl = (r: any) =>
+  `${API_BASE_URL}/resources/${r.id}/content${r.content_hash ? `?v=${r.content_hash}` : ''}`;
+
+// Gallery views load the server-side thumbnail, not the full-size original
+const thumbnailUrl = (r: any) => r.renditions?.thumb ?? contentUrl(r);
+
 export const fileService = {
   // Get all files with optional search
   async getFiles(search?: string, tag?: DiseaseTag): Promise<MedFile[]> {
     const params = new URLSearchParams();
     if (tag) params.append('category', tag);
+    const query = search?.trim();
+    let url: string;
+    if (query) {
+      // Server-side full-text search over title, key points and transcript
+      params.append('q', query);
+      params.append('limit', '100');
+      url = `${API_BASE_URL}/resources/search?${params.toString()}`;
+    } else {
+      // The list endpoint is paginated by default; this view still wants everything
+      params.append('unpaginated', 'true');
+      url = `${API_BASE_URL}/resources?${params.toString()}`;
+    }
     
-    const response = await fetch(`${API_BASE_URL}/resources?${params.toString()}`);
+    const response = await fetch(url);
     if (!response.ok) throw new Error('Failed to fetch files');
     const data = await response.json();
     
     // Map backend response to MedFile
-    let files: MedFile[] = data.map((r: any) => ({
+    const files: MedFile[] = data.map((r: any) => ({
       id: String(r.id),
       name: r.title,
       type: r.media_type.toLowerCase(), // Backend might return uppercase enum
       diseaseTag: r.category,
       size: r.size,
       createdAt: r.created_at ? new Date(r.created_at) : new Date(),
-      fileUrl: `${API_BASE_URL}/resources/${r.id}/content`,
-      thumbnailUrl: r.media_type.toLowerCase() === 'image' ? `${API_BASE_URL}/resources/${r.id}/content` : undefined,
+      fileUrl: contentUrl(r),
+      thumbnailUrl: r.media_type.toLowerCase() === 'image' ? thumbnailUrl(r) : undefined,
       duration: r.duration
     }));
 
-    if (search) {
-       const searchLower = search.toLowerCase();
-       files = files.filter(f => f.name.toLowerCase().includes(searchLower));
-    }
     return files;
   },
 
@@ -90,8 +106,8 @@ export const fileService = {
       diseaseTag: r.category as DiseaseTag,
       size: r.size,
       createdAt: r.created_at ? new Date(r.created_at) : new Date(),
-      fileUrl: `${API_BASE_URL}/resources/${r.id}/content`,
-      thumbnailUrl: r.media_type === 'IMAGE' ? `${API_BASE_URL}/resources/${r.id}/content` : undefined,
+      fileUrl: contentUrl(r),
+      thumbnailUrl: r.media_type === 'IMAGE' ? thumbnailUrl(r) : undefined,
       duration: r.duration
     };
   },
@@ -153,8 +169,8 @@ export const fileService = {
             diseaseTag: r.category as DiseaseTag,
             size: r.size,
             createdAt: r.created_at ? new Date(r.created_at) : new Date(),
-            fileUrl: `${API_BASE_URL}/resources/${r.id}/content`,
-            thumbnailUrl: String(r.media_type).toUpperCase() === 'IMAGE' ? `${API_BASE_URL}/resources/${r.id}/content` : undefined,
+            fileUrl: contentUrl(r),
+            thumbnailUrl: String(r.media_type).toUpperCase() === 'IMAGE' ? thumbnailUrl(r) : undefined,
             duration: r.duration
           };
           resolve(result);
@@ -222,8 +238,8 @@ export const fileService = {
             diseaseTag: r.category as DiseaseTag,
             size: r.size,
             createdAt: r.created_at ? new Date(r.created_at) : new Date(),
-            fileUrl: `${API_BASE_URL}/resources/${r.id}/content`,
-            thumbnailUrl: String(r.media_type).toUpperCase() === 'IMAGE' ? `${API_BASE_URL}/resources/${r.id}/content` : undefined,
+            fileUrl: contentUrl(r),
+            thumbnailUrl: String(r.media_type).toUpperCase() === 'IMAGE' ? thumbnailUrl(r) : undefined,
             duration: r.duration
           };
           resolve(result);
@@ -307,8 +323,8 @@ export const shareService = {
       diseaseTag: r.category as DiseaseTag,
       size: r.size,
       createdAt: r.created_at ? new Date(r.created_at) : new Date(),
-      fileUrl: `${API_BASE_URL}/resources/${r.id}/content`,
-      thumbnailUrl: r.media_type === 'IMAGE' ? `${API_BASE_URL}/resources/${r.id}/content` : undefined,
+      fileUrl: contentUrl(r),
+      thumbnailUrl: r.media_type === 'IMAGE' ? thumbnailUrl(r) : undefined,
       duration: r.duration
     };
 